@@ -2,13 +2,23 @@ import os
 from flask import Flask, session
 from flask_wtf.csrf import CSRFProtect
 
-from src.database import init_database, seed_all
+from src.database import (
+    bootstrap_database,
+    is_database_current,
+    init_request_unit_of_work,
+    init_query_instrumentation,
+    init_cache_invalidation,
+    load_catalog,
+)
 
 app = Flask(__name__)
 app.secret_key = os.environ.get("SESSION_SECRET", "dev-secret-key")
 app.config['SESSION_COOKIE_SAMESITE'] = 'None'
 app.config['SESSION_COOKIE_SECURE'] = True
 csrf = CSRFProtect(app)
+init_request_unit_of_work(app)
+init_query_instrumentation(app)
+init_cache_invalidation(app)
 
 
 def initialize_database():
@@ -17,8 +27,12 @@ def initialize_database():
         if not database_url:
             print("WARNING: DATABASE_URL not set. Database features will be unavailable.")
             return False
-        init_database()
-        seed_all()
+        if os.environ.get("DB_BOOTSTRAP_ON_BOOT", "1") == "0":
+            if not is_database_current():
+                print("WARNING: Database schema/content is stale. Run: python -m src.db.manage bootstrap")
+        else:
+            bootstrap_database()
+        load_catalog()
         return True
     except Exception as e:
         print(f"WARNING: Database initialization failed: {e}")
@@ -0,0 +1,79 @@
+"""
+Shared plumbing for the concurrent benchmarks.
+
+Each benchmark builds its tables in a scratch schema, then runs the same
+workload once per mode with run_concurrently(): `workers` threads each on
+their own connection, while one more connection samples how many of them
+are waiting on a lock. Workers append per-call latencies to a list that
+summarize() turns into throughput and percentiles.
+"""
+
+import statistics
+import threading
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+# Seconds between pg_stat_activity samples; each sample counts for this long.
+LOCK_SAMPLE_SECONDS = 0.005
+
+
+def connect(dsn, schema, application_name, **kwargs):
+    """A RealDictCursor connection with `schema` first on the search path,
+    tagged so the lock-wait sampler can find it."""
+    return psycopg2.connect(dsn, cursor_factory=RealDictCursor, application_name=application_name,
+                            options=f'-c search_path={schema}', **kwargs)
+
+
+def _sample_lock_waits(dsn, application_name, stop, samples):
+    conn = psycopg2.connect(dsn)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        while not stop.is_set():
+            cur.execute("""
+                SELECT COUNT(*) FROM pg_stat_activity
+                WHERE application_name = %s AND wait_event_type = 'Lock'
+            """, (application_name,))
+            samples.append(cur.fetchone()[0])
+            time.sleep(LOCK_SAMPLE_SECONDS)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def run_concurrently(dsn, application_name, workers, worker, helpers=()) -> dict:
+    """Run worker(i) for i in range(workers) on threads of their own, and
+    each helper(stop) alongside until the workers are done. Returns
+    {'elapsed_s', 'lock_wait_s'}, the latter in backend-seconds spent
+    waiting on locks, from periodic samples."""
+    samples = []
+    stop = threading.Event()
+    background = [threading.Thread(target=_sample_lock_waits, args=(dsn, application_name, stop, samples))]
+    background += [threading.Thread(target=helper, args=(stop,)) for helper in helpers]
+    threads = [threading.Thread(target=worker, args=(i,)) for i in range(workers)]
+
+    for thread in background:
+        thread.start()
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    stop.set()
+    for thread in background:
+        thread.join()
+    return {'elapsed_s': elapsed, 'lock_wait_s': sum(samples) * LOCK_SAMPLE_SECONDS}
+
+
+def summarize(latencies, elapsed_s) -> dict:
+    """{'calls', 'per_s', 'p50_ms', 'p95_ms'} for per-call latencies in seconds."""
+    quantiles = statistics.quantiles(latencies, n=100) if len(latencies) > 1 else [0] * 99
+    return {
+        'calls': len(latencies),
+        'per_s': len(latencies) / elapsed_s,
+        'p50_ms': quantiles[49] * 1000,
+        'p95_ms': quantiles[94] * 1000,
+    }
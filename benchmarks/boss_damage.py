@@ -0,0 +1,217 @@
+"""
+Boss attacks by read-modify-write of current_hp vs striped damage aggregation.
+
+    DATABASE_URL=... python -m benchmarks.boss_damage [--players 5000] [--workers 64] [--attacks 300]
+
+Builds player_identity, player_discipline_progress, limited_time_bosses and
+migration 11's boss_participants and boss_damage_stripes in a scratch
+schema, then runs `workers` threads against one boss per mode:
+
+  - rmw:     the old attack_limited_boss(): read current_hp, compute the new
+             HP in Python, write it back, upsert the participant row;
+  - striped: BOSS_ATTACK_SQL, commit, then BOSS_DEFEAT_SQL.
+
+Throughput phase: a boss that cannot die takes `attacks` hits per worker;
+prints attacks/s, latency, lock waits and damage lost (dealt by participants
+but missing from the boss's HP). Defeat phase: a boss with --defeat-hp HP is
+attacked until it falls; prints how many attacks were told they defeated it
+(exactly one is correct).
+"""
+
+import argparse
+import os
+import random
+import time
+
+import psycopg2
+
+from benchmarks._harness import connect, run_concurrently, summarize
+from src.db.migrations import MIGRATIONS
+from src.engine.accounting import BOSS_ATTACK_SQL, BOSS_DEFEAT_SQL
+
+SCHEMA = 'bench_boss_damage'
+APPLICATION_NAME = 'bench_boss_damage'
+MODES = ('rmw', 'striped')
+# (phase, mode) -> boss_id
+BOSSES = {('throughput', 'rmw'): 1, ('throughput', 'striped'): 2, ('defeat', 'rmw'): 3, ('defeat', 'striped'): 4}
+UNKILLABLE_HP = 2_000_000_000
+
+
+def _setup(cur, players, defeat_hp):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("CREATE TABLE player_identity (player_id SERIAL PRIMARY KEY, player_name VARCHAR(100))")
+    cur.execute("""
+        CREATE TABLE player_discipline_progress (
+            progress_id SERIAL PRIMARY KEY,
+            player_id INTEGER REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            discipline_name VARCHAR(100) NOT NULL,
+            current_exp INTEGER DEFAULT 0,
+            total_exp_earned INTEGER DEFAULT 0,
+            UNIQUE(player_id, discipline_name)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE limited_time_bosses (
+            boss_id SERIAL PRIMARY KEY,
+            boss_name VARCHAR(200) NOT NULL,
+            health_points INTEGER DEFAULT 10000,
+            current_hp INTEGER DEFAULT 10000,
+            exp_reward INTEGER DEFAULT 500,
+            available_from TIMESTAMP,
+            available_until TIMESTAMP,
+            is_defeated BOOLEAN DEFAULT FALSE
+        )
+    """)
+    for statement in next(m for m in MIGRATIONS if m.name == 'boss_damage').statements:
+        cur.execute(statement)
+
+    cur.execute("INSERT INTO player_identity (player_name) SELECT 'player ' || n FROM generate_series(1, %s) n",
+                (players,))
+    cur.execute("""
+        INSERT INTO player_discipline_progress (player_id, discipline_name)
+        SELECT player_id, 'Strategy' FROM player_identity
+    """)
+    for (phase, mode), boss_id in BOSSES.items():
+        hp = UNKILLABLE_HP if phase == 'throughput' else defeat_hp
+        cur.execute("""
+            INSERT INTO limited_time_bosses
+            (boss_id, boss_name, health_points, current_hp, available_from, available_until)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP - INTERVAL '1 hour', CURRENT_TIMESTAMP + INTERVAL '1 day')
+        """, (boss_id, f"{phase} {mode}", hp, hp))
+
+
+def _attack_rmw(cur, params) -> dict:
+    # attack_limited_boss() before migration 11, on the tables that exist.
+    cur.execute("SELECT * FROM limited_time_bosses WHERE boss_id = %(boss_id)s AND NOT is_defeated", params)
+    boss = cur.fetchone()
+    if not boss or boss['current_hp'] <= 0:
+        cur.connection.rollback()
+        return {'hit': False, 'defeated': False}
+    new_hp = max(0, boss['current_hp'] - params['damage'])
+    cur.execute("UPDATE limited_time_bosses SET current_hp = %s WHERE boss_id = %s", (new_hp, params['boss_id']))
+    cur.execute("""
+        UPDATE player_discipline_progress
+        SET current_exp = current_exp + %(exp)s, total_exp_earned = total_exp_earned + %(exp)s
+        WHERE player_id = %(player_id)s AND discipline_name = 'Strategy'
+    """, params)
+    cur.execute("""
+        INSERT INTO boss_participants (boss_id, player_id, damage_dealt, attacks)
+        VALUES (%(boss_id)s, %(player_id)s, %(damage)s, 1)
+        ON CONFLICT (boss_id, player_id) DO UPDATE
+        SET damage_dealt = boss_participants.damage_dealt + EXCLUDED.damage_dealt,
+            attacks = boss_participants.attacks + 1
+    """, params)
+    cur.connection.commit()
+    return {'hit': True, 'defeated': new_hp <= 0}
+
+
+def _attack_striped(cur, params) -> dict:
+    # attack_limited_boss()'s two transactions.
+    cur.execute(BOSS_ATTACK_SQL, params)
+    attack = cur.fetchone()
+    if not attack or not attack['hit']:
+        cur.connection.rollback()
+        return {'hit': False, 'defeated': False}
+    cur.connection.commit()
+    cur.execute(BOSS_DEFEAT_SQL, params)
+    defeat = cur.fetchone()
+    cur.connection.commit()
+    return {'hit': True, 'defeated': defeat is not None}
+
+
+def _worker(dsn, mode, boss_id, players, attacks, stripes, seed, results):
+    attack = _attack_rmw if mode == 'rmw' else _attack_striped
+    rng = random.Random(seed)
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    cur = conn.cursor()
+    try:
+        for _ in range(attacks or 10 ** 9):
+            damage = rng.randint(500, 2000)
+            params = {'boss_id': boss_id, 'player_id': rng.randint(1, players), 'damage': damage,
+                      'exp': 50 + damage // 100, 'stripe': rng.randrange(stripes)}
+            started = time.perf_counter()
+            try:
+                outcome = attack(cur, params)
+            except psycopg2.Error:
+                conn.rollback()
+                results['errors'].append(1)
+                continue
+            if not outcome['hit']:
+                break  # defeated: the defeat phase runs until this happens
+            results['latencies'].append(time.perf_counter() - started)
+            if outcome['defeated']:
+                results['defeats'].append(1)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def run(dsn, phase, mode, args) -> dict:
+    boss_id = BOSSES[(phase, mode)]
+    results = {'latencies': [], 'errors': [], 'defeats': []}
+    attacks = args.attacks if phase == 'throughput' else None
+    timing = run_concurrently(dsn, APPLICATION_NAME, args.workers, lambda i: _worker(
+        dsn, mode, boss_id, args.players, attacks, args.stripes, args.seed + i, results))
+    return {
+        **summarize(results['latencies'], timing['elapsed_s']),
+        'lock_wait_s': timing['lock_wait_s'],
+        'defeats': len(results['defeats']),
+        'errors': len(results['errors']),
+    }
+
+
+def _lost_damage(cur, boss_id) -> int:
+    """Damage participants dealt that the boss's HP does not reflect."""
+    cur.execute("""
+        SELECT (SELECT COALESCE(SUM(damage_dealt), 0) FROM boss_participants WHERE boss_id = b.boss_id)
+               - (b.health_points - LEAST(b.current_hp,
+                      b.health_points - (SELECT COALESCE(SUM(damage), 0) FROM boss_damage_stripes
+                                         WHERE boss_id = b.boss_id))) AS lost
+        FROM limited_time_bosses b WHERE b.boss_id = %s
+    """, (boss_id,))
+    return cur.fetchone()['lost']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--attacks', type=int, default=300, help='Attacks per worker in the throughput phase')
+    parser.add_argument('--stripes', type=int, default=32, help='Damage stripes per boss (BOSS_DAMAGE_STRIPES)')
+    parser.add_argument('--defeat-hp', type=int, default=250_000, help='HP of the defeat-phase bosses')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {SCHEMA} schema afterwards')
+    args = parser.parse_args(argv)
+
+    dsn = os.environ["DATABASE_URL"]
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    conn.autocommit = True
+    cur = conn.cursor()
+    _setup(cur, args.players, args.defeat_hp)
+
+    print(f"players={args.players} workers={args.workers} attacks/worker={args.attacks} stripes={args.stripes}")
+    try:
+        print(f"{'throughput':<11}{'attacks/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'lock wait s':>13}"
+              f"{'lost damage':>13}{'errors':>8}")
+        for mode in MODES:
+            r = run(dsn, 'throughput', mode, args)
+            lost = _lost_damage(cur, BOSSES[('throughput', mode)])
+            print(f"{mode:<11}{r['per_s']:>11.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                  f"{r['lock_wait_s']:>13.2f}{lost:>13}{r['errors']:>8}")
+
+        print(f"{'defeat':<11}{'attacks':>11}{'defeats reported':>18}{'lost damage':>13}")
+        for mode in MODES:
+            r = run(dsn, 'defeat', mode, args)
+            lost = _lost_damage(cur, BOSSES[('defeat', mode)])
+            print(f"{mode:<11}{r['calls']:>11}{r['defeats']:>18}{lost:>13}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
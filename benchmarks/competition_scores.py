@@ -0,0 +1,235 @@
+"""
+Per-action competition score UPDATEs vs buffered score events folded in batches.
+
+    DATABASE_URL=... python -m benchmarks.competition_scores [--entrants 1000] [--workers 32] [--actions 300]
+
+Builds competition_types, active_competitions, competition_entries (with
+the (active_id, score DESC) index) and migration 9's competition_score_events
+in a scratch schema, with two competitions and the same entrants in each.
+Then `workers` threads run `actions` game actions each, once per mode, with
+the same random players and deltas:
+
+  - direct:    the action's transaction ends with
+               UPDATE competition_entries SET score = score + delta;
+  - streaming: it ends with record_competition_score(), and a folder thread
+               runs the fold statement every --fold-ms, like the leaderboard
+               snapshot refresh.
+
+Prints action throughput and latency, time spent waiting on locks, updates
+and index writes to competition_entries, and how long the fold and the final
+RANK() statement took. Both competitions must end with identical scores.
+"""
+
+import argparse
+import os
+import random
+import statistics
+import time
+
+import psycopg2
+
+from benchmarks._harness import connect, run_concurrently, summarize
+from src.db.competition_scores import COMPETITION_FOLD_LOCK_ID, _FOLD_SQL, _finalize, record_competition_score
+from src.db.migrations import MIGRATIONS
+
+SCHEMA = 'bench_competition_scores'
+APPLICATION_NAME = 'bench_competition_scores'
+MODES = {'direct': 1, 'streaming': 2}  # mode -> active_id
+
+
+def _setup(cur, entrants):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("""
+        CREATE TABLE competition_types (
+            competition_id SERIAL PRIMARY KEY,
+            competition_name VARCHAR(200) NOT NULL,
+            competition_type VARCHAR(50) NOT NULL,
+            scoring_criteria JSONB DEFAULT '[]'
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE active_competitions (
+            active_id SERIAL PRIMARY KEY,
+            competition_id INTEGER REFERENCES competition_types(competition_id),
+            start_date TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            end_date TIMESTAMP,
+            status VARCHAR(50) DEFAULT 'active'
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE competition_entries (
+            entry_id SERIAL PRIMARY KEY,
+            active_id INTEGER REFERENCES active_competitions(active_id) ON DELETE CASCADE,
+            player_id INTEGER NOT NULL,
+            score INTEGER DEFAULT 0,
+            rank INTEGER,
+            metrics JSONB DEFAULT '{}',
+            joined_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(active_id, player_id)
+        )
+    """)
+    cur.execute("CREATE INDEX ON competition_entries (active_id, score DESC)")
+    for statement in next(m for m in MIGRATIONS if m.name == 'competition_score_events').statements:
+        cur.execute(statement)
+
+    # The direct competition scores on nothing, so record_competition_score()
+    # only ever appends events for the streaming one.
+    cur.execute("""
+        INSERT INTO competition_types (competition_id, competition_name, competition_type, scoring_criteria)
+        VALUES (1, 'Direct', 'weekly', '[]'),
+               (2, 'Weekly Sprint', 'weekly', '["scenarios_completed", "exp_earned"]')
+    """)
+    for active_id in MODES.values():
+        cur.execute("""
+            INSERT INTO active_competitions (active_id, competition_id, end_date)
+            VALUES (%s, %s, CURRENT_TIMESTAMP + INTERVAL '7 days')
+        """, (active_id, active_id))
+        cur.execute("""
+            INSERT INTO competition_entries (active_id, player_id)
+            SELECT %s, p FROM generate_series(1, %s) p
+        """, (active_id, entrants))
+
+
+def _worker(dsn, mode, entrants, actions, seed, latencies, errors):
+    active_id = MODES[mode]
+    rng = random.Random(seed)
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    cur = conn.cursor()
+    try:
+        for _ in range(actions):
+            player_id = rng.randint(1, entrants)
+            exp = rng.randint(10, 200)
+            started = time.perf_counter()
+            try:
+                if mode == 'direct':
+                    cur.execute("""
+                        UPDATE competition_entries SET score = score + %s
+                        WHERE active_id = %s AND player_id = %s
+                    """, (1 + exp, active_id, player_id))
+                else:
+                    record_competition_score(cur, player_id, {'scenarios_completed': 1, 'exp_earned': exp})
+                conn.commit()
+            except psycopg2.Error:
+                conn.rollback()
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _fold(cur) -> tuple:
+    """Fold every buffered event; (events, seconds)."""
+    started = time.perf_counter()
+    cur.execute("SELECT pg_advisory_xact_lock(%s)", (COMPETITION_FOLD_LOCK_ID,))
+    cur.execute(_FOLD_SQL, {'only': None, 'limit': None, 'finalizing': []})
+    events = cur.fetchone()['events']
+    cur.connection.commit()
+    return events, time.perf_counter() - started
+
+
+def _folder(dsn, interval_s, folds, stop):
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    cur = conn.cursor()
+    try:
+        while not stop.wait(interval_s):
+            folds.append(_fold(cur))
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _entry_writes(cur) -> tuple:
+    """(row updates, index tuples written) on competition_entries so far."""
+    cur.execute("""
+        SELECT t.n_tup_upd, t.n_tup_hot_upd,
+               (SELECT COUNT(*) FROM pg_indexes WHERE schemaname = %s AND tablename = 'competition_entries') AS indexes
+        FROM pg_stat_user_tables t
+        WHERE t.schemaname = %s AND t.relname = 'competition_entries'
+    """, (SCHEMA, SCHEMA))
+    row = cur.fetchone()
+    cur.connection.commit()  # statistics are snapshotted per transaction
+    return row['n_tup_upd'], (row['n_tup_upd'] - row['n_tup_hot_upd']) * row['indexes']
+
+
+def run_mode(dsn, cur, mode, args) -> dict:
+    before = _entry_writes(cur)
+    latencies, errors, folds = [], [], []
+    helpers = []
+    if mode == 'streaming':
+        helpers.append(lambda stop: _folder(dsn, args.fold_ms / 1000, folds, stop))
+    timing = run_concurrently(dsn, APPLICATION_NAME, args.workers, lambda i: _worker(
+        dsn, mode, args.entrants, args.actions, args.seed + i, latencies, errors), helpers)
+    if mode == 'streaming':
+        folds.append(_fold(cur))
+
+    time.sleep(1)  # let the cumulative statistics catch up
+    after = _entry_writes(cur)
+    folded = [f for f in folds if f[0]]
+    return {
+        **summarize(latencies, timing['elapsed_s']),
+        'lock_wait_s': timing['lock_wait_s'],
+        'entry_updates': after[0] - before[0],
+        'index_writes': after[1] - before[1],
+        'folds': len(folded),
+        'fold_ms': statistics.mean(f[1] for f in folded) * 1000 if folded else 0.0,
+        'errors': len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--entrants', type=int, default=1000)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--actions', type=int, default=300, help='Actions per worker')
+    parser.add_argument('--fold-ms', type=float, default=1000, help='Interval between folds in streaming mode')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {SCHEMA} schema afterwards')
+    args = parser.parse_args(argv)
+
+    dsn = os.environ["DATABASE_URL"]
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    conn.autocommit = True
+    cur = conn.cursor()
+    _setup(cur, args.entrants)
+    conn.autocommit = False
+
+    print(f"entrants={args.entrants} workers={args.workers} actions/worker={args.actions} fold every {args.fold_ms}ms")
+    print(f"{'mode':<10}{'actions/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'lock wait s':>13}"
+          f"{'entry upd':>11}{'index wr':>10}{'folds':>7}{'fold ms':>9}{'errors':>8}")
+    try:
+        for mode in MODES:
+            r = run_mode(dsn, cur, mode, args)
+            print(f"{mode:<10}{r['per_s']:>11.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                  f"{r['lock_wait_s']:>13.2f}{r['entry_updates']:>11}{r['index_writes']:>10}"
+                  f"{r['folds']:>7}{r['fold_ms']:>9.1f}{r['errors']:>8}")
+
+        started = time.perf_counter()
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (COMPETITION_FOLD_LOCK_ID,))
+        _finalize(cur, [MODES['streaming']])
+        conn.commit()
+        print(f"finalize (fold + one RANK() over {args.entrants} entries): "
+              f"{(time.perf_counter() - started) * 1000:.1f}ms")
+
+        cur.execute("""
+            SELECT COUNT(*) AS n
+            FROM competition_entries d
+            JOIN competition_entries s ON s.player_id = d.player_id AND s.active_id = %s
+            WHERE d.active_id = %s AND s.score IS DISTINCT FROM d.score
+        """, (MODES['streaming'], MODES['direct']))
+        print(f"entrants whose streamed score differs from the direct one: {cur.fetchone()['n']}")
+        conn.commit()
+    finally:
+        conn.rollback()
+        conn.autocommit = True
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,185 @@
+"""
+Global challenge contributions on one row vs sharded counters.
+
+    DATABASE_URL=... python -m benchmarks.global_challenges [--players 5000] [--workers 64] [--actions 200]
+
+Builds global_challenges, player_global_contributions and migration 10's
+global_challenge_shards in a scratch schema with two challenges. Then
+`workers` threads each make `actions` contributions from random players,
+once per mode, with the same players and amounts:
+
+  - single:  the old contribute_to_global_challenge(): upsert the player's
+             row, then UPDATE the challenge row with progress + amount and
+             participants = COUNT(DISTINCT player_id) over every contribution;
+  - sharded: GLOBAL_CONTRIBUTION_SQL into a random one of --shards rows.
+
+Prints throughput, latency and time spent waiting on locks, then checks both
+challenges read back the same progress and participant count through
+get_global_challenges()'s rollup.
+"""
+
+import argparse
+import os
+import random
+import time
+
+import psycopg2
+
+from benchmarks._harness import connect, run_concurrently, summarize
+from src.db.migrations import MIGRATIONS
+from src.engine.accounting import GLOBAL_CONTRIBUTION_SQL
+
+SCHEMA = 'bench_global_challenges'
+APPLICATION_NAME = 'bench_global_challenges'
+MODES = {'single': 1, 'sharded': 2}  # mode -> challenge_id
+
+OLD_CONTRIBUTION_SQL = (
+    """
+    INSERT INTO player_global_contributions (player_id, challenge_id, contribution)
+    VALUES (%(player_id)s, %(challenge_id)s, %(amount)s)
+    ON CONFLICT (player_id, challenge_id)
+    DO UPDATE SET contribution = player_global_contributions.contribution + %(amount)s
+    """,
+    """
+    UPDATE global_challenges
+    SET current_progress = current_progress + %(amount)s,
+        participants = (SELECT COUNT(DISTINCT player_id) FROM player_global_contributions
+                        WHERE challenge_id = %(challenge_id)s)
+    WHERE challenge_id = %(challenge_id)s
+    """,
+)
+
+
+def _setup(cur):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("""
+        CREATE TABLE global_challenges (
+            challenge_id SERIAL PRIMARY KEY,
+            challenge_name VARCHAR(200) NOT NULL,
+            target_value INTEGER DEFAULT 10000,
+            current_progress INTEGER DEFAULT 0,
+            participants INTEGER DEFAULT 0,
+            status VARCHAR(50) DEFAULT 'active'
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE player_global_contributions (
+            id SERIAL PRIMARY KEY,
+            player_id INTEGER NOT NULL,
+            challenge_id INTEGER REFERENCES global_challenges(challenge_id) ON DELETE CASCADE,
+            contribution INTEGER DEFAULT 0,
+            reward_claimed BOOLEAN DEFAULT FALSE,
+            contributed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(player_id, challenge_id)
+        )
+    """)
+    for statement in next(m for m in MIGRATIONS if m.name == 'global_challenge_shards').statements:
+        cur.execute(statement)
+    cur.execute("""
+        INSERT INTO global_challenges (challenge_id, challenge_name, target_value)
+        VALUES (1, 'Single row', 1000000), (2, 'Sharded', 1000000)
+    """)
+
+
+def _worker(dsn, mode, players, actions, shards, seed, latencies, errors):
+    challenge_id = MODES[mode]
+    rng = random.Random(seed)
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    cur = conn.cursor()
+    try:
+        for _ in range(actions):
+            params = {'player_id': rng.randint(1, players), 'challenge_id': challenge_id,
+                      'amount': rng.randint(1, 10), 'shard': rng.randrange(shards)}
+            started = time.perf_counter()
+            try:
+                if mode == 'single':
+                    for sql in OLD_CONTRIBUTION_SQL:
+                        cur.execute(sql, params)
+                else:
+                    cur.execute(GLOBAL_CONTRIBUTION_SQL, params)
+                conn.commit()
+            except psycopg2.Error:
+                conn.rollback()
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def run_mode(dsn, mode, args) -> dict:
+    latencies, errors = [], []
+    timing = run_concurrently(dsn, APPLICATION_NAME, args.workers, lambda i: _worker(
+        dsn, mode, args.players, args.actions, args.shards, args.seed + i, latencies, errors))
+    return {
+        **summarize(latencies, timing['elapsed_s']),
+        'lock_wait_s': timing['lock_wait_s'],
+        'errors': len(errors),
+    }
+
+
+def _totals(cur) -> dict:
+    # Same rollup as get_global_challenges().
+    cur.execute("""
+        SELECT gc.challenge_id,
+               gc.current_progress + COALESCE(s.progress, 0) AS progress,
+               gc.participants + COALESCE(s.participants, 0) AS participants,
+               (SELECT COUNT(*) FROM player_global_contributions c
+                WHERE c.challenge_id = gc.challenge_id) AS contributors
+        FROM global_challenges gc
+        LEFT JOIN LATERAL (
+            SELECT SUM(progress) AS progress, SUM(participants) AS participants
+            FROM global_challenge_shards WHERE challenge_id = gc.challenge_id
+        ) s ON TRUE
+        ORDER BY gc.challenge_id
+    """)
+    return {row['challenge_id']: row for row in cur.fetchall()}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=5000)
+    parser.add_argument('--workers', type=int, default=64)
+    parser.add_argument('--actions', type=int, default=200, help='Contributions per worker')
+    parser.add_argument('--shards', type=int, default=16, help='Shard rows per challenge (GLOBAL_CHALLENGE_SHARDS)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {SCHEMA} schema afterwards')
+    args = parser.parse_args(argv)
+
+    dsn = os.environ["DATABASE_URL"]
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    conn.autocommit = True
+    cur = conn.cursor()
+    _setup(cur)
+
+    print(f"players={args.players} workers={args.workers} contributions/worker={args.actions} shards={args.shards}")
+    print(f"{'mode':<9}{'contrib/s':>11}{'p50 ms':>9}{'p95 ms':>9}{'lock wait s':>13}{'errors':>8}")
+    try:
+        results = {}
+        for mode in MODES:
+            results[mode] = r = run_mode(dsn, mode, args)
+            print(f"{mode:<9}{r['per_s']:>11.0f}{r['p50_ms']:>9.2f}{r['p95_ms']:>9.2f}"
+                  f"{r['lock_wait_s']:>13.2f}{r['errors']:>8}")
+
+        totals = _totals(cur)
+        for mode, challenge_id in MODES.items():
+            t = totals[challenge_id]
+            print(f"{mode:<9}progress={t['progress']} participants={t['participants']} "
+                  f"(distinct contributors: {t['contributors']})")
+        single, sharded = totals[MODES['single']], totals[MODES['sharded']]
+        same = (single['progress'], single['participants']) == (sharded['progress'], sharded['participants'])
+        print(f"rolled-up totals match: {'yes' if same else 'NO'}")
+        if results['single']['per_s']:
+            print(f"throughput: {results['sharded']['per_s'] / results['single']['per_s']:.1f}x")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
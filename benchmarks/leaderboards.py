@@ -0,0 +1,297 @@
+"""
+Leaderboard reads by aggregation vs the trigger-maintained leaderboard_cache.
+
+    DATABASE_URL=... python -m benchmarks.leaderboards [--players 100000] [--completions-per-player 50]
+
+Builds player_identity, player_counters, completed_scenarios,
+player_discipline_progress and leaderboard_cache in a scratch schema (100k
+players and 5M completions by default) and times, for each category:
+
+  - before: the old top-10 queries (GROUP BY over every player's rows);
+  - after:  migration 7's statements applied to the scratch schema (backfill,
+            indexes, triggers), then get_top_players()'s index scan, the
+            count-above rank query get_leaderboard_standing() used to run,
+            and a RankIndex (what get_rank_around() and the standing now
+            read) loaded through migration 8's changed_xid.
+
+It also times single-row writes (one completion, one cash change, one level
+up per transaction) before and after the triggers exist, and checks that the
+maintained scores match a fresh aggregation.
+"""
+
+import argparse
+import os
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from src.db.migrations import MIGRATIONS, LEADERBOARD_COLUMNS
+from src.engine.rank_index import RankIndex
+
+SCHEMA = 'bench_leaderboards'
+DISCIPLINES = ('Marketing', 'Finance', 'Operations', 'Human Resources', 'Legal', 'Strategy')
+
+OLD_QUERIES = {
+    'stars': """
+        SELECT pp.player_name, pp.chosen_world, COUNT(cs.id) as total_scenarios,
+               COALESCE(SUM(cs.stars_earned), 0) as total_stars
+        FROM player_identity pp
+        LEFT JOIN completed_scenarios cs ON pp.player_id = cs.player_id
+        GROUP BY pp.player_id, pp.player_name, pp.chosen_world
+        ORDER BY total_stars DESC
+        LIMIT 10
+    """,
+    'wealth': """
+        SELECT pp.player_name, pp.chosen_world, pc.total_cash as score
+        FROM player_identity pp JOIN player_counters pc ON pc.player_id = pp.player_id
+        ORDER BY pc.total_cash DESC
+        LIMIT 10
+    """,
+    'levels': """
+        SELECT pp.player_name, pp.chosen_world,
+               COALESCE(SUM(pdp.current_level), 6) as total_levels
+        FROM player_identity pp
+        LEFT JOIN player_discipline_progress pdp ON pp.player_id = pdp.player_id
+        GROUP BY pp.player_id, pp.player_name, pp.chosen_world
+        ORDER BY total_levels DESC
+        LIMIT 10
+    """,
+}
+
+
+def _top_query(column):
+    # Same statement as src.engine.leaderboards.get_top_players().
+    return f"""
+        SELECT lc.player_id, pi.player_name, pi.chosen_world, lc.{column} AS score,
+               lc.total_stars, lc.total_scenarios_completed AS total_scenarios,
+               lc.total_wealth, lc.total_levels
+        FROM leaderboard_cache lc
+        JOIN player_identity pi ON pi.player_id = lc.player_id
+        ORDER BY lc.{column} DESC, lc.player_id
+        LIMIT 10
+    """
+
+
+def _standing_query(column):
+    # The count-above rank query get_leaderboard_standing() ran before RankIndex.
+    return f"""
+        SELECT me.score,
+               (SELECT COUNT(*) FROM leaderboard_cache WHERE {column} > me.score) AS ahead,
+               (SELECT COUNT(*) FROM leaderboard_cache) AS players
+        FROM (SELECT {column} AS score FROM leaderboard_cache WHERE player_id = %s) me
+    """
+
+
+def _setup(cur, players, per_player):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"SET search_path TO {SCHEMA}")
+    cur.execute("""
+        CREATE TABLE player_identity (
+            player_id SERIAL PRIMARY KEY,
+            player_name VARCHAR(100) NOT NULL,
+            chosen_world VARCHAR(50) NOT NULL DEFAULT 'Modern'
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE player_counters (
+            player_id INTEGER PRIMARY KEY REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            total_cash DECIMAL(15, 2) DEFAULT 10000.00
+        ) WITH (fillfactor = 70)
+    """)
+    cur.execute("""
+        CREATE TABLE completed_scenarios (
+            id SERIAL PRIMARY KEY,
+            player_id INTEGER REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            scenario_id INTEGER NOT NULL,
+            choice_made CHAR(1) NOT NULL,
+            stars_earned INTEGER DEFAULT 1,
+            completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(player_id, scenario_id)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE player_discipline_progress (
+            progress_id SERIAL PRIMARY KEY,
+            player_id INTEGER REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            discipline_name VARCHAR(100) NOT NULL,
+            current_level INTEGER DEFAULT 1,
+            current_exp INTEGER DEFAULT 0,
+            UNIQUE(player_id, discipline_name)
+        )
+    """)
+    cur.execute("""
+        CREATE TABLE leaderboard_cache (
+            id SERIAL PRIMARY KEY,
+            player_id INTEGER REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            total_stars INTEGER DEFAULT 0,
+            total_wealth DECIMAL(15, 2) DEFAULT 0,
+            highest_discipline_level INTEGER DEFAULT 1,
+            total_scenarios_completed INTEGER DEFAULT 0,
+            rank_stars INTEGER,
+            rank_wealth INTEGER,
+            rank_level INTEGER,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            UNIQUE(player_id)
+        )
+    """)
+
+    started = time.perf_counter()
+    cur.execute("""
+        INSERT INTO player_identity (player_name, chosen_world)
+        SELECT 'player ' || n, (ARRAY['Modern', 'Industrial', 'Fantasy'])[1 + n % 3]
+        FROM generate_series(1, %s) n
+    """, (players,))
+    cur.execute("""
+        INSERT INTO player_counters (player_id, total_cash)
+        SELECT player_id, ROUND((random() * 1000000)::numeric, 2) FROM player_identity
+    """)
+    cur.execute("""
+        INSERT INTO completed_scenarios (player_id, scenario_id, choice_made, stars_earned)
+        SELECT p, s, 'A', 1 + (random() * 2)::int
+        FROM generate_series(1, %s) p, generate_series(1, %s) s
+    """, (players, per_player))
+    cur.execute("""
+        INSERT INTO player_discipline_progress (player_id, discipline_name, current_level)
+        SELECT p.player_id, d, 1 + (random() * 9)::int
+        FROM player_identity p, unnest(%s::text[]) d
+    """, (list(DISCIPLINES),))
+    cur.execute("ANALYZE player_identity, player_counters, completed_scenarios, player_discipline_progress")
+    cur.execute("SELECT COUNT(*) AS n FROM completed_scenarios")
+    completions = cur.fetchone()['n']
+    return completions, time.perf_counter() - started
+
+
+def _mean_ms(cur, sql, params=None, iterations=5):
+    cur.execute(sql, params)
+    cur.fetchall()
+    started = time.perf_counter()
+    for _ in range(iterations):
+        cur.execute(sql, params)
+        cur.fetchall()
+    return (time.perf_counter() - started) / iterations * 1000
+
+
+def _time_writes(cur, players, writes, first_scenario):
+    """Mean ms per single-row write transaction, per kind of write."""
+    timings = {}
+    started = time.perf_counter()
+    for i in range(writes):
+        cur.execute("""
+            INSERT INTO completed_scenarios (player_id, scenario_id, choice_made, stars_earned)
+            VALUES (%s, %s, 'B', 3)
+        """, (1 + i * 7919 % players, first_scenario + i))
+    timings['completion'] = (time.perf_counter() - started) / writes * 1000
+
+    started = time.perf_counter()
+    for i in range(writes):
+        cur.execute("UPDATE player_counters SET total_cash = total_cash + 250 WHERE player_id = %s",
+                    (1 + i * 7919 % players,))
+    timings['cash'] = (time.perf_counter() - started) / writes * 1000
+
+    started = time.perf_counter()
+    for i in range(writes):
+        cur.execute("""
+            UPDATE player_discipline_progress SET current_level = current_level + 1
+            WHERE player_id = %s AND discipline_name = %s
+        """, (1 + i * 7919 % players, DISCIPLINES[i % len(DISCIPLINES)]))
+    timings['level'] = (time.perf_counter() - started) / writes * 1000
+    return timings
+
+
+def _rank_index_us(cur, column, me, iterations):
+    """Build a RankIndex from leaderboard_cache; (load ms, rank us, around-5 us, update us)."""
+    started = time.perf_counter()
+    cur.execute(f"SELECT player_id, {column} FROM leaderboard_cache WHERE changed_xid >= 0")
+    index = RankIndex((row['player_id'], row[column]) for row in cur.fetchall())
+    load_ms = (time.perf_counter() - started) * 1000
+
+    timings = []
+    for call in (lambda i: index.rank(me + i), lambda i: index.around(me + i, 5),
+                 lambda i: index.update(me + i, (index.score(me + i) or 0) + 1)):
+        started = time.perf_counter()
+        for i in range(iterations):
+            call(i)
+        timings.append((time.perf_counter() - started) / iterations * 1_000_000)
+    return (load_ms, *timings)
+
+
+def _mismatches(cur) -> int:
+    cur.execute("""
+        SELECT COUNT(*) AS n
+        FROM leaderboard_cache lc
+        JOIN player_counters pc ON pc.player_id = lc.player_id
+        LEFT JOIN (SELECT player_id, SUM(stars_earned) AS stars, COUNT(*) AS completed
+                   FROM completed_scenarios GROUP BY player_id) s ON s.player_id = lc.player_id
+        LEFT JOIN (SELECT player_id, SUM(current_level) AS total
+                   FROM player_discipline_progress GROUP BY player_id) d ON d.player_id = lc.player_id
+        WHERE lc.total_stars <> COALESCE(s.stars, 0)
+           OR lc.total_scenarios_completed <> COALESCE(s.completed, 0)
+           OR lc.total_wealth <> pc.total_cash
+           OR lc.total_levels <> COALESCE(d.total, 6)
+    """)
+    return cur.fetchone()['n']
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=100_000)
+    parser.add_argument('--completions-per-player', type=int, default=50,
+                        help='Completed scenarios per player (default 50: 5M at 100k players)')
+    parser.add_argument('--iterations', type=int, default=5)
+    parser.add_argument('--writes', type=int, default=1000, help='Single-row writes timed per kind')
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {SCHEMA} schema afterwards')
+    args = parser.parse_args(argv)
+
+    leaderboard_migrations = [m for m in MIGRATIONS if m.name in ('leaderboards', 'leaderboard_changed_xid')]
+    conn = psycopg2.connect(os.environ["DATABASE_URL"], cursor_factory=RealDictCursor)
+    conn.autocommit = True
+    cur = conn.cursor()
+    try:
+        completions, load_s = _setup(cur, args.players, args.completions_per_player)
+        print(f"players={args.players} completions={completions} loaded in {load_s:.1f}s")
+        # Scenario ids past the loaded ones, so timed inserts never conflict.
+        scenario_base = args.completions_per_player + 1
+
+        before = {c: _mean_ms(cur, sql, iterations=args.iterations) for c, sql in OLD_QUERIES.items()}
+        writes_before = _time_writes(cur, args.players, args.writes, scenario_base)
+
+        started = time.perf_counter()
+        for migration in leaderboard_migrations:
+            for statement in migration.statements:
+                cur.execute(statement)
+        cur.execute("ANALYZE leaderboard_cache")
+        migrate_s = time.perf_counter() - started
+
+        me = args.players // 2
+        after = {c: _mean_ms(cur, _top_query(col), iterations=args.iterations)
+                 for c, col in LEADERBOARD_COLUMNS.items()}
+        standing = {c: _mean_ms(cur, _standing_query(col), (me,), iterations=args.iterations)
+                    for c, col in LEADERBOARD_COLUMNS.items()}
+        me = max(1, min(me, args.players - 1000))
+        ranked = {c: _rank_index_us(cur, col, me, 1000) for c, col in LEADERBOARD_COLUMNS.items()}
+        writes_after = _time_writes(cur, args.players, args.writes, scenario_base + args.writes)
+        mismatches = _mismatches(cur)
+
+        print(f"migrations 7-8 (backfill + indexes + triggers): {migrate_s:.1f}s")
+        print(f"{'category':<10}{'aggregate ms':>14}{'top-10 ms':>12}{'speedup':>10}{'standing ms':>14}")
+        for category in LEADERBOARD_COLUMNS:
+            print(f"{category:<10}{before[category]:>14.2f}{after[category]:>12.3f}"
+                  f"{before[category] / after[category]:>9.0f}x{standing[category]:>14.2f}")
+        print(f"{'RankIndex':<10}{'load ms':>10}{'rank us':>10}{'around us':>11}{'update us':>11}")
+        for category, (load_ms, rank_us, around_us, update_us) in ranked.items():
+            print(f"{category:<10}{load_ms:>10.0f}{rank_us:>10.1f}{around_us:>11.1f}{update_us:>11.1f}")
+        print(f"{'write':<10}{'no triggers ms':>16}{'triggers ms':>14}")
+        for kind in writes_before:
+            print(f"{kind:<10}{writes_before[kind]:>16.3f}{writes_after[kind]:>14.3f}")
+        print(f"players whose maintained scores differ from a fresh aggregate: {mismatches}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
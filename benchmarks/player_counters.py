@@ -0,0 +1,196 @@
+"""
+Row-lock waits on the wide player_profiles row vs the split player_counters.
+
+    DATABASE_URL=... python -m benchmarks.player_counters [--players 20] [--workers 32] [--actions 200]
+
+Builds throwaway tables in a scratch schema: `wide`, shaped like
+player_profiles before migration 5 (identity and counters in one row, with
+the name, total_cash and last_played indexes), and `identity` + `counters`,
+shaped like player_identity and player_counters (fillfactor 70, no index on
+any counter). Then `workers` threads each run `actions` game actions against
+a small pool of players, once per layout:
+
+  - a counter action locks the row, holds it for --hold-ms of "game logic"
+    and writes cash/morale/last_played, like a scenario choice;
+  - every --identity-every'th action instead updates an identity column
+    (onboarding, job level, password rehash).
+
+Prints throughput, latency, time backends spent waiting on locks (sampled
+from pg_stat_activity) and the share of updates that were HOT.
+"""
+
+import argparse
+import os
+import random
+import time
+
+import psycopg2
+
+from benchmarks._harness import connect, run_concurrently, summarize
+
+SCHEMA = 'bench_player_counters'
+APPLICATION_NAME = 'bench_player_counters'
+
+_IDENTITY_COLUMNS = """
+    player_name VARCHAR(100) NOT NULL,
+    password_hash VARCHAR(255),
+    chosen_world VARCHAR(50) NOT NULL DEFAULT 'Modern',
+    chosen_industry VARCHAR(100) NOT NULL DEFAULT 'Restaurant',
+    career_path VARCHAR(50) NOT NULL DEFAULT 'entrepreneur',
+    job_title VARCHAR(100),
+    job_level INTEGER DEFAULT 1,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    onboarding_seen BOOLEAN DEFAULT FALSE
+"""
+_COUNTER_COLUMNS = """
+    total_cash DECIMAL(15, 2) DEFAULT 10000.00,
+    business_reputation INTEGER DEFAULT 50,
+    current_month INTEGER DEFAULT 1,
+    team_morale INTEGER DEFAULT 100,
+    brand_equity INTEGER DEFAULT 100,
+    fiscal_quarter INTEGER DEFAULT 1,
+    decisions_this_quarter INTEGER DEFAULT 0,
+    last_played TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    state_version BIGINT NOT NULL DEFAULT 0
+"""
+
+# layout -> (table locked and written by counter actions, table written by identity actions)
+LAYOUTS = {
+    'wide': ('wide', 'wide'),
+    'split': ('counters', 'identity'),
+}
+
+
+def _setup(cur, players: int):
+    cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+    cur.execute(f"CREATE SCHEMA {SCHEMA}")
+    cur.execute(f"CREATE TABLE {SCHEMA}.wide (player_id SERIAL PRIMARY KEY, {_IDENTITY_COLUMNS}, {_COUNTER_COLUMNS})")
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.wide (LOWER(player_name))")
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.wide (total_cash DESC)")
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.wide (last_played DESC)")
+    cur.execute(f"CREATE TABLE {SCHEMA}.identity (player_id SERIAL PRIMARY KEY, {_IDENTITY_COLUMNS})")
+    cur.execute(f"CREATE INDEX ON {SCHEMA}.identity (LOWER(player_name))")
+    cur.execute(f"""
+        CREATE TABLE {SCHEMA}.counters (
+            player_id INTEGER PRIMARY KEY REFERENCES {SCHEMA}.identity(player_id) ON DELETE CASCADE,
+            {_COUNTER_COLUMNS}
+        ) WITH (fillfactor = 70)
+    """)
+    for table in ('wide', 'identity'):
+        cur.execute(f"""
+            INSERT INTO {SCHEMA}.{table} (player_name, password_hash, job_title)
+            SELECT 'player ' || n, repeat('x', 60), 'Manager' FROM generate_series(1, %s) n
+        """, (players,))
+    cur.execute(f"INSERT INTO {SCHEMA}.counters (player_id) SELECT player_id FROM {SCHEMA}.identity")
+
+
+def _worker(dsn, layout, players, actions, hold_s, identity_every, seed, latencies, errors):
+    counters_table, identity_table = LAYOUTS[layout]
+    rng = random.Random(seed)
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    cur = conn.cursor()
+    try:
+        for n in range(actions):
+            player_id = rng.randint(1, players)
+            started = time.perf_counter()
+            try:
+                if identity_every and n % identity_every == identity_every - 1:
+                    cur.execute(f"""
+                        UPDATE {SCHEMA}.{identity_table}
+                        SET job_level = job_level + 1, onboarding_seen = TRUE
+                        WHERE player_id = %s
+                    """, (player_id,))
+                else:
+                    cur.execute(f"""
+                        SELECT total_cash, team_morale FROM {SCHEMA}.{counters_table}
+                        WHERE player_id = %s FOR NO KEY UPDATE
+                    """, (player_id,))
+                    cur.fetchone()
+                    time.sleep(hold_s)
+                    cur.execute(f"""
+                        UPDATE {SCHEMA}.{counters_table}
+                        SET total_cash = total_cash + %s,
+                            team_morale = LEAST(100, GREATEST(0, team_morale + %s)),
+                            decisions_this_quarter = decisions_this_quarter + 1,
+                            last_played = CURRENT_TIMESTAMP,
+                            state_version = state_version + 1
+                        WHERE player_id = %s
+                    """, (rng.randint(-500, 500), rng.randint(-5, 5), player_id))
+                conn.commit()
+            except psycopg2.Error:
+                conn.rollback()
+                errors.append(1)
+                continue
+            latencies.append(time.perf_counter() - started)
+    finally:
+        cur.close()
+        conn.close()
+
+
+def _update_counts(cur, tables) -> dict:
+    cur.execute("""
+        SELECT relname, n_tup_upd, n_tup_hot_upd FROM pg_stat_user_tables
+        WHERE schemaname = %s AND relname = ANY(%s)
+    """, (SCHEMA, list(tables)))
+    return {row['relname']: (row['n_tup_upd'], row['n_tup_hot_upd']) for row in cur.fetchall()}
+
+
+def run_layout(dsn, cur, layout, args) -> dict:
+    tables = set(LAYOUTS[layout])
+    before = _update_counts(cur, tables)
+    latencies, errors = [], []
+    timing = run_concurrently(dsn, APPLICATION_NAME, args.workers, lambda i: _worker(
+        dsn, layout, args.players, args.actions, args.hold_ms / 1000,
+        args.identity_every, args.seed + i, latencies, errors))
+
+    time.sleep(1)  # let the cumulative statistics catch up
+    after = _update_counts(cur, tables)
+    updates = sum(after.get(t, (0, 0))[0] - before.get(t, (0, 0))[0] for t in tables)
+    hot = sum(after.get(t, (0, 0))[1] - before.get(t, (0, 0))[1] for t in tables)
+    return {
+        **summarize(latencies, timing['elapsed_s']),
+        'lock_wait_s': timing['lock_wait_s'],
+        'hot_pct': 100 * hot / updates if updates else 0.0,
+        'errors': len(errors),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--players', type=int, default=20)
+    parser.add_argument('--workers', type=int, default=32)
+    parser.add_argument('--actions', type=int, default=200, help='Actions per worker')
+    parser.add_argument('--hold-ms', type=float, default=2.0, help='Time a counter action holds its row lock')
+    parser.add_argument('--identity-every', type=int, default=5, help='Every Nth action writes identity (0: never)')
+    parser.add_argument('--seed', type=int, default=1)
+    parser.add_argument('--keep', action='store_true', help=f'Keep the {SCHEMA} schema afterwards')
+    args = parser.parse_args(argv)
+
+    dsn = os.environ["DATABASE_URL"]
+    conn = connect(dsn, SCHEMA, APPLICATION_NAME)
+    conn.autocommit = True
+    cur = conn.cursor()
+    _setup(cur, args.players)
+
+    print(f"players={args.players} workers={args.workers} actions/worker={args.actions} "
+          f"hold={args.hold_ms}ms identity_every={args.identity_every}")
+    print(f"{'layout':<8}{'actions/s':>12}{'p50 ms':>10}{'p95 ms':>10}{'lock wait s':>14}{'HOT %':>8}{'errors':>8}")
+    results = {}
+    try:
+        for layout in LAYOUTS:
+            results[layout] = r = run_layout(dsn, cur, layout, args)
+            print(f"{layout:<8}{r['per_s']:>12.0f}{r['p50_ms']:>10.2f}{r['p95_ms']:>10.2f}"
+                  f"{r['lock_wait_s']:>14.2f}{r['hot_pct']:>8.1f}{r['errors']:>8}")
+    finally:
+        if not args.keep:
+            cur.execute(f"DROP SCHEMA IF EXISTS {SCHEMA} CASCADE")
+        cur.close()
+        conn.close()
+
+    wide, split = results.get('wide'), results.get('split')
+    if wide and split and wide['lock_wait_s']:
+        print(f"lock wait reduction: {100 * (1 - split['lock_wait_s'] / wide['lock_wait_s']):.0f}%")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Plain vs prepared execution of the registered hot statements.
+
+    DATABASE_URL=... python -m benchmarks.prepared_statements [--iterations 2000] [--player-id N]
+
+Runs every statement in src.db.prepared.PREPARED_STATEMENTS on one
+connection, first as a plain parameterised query and then through
+execute_prepared(), and prints the mean round trip per call for each.
+Parameters come from each statement's `params` names, filled in with one
+player, a scenario they completed (or 1) and one of their disciplines.
+"""
+
+import argparse
+import os
+import time
+
+import psycopg2
+from psycopg2.extras import RealDictCursor
+
+from src.db.prepared import PREPARED_STATEMENTS, execute_prepared
+
+
+def _params_for(statement, samples):
+    return tuple(samples[param] for param in statement.params)
+
+
+def _time_calls(fn, iterations):
+    started = time.perf_counter()
+    for _ in range(iterations):
+        fn()
+    return (time.perf_counter() - started) / iterations * 1_000_000
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--player-id', type=int)
+    args = parser.parse_args(argv)
+
+    conn = psycopg2.connect(os.environ["DATABASE_URL"], cursor_factory=RealDictCursor)
+    conn.autocommit = True
+    cur = conn.cursor()
+
+    player_id = args.player_id
+    if player_id is None:
+        cur.execute("SELECT player_id FROM player_profiles ORDER BY player_id LIMIT 1")
+        row = cur.fetchone()
+        if row is None:
+            raise SystemExit("No players found; create one or pass --player-id")
+        player_id = row['player_id']
+    cur.execute("SELECT scenario_id FROM completed_scenarios WHERE player_id = %s LIMIT 1", (player_id,))
+    row = cur.fetchone()
+    scenario_id = row['scenario_id'] if row else 1
+    cur.execute("SELECT discipline_name FROM player_discipline_progress WHERE player_id = %s LIMIT 1", (player_id,))
+    row = cur.fetchone()
+    samples = {'player_id': player_id, 'scenario_id': scenario_id,
+               'discipline': row['discipline_name'] if row else 'Marketing'}
+
+    print(f"player_id={player_id} scenario_id={scenario_id} discipline={samples['discipline']} "
+          f"iterations={args.iterations}")
+    print(f"{'statement':<26}{'plain us':>12}{'prepared us':>14}{'speedup':>10}")
+    for name, statement in PREPARED_STATEMENTS.items():
+        params = _params_for(statement, samples)
+
+        def plain():
+            cur.execute(statement.sql, params)
+            cur.fetchall()
+
+        def prepared():
+            execute_prepared(cur, statement, params)
+            cur.fetchall()
+
+        plain()
+        prepared()
+        plain_us = _time_calls(plain, args.iterations)
+        prepared_us = _time_calls(prepared, args.iterations)
+        print(f"{name:<26}{plain_us:>12.1f}{prepared_us:>14.1f}{plain_us / prepared_us:>9.2f}x")
+
+    cur.close()
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
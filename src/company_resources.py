@@ -14,7 +14,12 @@ Also handles:
 - Feature gating based on resource levels
 """
 
-from src.database import get_connection, return_connection
+from flask import g, has_request_context
+
+from src.database import get_connection, return_connection, get_catalog, get_current_unit_of_work, env_number
+from src.db.invalidation import register_invalidation_handler
+from src.db.prepared import execute_prepared, COMPANY_RESOURCES
+from src.engine.player_cache import PlayerStateCache, known_state_version
 import random
 
 FEATURE_REQUIREMENTS = {
@@ -80,6 +85,35 @@ def get_feature_access(player_id: int) -> dict:
     return access
 
 
+def feature_denial(reqs: dict, resources: dict):
+    """Why a get_company_resources() dict fails a feature's requirements, or None."""
+    capital = resources.get('capital', 0)
+    morale = resources.get('morale', 100)
+    brand = resources.get('brand_equity', 100)
+    
+    if 'min_capital' in reqs and capital < reqs['min_capital']:
+        return f"Need ${reqs['min_capital']:,} Capital"
+    if 'min_morale' in reqs and morale < reqs['min_morale']:
+        return f"Need {reqs['min_morale']}% Morale"
+    if 'min_brand' in reqs and brand < reqs['min_brand']:
+        return f"Need {reqs['min_brand']}% Brand HP"
+    if 'capital_cost' in reqs and capital < reqs['capital_cost']:
+        return f"Need ${reqs['capital_cost']:,} to proceed"
+    if 'morale_cost' in reqs and morale < reqs['morale_cost']:
+        return f"Need {reqs['morale_cost']}% Morale to proceed"
+    return None
+
+
+def feature_costs(reqs: dict) -> dict:
+    """Resource changes charged for entering a feature."""
+    costs = {}
+    if 'capital_cost' in reqs:
+        costs['capital'] = -reqs['capital_cost']
+    if 'morale_cost' in reqs:
+        costs['morale'] = -reqs['morale_cost']
+    return costs
+
+
 def check_feature_requirements(player_id: int, feature_name: str) -> dict:
     """Check if player meets requirements for a feature without deducting costs.
     
@@ -95,49 +129,109 @@ def check_feature_requirements(player_id: int, feature_name: str) -> dict:
     if not resources:
         return {'allowed': False, 'reason': 'Could not load player resources', 'costs': {}}
     
-    capital = resources.get('capital', 0)
-    morale = resources.get('morale', 100)
-    brand = resources.get('brand_equity', 100)
-    
-    if 'min_capital' in reqs and capital < reqs['min_capital']:
-        return {'allowed': False, 'reason': f"Need ${reqs['min_capital']:,} Capital", 'costs': {}}
-    if 'min_morale' in reqs and morale < reqs['min_morale']:
-        return {'allowed': False, 'reason': f"Need {reqs['min_morale']}% Morale", 'costs': {}}
-    if 'min_brand' in reqs and brand < reqs['min_brand']:
-        return {'allowed': False, 'reason': f"Need {reqs['min_brand']}% Brand HP", 'costs': {}}
-    
-    costs = {}
-    if 'capital_cost' in reqs:
-        if capital < reqs['capital_cost']:
-            return {'allowed': False, 'reason': f"Need ${reqs['capital_cost']:,} to proceed", 'costs': {}}
-        costs['capital'] = -reqs['capital_cost']
-    if 'morale_cost' in reqs:
-        if morale < reqs['morale_cost']:
-            return {'allowed': False, 'reason': f"Need {reqs['morale_cost']}% Morale to proceed", 'costs': {}}
-        costs['morale'] = -reqs['morale_cost']
-    
-    return {'allowed': True, 'reason': None, 'costs': costs}
+    reason = feature_denial(reqs, resources)
+    if reason:
+        return {'allowed': False, 'reason': reason, 'costs': {}}
+    return {'allowed': True, 'reason': None, 'costs': feature_costs(reqs)}
+
+
+# The requirements and the deduction are one conditional UPDATE, so two
+# requests racing for the last of a player's morale cannot both get in; the
+# news entry rides along as CTEs that only fire when the UPDATE matched.
+# `before` is the statement's snapshot, used to explain a denial.
+FEATURE_GATE_SQL = """
+    WITH before AS (
+        SELECT total_cash, team_morale, brand_equity
+        FROM player_counters
+        WHERE player_id = %(player_id)s
+    ),
+    gate AS (
+        UPDATE player_counters
+        SET total_cash = total_cash - %(capital_cost)s,
+            team_morale = LEAST(100, GREATEST(0, COALESCE(team_morale, 100) - %(morale_cost)s))
+        WHERE player_id = %(player_id)s
+        AND COALESCE(total_cash, 0) >= %(min_capital)s
+        AND COALESCE(team_morale, 100) >= %(min_morale)s
+        AND COALESCE(brand_equity, 100) >= %(min_brand)s
+        RETURNING total_cash, team_morale, brand_equity
+    ),
+    news AS (
+        INSERT INTO news_ticker (player_id, news_text, news_type, capital_change, morale_change, brand_change)
+        SELECT %(player_id)s, %(headline)s, %(news_type)s, %(capital_change)s, %(morale_change)s, 0
+        FROM gate
+    ),
+    trimmed AS (
+        DELETE FROM news_ticker 
+        WHERE player_id = %(player_id)s 
+        AND EXISTS (SELECT 1 FROM gate)
+        AND news_id NOT IN (
+            SELECT news_id FROM news_ticker 
+            WHERE player_id = %(player_id)s 
+            ORDER BY created_at DESC, news_id DESC
+            LIMIT %(keep_news)s
+        )
+    )
+    SELECT before.total_cash, before.team_morale, before.brand_equity,
+           gate.total_cash AS new_total_cash, gate.team_morale AS new_team_morale,
+           gate.brand_equity AS new_brand_equity
+    FROM before LEFT JOIN gate ON true
+"""
 
 
 def deduct_feature_cost(player_id: int, feature_name: str) -> dict:
-    """Deduct the cost of accessing a feature from player resources.
+    """Check a feature's requirements and deduct its cost in one statement.
     
     Returns:
         dict with 'success' (bool), 'message' (str), 'new_resources' (dict)
     """
-    check = check_feature_requirements(player_id, feature_name)
-    
-    if not check['allowed']:
-        return {'success': False, 'message': check['reason'], 'new_resources': None}
-    
-    costs = check['costs']
+    reqs = FEATURE_REQUIREMENTS.get(feature_name)
+    costs = feature_costs(reqs) if reqs else {}
     if not costs:
+        check = check_feature_requirements(player_id, feature_name)
+        if not check['allowed']:
+            return {'success': False, 'message': check['reason'], 'new_resources': None}
         return {'success': True, 'message': 'No cost required', 'new_resources': get_company_resources(player_id)}
     
     capital_change = costs.get('capital', 0)
     morale_change = costs.get('morale', 0)
+    headline, news_type = news_headline(capital_change, morale_change)
+    
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute(FEATURE_GATE_SQL, {
+        'player_id': player_id,
+        'capital_cost': -capital_change,
+        'morale_cost': -morale_change,
+        'min_capital': max(reqs.get('min_capital', 0), reqs.get('capital_cost', 0)),
+        'min_morale': max(reqs.get('min_morale', 0), reqs.get('morale_cost', 0)),
+        'min_brand': reqs.get('min_brand', 0),
+        'headline': headline,
+        'news_type': news_type,
+        'capital_change': capital_change,
+        'morale_change': morale_change,
+        'keep_news': NEWS_TICKER_LIMIT - 1,
+    })
+    row = cur.fetchone()
+    conn.commit()
+    cur.close()
+    return_connection(conn)
     
-    result = update_company_resources(player_id, capital_change=capital_change, morale_change=morale_change)
+    if row is None:
+        return {'success': False, 'message': 'Could not load player resources', 'new_resources': None}
+    if row['new_total_cash'] is None:
+        reason = feature_denial(reqs, {
+            'capital': float(row['total_cash'] or 0),
+            'morale': row['team_morale'] if row['team_morale'] is not None else 100,
+            'brand_equity': row['brand_equity'] if row['brand_equity'] is not None else 100,
+        })
+        return {'success': False, 'message': reason or 'Not enough resources', 'new_resources': None}
+    
+    invalidate_company_resources(player_id)
+    result = format_resource_update({
+        'total_cash': row['new_total_cash'],
+        'team_morale': row['new_team_morale'],
+        'brand_equity': row['new_brand_equity'],
+    })
     
     if result.get('game_over'):
         return {
@@ -147,7 +241,7 @@ def deduct_feature_cost(player_id: int, feature_name: str) -> dict:
             'game_over': True
         }
     
-    label = FEATURE_REQUIREMENTS.get(feature_name, {}).get('label', feature_name)
+    label = reqs.get('label', feature_name)
     cost_parts = []
     if capital_change:
         cost_parts.append(f"${abs(capital_change):,}")
@@ -381,21 +475,103 @@ def seed_quarterly_events():
     return_connection(conn)
 
 
+COMPANY_RESOURCES_QUERY = """
+    SELECT total_cash, team_morale, brand_equity, fiscal_quarter, decisions_this_quarter
+    FROM player_counters
+    WHERE player_id = %s
+"""
+
+
+# Company resources are cached at two levels:
+#  - per request, until the request next commits, so a page render (view,
+#    feature checks, template context processor) reads them at most once;
+#  - per worker, keyed by player_counters.state_version, and served only when
+#    this request has already confirmed that version (engine.load_player()
+#    does), so a hit costs no query at all.
+# update_company_resources(), record_decision() and advance_quarter() also
+# drop both entries explicitly; other workers' writes evict the per-worker
+# entry through the invalidation bus.
+_resources_cache = None
+_resources_stats = {'request_hits': 0, 'shared_hits': 0, 'misses': 0, 'invalidations': 0}
+
+
+def _get_resources_cache() -> PlayerStateCache:
+    global _resources_cache
+    if _resources_cache is None:
+        _resources_cache = PlayerStateCache(env_number("COMPANY_RESOURCES_CACHE_SIZE", 1000))
+        register_invalidation_handler('player', _resources_cache.discard_older)
+    return _resources_cache
+
+
+def _request_resources():
+    """This request's cached resources by player_id, or None outside a
+    request's unit of work. Emptied whenever the request commits."""
+    if not has_request_context():
+        return None
+    uow = get_current_unit_of_work(create=False)
+    if uow is None:
+        return None
+    key = (uow.commits, bool(g.get('_db_wrote')))
+    cached = g.get('_company_resources')
+    if cached is None or cached[0] != key:
+        cached = g._company_resources = (key, {})
+    return cached[1]
+
+
+def get_company_resources_cache_stats() -> dict:
+    """Hit/miss counters for get_company_resources() in this worker."""
+    stats = dict(_resources_stats)
+    lookups = stats['request_hits'] + stats['shared_hits'] + stats['misses']
+    stats['hit_rate'] = round((stats['request_hits'] + stats['shared_hits']) / lookups, 4) if lookups else 0.0
+    stats['entries'] = _get_resources_cache().stats()['entries']
+    return stats
+
+
+def invalidate_company_resources(player_id: int):
+    """Forget cached resources for a player after changing them."""
+    request_cache = _request_resources()
+    if request_cache is not None:
+        request_cache.pop(player_id, None)
+    _get_resources_cache().discard(player_id)
+    _resources_stats['invalidations'] += 1
+
+
 def get_company_resources(player_id: int) -> dict:
     """Get the current company resource levels."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT total_cash, team_morale, brand_equity, fiscal_quarter, decisions_this_quarter
-        FROM player_profiles
-        WHERE player_id = %s
-    """, (player_id,))
-    
-    result = cur.fetchone()
-    cur.close()
-    return_connection(conn)
-    
+    request_cache = _request_resources()
+    if request_cache is not None and player_id in request_cache:
+        _resources_stats['request_hits'] += 1
+        return dict(request_cache[player_id])
+    
+    shared = _get_resources_cache()
+    version = known_state_version(player_id)
+    entry = shared.get(player_id) if version is not None else None
+    if entry is not None and entry[0] == version:
+        _resources_stats['shared_hits'] += 1
+        resources = entry[1]['resources']
+    else:
+        _resources_stats['misses'] += 1
+        conn = get_connection()
+        cur = conn.cursor()
+        
+        execute_prepared(cur, COMPANY_RESOURCES, (player_id,))
+        
+        result = cur.fetchone()
+        cur.close()
+        return_connection(conn)
+        
+        resources = format_company_resources(result)
+        if result and result['clean']:
+            shared.put(player_id, result['state_version'], {'resources': resources})
+    
+    request_cache = _request_resources()
+    if request_cache is not None:
+        request_cache[player_id] = resources
+    return dict(resources)
+
+
+def format_company_resources(result) -> dict:
+    """Shape a COMPANY_RESOURCES_QUERY row (or None) into the resources dict."""
     if result:
         morale_val = result['team_morale'] or 100
         brand_val = result['brand_equity'] or 100
@@ -429,7 +605,7 @@ def update_company_resources(player_id: int, capital_change: float = 0,
     cur = conn.cursor()
     
     cur.execute("""
-        UPDATE player_profiles
+        UPDATE player_counters
         SET total_cash = GREATEST(0, total_cash + %s),
             team_morale = LEAST(100, GREATEST(0, team_morale + %s)),
             brand_equity = LEAST(100, GREATEST(0, brand_equity + %s))
@@ -441,14 +617,41 @@ def update_company_resources(player_id: int, capital_change: float = 0,
     conn.commit()
     cur.close()
     return_connection(conn)
+    invalidate_company_resources(player_id)
+    
+    if result and (capital_change != 0 or morale_change != 0 or brand_change != 0):
+        add_news_ticker(player_id, capital_change, morale_change, brand_change)
     
+    return format_resource_update(result)
+
+
+def apply_resource_changes(row: dict, capital_change: float = 0,
+                           morale_change: int = 0, brand_change: int = 0) -> dict:
+    """In-memory update_company_resources(): the same clamping, on a row with
+    total_cash, team_morale and brand_equity."""
+    def shift(value, change, upper=None):
+        if value is None:
+            return None
+        value = max(0, value + change)
+        return min(upper, value) if upper is not None else value
+    
+    cash = row['total_cash']
+    cash = shift(float(cash) if cash is not None else None, capital_change)
+    return {
+        **row,
+        # total_cash is DECIMAL(15, 2)
+        'total_cash': round(cash, 2) if cash is not None else None,
+        'team_morale': shift(row['team_morale'], morale_change, 100),
+        'brand_equity': shift(row['brand_equity'], brand_change, 100),
+    }
+
+
+def format_resource_update(result) -> dict:
+    """Shape an updated total_cash/team_morale/brand_equity row (or None)."""
     if result:
         is_bankrupt = result['brand_equity'] <= 0
         is_demoralized = result['team_morale'] <= 0
         
-        if capital_change != 0 or morale_change != 0 or brand_change != 0:
-            add_news_ticker(player_id, capital_change, morale_change, brand_change)
-        
         return {
             'capital': float(result['total_cash']),
             'morale': result['team_morale'],
@@ -467,7 +670,7 @@ def record_decision(player_id: int) -> dict:
     cur = conn.cursor()
     
     cur.execute("""
-        UPDATE player_profiles
+        UPDATE player_counters
         SET decisions_this_quarter = decisions_this_quarter + 1
         WHERE player_id = %s
         RETURNING fiscal_quarter, decisions_this_quarter
@@ -475,6 +678,7 @@ def record_decision(player_id: int) -> dict:
     
     result = cur.fetchone()
     conn.commit()
+    invalidate_company_resources(player_id)
     
     quarter_result = {
         'current_quarter': result['fiscal_quarter'],
@@ -513,7 +717,7 @@ def advance_quarter(player_id: int, cur, conn, current_quarter: int) -> dict:
     ))
     
     cur.execute("""
-        UPDATE player_profiles
+        UPDATE player_counters
         SET fiscal_quarter = fiscal_quarter + 1,
             decisions_this_quarter = 0
         WHERE player_id = %s
@@ -522,6 +726,7 @@ def advance_quarter(player_id: int, cur, conn, current_quarter: int) -> dict:
     
     new_quarter = cur.fetchone()['fiscal_quarter']
     conn.commit()
+    invalidate_company_resources(player_id)
     
     quarterly_event = trigger_quarterly_event(player_id)
     
@@ -546,52 +751,67 @@ def trigger_quarterly_event(player_id: int) -> dict:
     """, (player_id,))
     active_abilities = [r['ability_code'] for r in cur.fetchall()]
     
-    cur.execute("SELECT * FROM quarterly_events")
-    events = cur.fetchall()
     cur.close()
     return_connection(conn)
     
-    for event in events:
-        if 'liability_shield' in active_abilities and event['event_type'] == 'lawsuit':
+    event = roll_quarterly_event(active_abilities)
+    if event is None:
+        return None
+    
+    result = format_quarterly_event(event)
+    impacts = result['impacts']
+    update_company_resources(
+        player_id,
+        capital_change=impacts['capital'],
+        morale_change=impacts['morale'],
+        brand_change=impacts['brand']
+    )
+    
+    add_news_ticker(
+        player_id,
+        impacts['capital'],
+        impacts['morale'],
+        impacts['brand'],
+        event['event_title'],
+        'crisis' if event['is_crisis'] else 'opportunity'
+    )
+    
+    return result
+
+
+def roll_quarterly_event(active_ability_codes) -> dict:
+    """Pick this quarter's event (a quarterly_events row), or None."""
+    for event in get_catalog().all('quarterly_events'):
+        if 'liability_shield' in active_ability_codes and event['event_type'] == 'lawsuit':
             continue
         
         if random.random() < float(event['probability']):
-            update_company_resources(
-                player_id,
-                capital_change=float(event['capital_impact'] or 0),
-                morale_change=event['morale_impact'] or 0,
-                brand_change=event['brand_impact'] or 0
-            )
-            
-            add_news_ticker(
-                player_id,
-                float(event['capital_impact'] or 0),
-                event['morale_impact'] or 0,
-                event['brand_impact'] or 0,
-                event['event_title'],
-                'crisis' if event['is_crisis'] else 'opportunity'
-            )
-            
-            return {
-                'event_type': event['event_type'],
-                'title': event['event_title'],
-                'description': event['event_description'],
-                'is_crisis': event['is_crisis'],
-                'impacts': {
-                    'capital': float(event['capital_impact'] or 0),
-                    'morale': event['morale_impact'] or 0,
-                    'brand': event['brand_impact'] or 0
-                }
-            }
+            return event
     
     return None
 
 
-def add_news_ticker(player_id: int, capital_change: float = 0, morale_change: int = 0, 
-                    brand_change: int = 0, headline: str = None, news_type: str = 'info'):
-    """Add an entry to the player's news ticker."""
+def format_quarterly_event(event: dict) -> dict:
+    return {
+        'event_type': event['event_type'],
+        'title': event['event_title'],
+        'description': event['event_description'],
+        'is_crisis': event['is_crisis'],
+        'impacts': {
+            'capital': float(event['capital_impact'] or 0),
+            'morale': event['morale_impact'] or 0,
+            'brand': event['brand_impact'] or 0
+        }
+    }
+
+
+NEWS_TICKER_LIMIT = 20
+
+
+def news_headline(capital_change: float = 0, morale_change: int = 0, brand_change: int = 0,
+                  headline: str = None, news_type: str = 'info'):
+    """(headline, news_type) for a ticker entry, or None when there is no news."""
     if not headline:
-        parts = []
         if capital_change > 0:
             headline = f"Revenue Up! +${capital_change:,.0f}"
             news_type = 'success'
@@ -611,7 +831,17 @@ def add_news_ticker(player_id: int, capital_change: float = 0, morale_change: in
             headline = f"Brand Concern: {brand_change} Equity"
             news_type = 'warning'
         else:
-            return
+            return None
+    return headline, news_type
+
+
+def add_news_ticker(player_id: int, capital_change: float = 0, morale_change: int = 0, 
+                    brand_change: int = 0, headline: str = None, news_type: str = 'info'):
+    """Add an entry to the player's news ticker."""
+    news = news_headline(capital_change, morale_change, brand_change, headline, news_type)
+    if news is None:
+        return
+    headline, news_type = news
     
     conn = get_connection()
     cur = conn.cursor()
@@ -627,10 +857,10 @@ def add_news_ticker(player_id: int, capital_change: float = 0, morale_change: in
         AND news_id NOT IN (
             SELECT news_id FROM news_ticker 
             WHERE player_id = %s 
-            ORDER BY created_at DESC 
-            LIMIT 20
+            ORDER BY created_at DESC, news_id DESC
+            LIMIT %s
         )
-    """, (player_id, player_id))
+    """, (player_id, player_id, NEWS_TICKER_LIMIT))
     
     conn.commit()
     cur.close()
@@ -689,6 +919,12 @@ def get_skill_tree(player_id: int) -> dict:
     cur.close()
     return_connection(conn)
     
+    return build_skill_tree(abilities, subskill_levels)
+
+
+def build_skill_tree(abilities, subskill_levels: dict) -> dict:
+    """Skill tree by discipline from skill_tree_abilities rows (with the
+    player's unlocked_at/times_used/is_active) and subskill levels."""
     skill_tree = {}
     for ability in abilities:
         discipline = ability['discipline']
@@ -767,7 +1003,7 @@ def activate_ability(player_id: int, ability_code: str) -> dict:
     cur = conn.cursor()
     
     cur.execute("""
-        SELECT fiscal_quarter FROM player_profiles WHERE player_id = %s
+        SELECT fiscal_quarter FROM player_counters WHERE player_id = %s
     """, (player_id,))
     current_quarter = cur.fetchone()['fiscal_quarter']
     
@@ -822,8 +1058,12 @@ def get_active_abilities(player_id: int) -> list:
 def apply_ability_modifiers(player_id: int, base_exp: int = 0, base_cash: float = 0, 
                             base_cost: float = 0) -> dict:
     """Apply active ability modifiers to rewards/costs."""
-    active = get_active_abilities(player_id)
-    
+    return calculate_ability_modifiers(get_active_abilities(player_id), base_exp, base_cash, base_cost)
+
+
+def calculate_ability_modifiers(active: list, base_exp: int = 0, base_cash: float = 0,
+                                base_cost: float = 0) -> dict:
+    """apply_ability_modifiers() for an already fetched get_active_abilities() list."""
     exp_multiplier = 1.0
     revenue_multiplier = 1.0
     cost_multiplier = 1.0
@@ -865,8 +1105,11 @@ def reset_quarterly_abilities(player_id: int):
 
 def check_game_over(player_id: int) -> dict:
     """Check if the game is over due to bankruptcy or other conditions."""
-    resources = get_company_resources(player_id)
-    
+    return game_over_status(get_company_resources(player_id))
+
+
+def game_over_status(resources: dict) -> dict:
+    """check_game_over() for a get_company_resources() dict."""
     if resources['brand_equity'] <= 0:
         return {
             'game_over': True,
@@ -893,7 +1136,6 @@ def get_dashboard_data(player_id: int) -> dict:
     news = get_news_ticker(player_id, limit=5)
     skill_tree = get_skill_tree(player_id)
     active_abilities = get_active_abilities(player_id)
-    game_status = check_game_over(player_id)
     
     conn = get_connection()
     cur = conn.cursor()
@@ -903,17 +1145,24 @@ def get_dashboard_data(player_id: int) -> dict:
         FROM player_discipline_progress
         WHERE player_id = %s
     """, (player_id,))
+    discipline_rows = cur.fetchall()
     
+    cur.close()
+    return_connection(conn)
+    
+    return format_dashboard_data(resources, news, skill_tree, active_abilities, discipline_rows)
+
+
+def format_dashboard_data(resources: dict, news: list, skill_tree: dict,
+                          active_abilities: list, discipline_rows) -> dict:
+    """Assemble get_dashboard_data() from already fetched pieces."""
     disciplines = {}
-    for row in cur.fetchall():
+    for row in discipline_rows:
         disciplines[row['discipline_name']] = {
             'level': row['current_level'],
             'exp': row['current_exp']
         }
     
-    cur.close()
-    return_connection(conn)
-    
     radar_data = {
         'Marketing': disciplines.get('Marketing', {}).get('level', 1),
         'Finance': disciplines.get('Finance', {}).get('level', 1),
@@ -930,5 +1179,5 @@ def get_dashboard_data(player_id: int) -> dict:
         'news_ticker': news,
         'skill_tree': skill_tree,
         'active_abilities': active_abilities,
-        'game_status': game_status
+        'game_status': game_over_status(resources)
     }
@@ -1,14 +1,77 @@
 from .connection import (
     init_connection_pool,
+    init_replica_pool,
     get_connection,
     return_connection,
     db_cursor,
+    get_current_unit_of_work,
+    unit_of_work,
+    UnitOfWorkAborted,
+    init_request_unit_of_work,
+    mark_request_wrote,
+    get_pool_stats,
+    env_number,
+    PoolTimeout,
+)
+
+from .instrumentation import (
+    init_query_instrumentation,
+    current_query_stats,
+)
+
+from .prepared import (
+    register_statement,
+    execute_prepared,
 )
 
 from .schema import (
     init_database,
 )
 
+from .migrations import (
+    migrate,
+    MigrationError,
+)
+
+from .bulk import (
+    bulk_seed_all,
+)
+
+from .invalidation import (
+    init_cache_invalidation,
+    start_invalidation_listener,
+    stop_invalidation_listener,
+    register_invalidation_handler,
+    publish_invalidation,
+    get_invalidation_stats,
+)
+
+from .catalog import (
+    get_catalog,
+    load_catalog,
+    compile_catalog,
+    reload_catalog,
+    notify_catalog_changed,
+)
+
+from .bootstrap import (
+    bootstrap_database,
+    is_database_current,
+    mark_database_current,
+)
+
+from .provisioning import (
+    provision_player_rows,
+    backfill_player_rows,
+)
+
+from .competition_scores import (
+    record_competition_score,
+    fold_competition_scores,
+    drain_competition_scores,
+    finalize_competitions,
+)
+
 from .queries import (
     get_default_chart_of_accounts,
     initialize_player_accounting,
@@ -75,10 +138,46 @@ from .seed import (
 
 __all__ = [
     'init_connection_pool',
+    'init_replica_pool',
     'get_connection',
     'return_connection',
     'db_cursor',
+    'get_current_unit_of_work',
+    'unit_of_work',
+    'UnitOfWorkAborted',
+    'init_request_unit_of_work',
+    'mark_request_wrote',
+    'get_pool_stats',
+    'env_number',
+    'PoolTimeout',
+    'init_query_instrumentation',
+    'current_query_stats',
+    'register_statement',
+    'execute_prepared',
     'init_database',
+    'migrate',
+    'MigrationError',
+    'bulk_seed_all',
+    'init_cache_invalidation',
+    'start_invalidation_listener',
+    'stop_invalidation_listener',
+    'register_invalidation_handler',
+    'publish_invalidation',
+    'get_invalidation_stats',
+    'get_catalog',
+    'load_catalog',
+    'compile_catalog',
+    'reload_catalog',
+    'notify_catalog_changed',
+    'bootstrap_database',
+    'is_database_current',
+    'mark_database_current',
+    'provision_player_rows',
+    'backfill_player_rows',
+    'record_competition_score',
+    'fold_competition_scores',
+    'drain_competition_scores',
+    'finalize_competitions',
     'get_default_chart_of_accounts',
     'initialize_player_accounting',
     'get_project_templates',
@@ -0,0 +1,104 @@
+"""
+Boot-time database readiness check.
+
+A fingerprint of the migration set and the seed content is stored in the
+database after a successful migrate + seed. A worker that finds the same
+fingerprint (one query) skips init_database() and seed_all() entirely.
+"""
+
+import hashlib
+import inspect
+import json
+import os
+
+from .connection import get_connection, return_connection
+from .migrations import MIGRATIONS
+
+BOOT_FINGERPRINT_KEY = 'boot_fingerprint'
+
+# Files whose contents define seeded catalog data.
+_SEED_SOURCES = ('seed.py', 'queries.py')
+
+
+def compute_content_fingerprint() -> str:
+    """Hash of the seed sources behind seed_all(): the seed modules and the
+    company resources seed functions and their data. Migrations are covered
+    by compute_schema_fingerprint()."""
+    from src.company_resources import (
+        SKILL_TREE_ABILITIES, QUARTERLY_EVENTS, seed_skill_tree_abilities, seed_quarterly_events
+    )
+
+    digest = hashlib.sha256()
+    here = os.path.dirname(os.path.abspath(__file__))
+    for name in _SEED_SOURCES:
+        with open(os.path.join(here, name), 'rb') as f:
+            digest.update(f.read())
+    for seed in (seed_skill_tree_abilities, seed_quarterly_events):
+        digest.update(inspect.getsource(seed).encode('utf-8'))
+    digest.update(json.dumps([SKILL_TREE_ABILITIES, QUARTERLY_EVENTS], sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+def compute_schema_fingerprint() -> str:
+    """Hash of the migration set this code expects to be applied."""
+    digest = hashlib.sha256()
+    for migration in MIGRATIONS:
+        digest.update(f"{migration.version}:{migration.checksum}\n".encode('utf-8'))
+    return digest.hexdigest()
+
+
+def compute_boot_fingerprint() -> str:
+    return hashlib.sha256(
+        f"{compute_schema_fingerprint()}:{compute_content_fingerprint()}".encode('utf-8')
+    ).hexdigest()
+
+
+def is_database_current(fingerprint: str = None) -> bool:
+    """One query: does the stored fingerprint match this code's schema and content?"""
+    fingerprint = fingerprint or compute_boot_fingerprint()
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT value FROM app_state WHERE key = %s", (BOOT_FINGERPRINT_KEY,))
+        row = cur.fetchone()
+        return row is not None and row['value'] == fingerprint
+    except Exception:
+        conn.rollback()
+        return False
+    finally:
+        cur.close()
+        return_connection(conn)
+
+
+def mark_database_current(fingerprint: str = None):
+    """Record that migrations and seeds for this fingerprint have been applied."""
+    fingerprint = fingerprint or compute_boot_fingerprint()
+    conn = get_connection()
+    cur = conn.cursor()
+    cur.execute("""
+        INSERT INTO app_state (key, value, updated_at)
+        VALUES (%s, %s, CURRENT_TIMESTAMP)
+        ON CONFLICT (key) DO UPDATE SET value = EXCLUDED.value, updated_at = EXCLUDED.updated_at
+    """, (BOOT_FINGERPRINT_KEY, fingerprint))
+    conn.commit()
+    cur.close()
+    return_connection(conn)
+
+
+def bootstrap_database(force: bool = False, seed: bool = True) -> bool:
+    """Migrate and seed unless the database is already current.
+
+    Returns True if any work was done, False if the fast path was taken.
+    """
+    from .schema import init_database
+    from .bulk import bulk_seed_all
+
+    fingerprint = compute_boot_fingerprint()
+    if not force and is_database_current(fingerprint):
+        return False
+
+    init_database()
+    if seed:
+        bulk_seed_all()
+        mark_database_current(fingerprint)
+    return True
@@ -0,0 +1,166 @@
+"""
+Bulk catalog loader.
+
+Runs the existing seed_* functions inside a single unit of work whose cursors
+batch consecutive identical single-row INSERTs and send them as one
+execute_values() statement per table. The seed functions' own probes decide
+what is loaded, so re-running the loader skips content that is already
+there, exactly like seed_all(); it does not refresh changed rows.
+
+INSERTs with RETURNING, SELECTs and anything else flush the pending batch
+first and run unchanged, so parent/child seeds keep working.
+"""
+
+import re
+import time
+
+from psycopg2.extras import execute_values
+
+from .connection import unit_of_work
+
+BATCH_PAGE_SIZE = 5000
+
+_INSERT_RE = re.compile(
+    r"^\s*INSERT\s+INTO\s+(?P<table>\w+)\s*\((?P<columns>[^)]*)\)\s*"
+    r"VALUES\s*(?P<values>\(.*\))\s*(?P<conflict>ON\s+CONFLICT\b.*?)?\s*;?\s*$",
+    re.IGNORECASE | re.DOTALL,
+)
+
+
+def _split_top_level(text: str) -> list:
+    """Split a comma list, ignoring commas nested in parentheses or quotes."""
+    parts, depth, quoted, current = [], 0, False, []
+    for ch in text:
+        if ch == "'":
+            quoted = not quoted
+        elif not quoted and ch == '(':
+            depth += 1
+        elif not quoted and ch == ')':
+            depth -= 1
+        elif not quoted and depth == 0 and ch == ',':
+            parts.append(''.join(current).strip())
+            current = []
+            continue
+        current.append(ch)
+    parts.append(''.join(current).strip())
+    return parts
+
+
+class _InsertPlan:
+    """How to turn one single-row INSERT statement into a multi-row INSERT."""
+
+    def __init__(self, table, columns, template, conflict):
+        self.table = table
+        self.columns = columns
+        self.template = template
+        self.conflict = conflict
+
+    @property
+    def sql(self) -> str:
+        return f"INSERT INTO {self.table} ({', '.join(self.columns)}) VALUES %s {self.conflict}".rstrip()
+
+
+def plan_insert(sql: str):
+    """Return an _InsertPlan if `sql` is a batchable single-row INSERT, else None."""
+    if 'RETURNING' in sql.upper():
+        return None
+    match = _INSERT_RE.match(sql)
+    if not match:
+        return None
+
+    table = match.group('table')
+    columns = [c.strip() for c in match.group('columns').split(',')]
+    template = ' '.join(match.group('values').split())
+    items = _split_top_level(template[1:-1])
+    if len(items) != len(columns):
+        return None
+
+    conflict = ' '.join((match.group('conflict') or '').split())
+    if 'DO UPDATE' in conflict.upper():
+        # One multi-row ON CONFLICT DO UPDATE may not touch the same key twice.
+        return None
+    return _InsertPlan(table, columns, template, conflict)
+
+
+class BatchingCursor:
+    """Cursor wrapper that coalesces repeated single-row INSERTs into one statement."""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+        self._plans = {}
+        self._pending_sql = None
+        self._pending_plan = None
+        self._pending_rows = []
+        self.statements_sent = 0
+        self.rows_batched = 0
+
+    def execute(self, sql, params=None):
+        if params is not None:
+            if sql not in self._plans:
+                self._plans[sql] = plan_insert(sql)
+            plan = self._plans[sql]
+            if plan is not None:
+                if sql != self._pending_sql:
+                    self.flush()
+                    self._pending_sql, self._pending_plan = sql, plan
+                self._pending_rows.append(params)
+                return
+        self.flush()
+        self.statements_sent += 1
+        return self._cursor.execute(sql, params)
+
+    def flush(self):
+        if not self._pending_rows:
+            return
+        plan, rows = self._pending_plan, self._pending_rows
+        self._pending_sql, self._pending_plan, self._pending_rows = None, None, []
+        execute_values(self._cursor, plan.sql, rows, template=plan.template, page_size=BATCH_PAGE_SIZE)
+        self.statements_sent += 1
+        self.rows_batched += len(rows)
+
+    def fetchone(self):
+        self.flush()
+        return self._cursor.fetchone()
+
+    def fetchall(self):
+        self.flush()
+        return self._cursor.fetchall()
+
+    def fetchmany(self, size=None):
+        self.flush()
+        return self._cursor.fetchmany(size) if size is not None else self._cursor.fetchmany()
+
+    def close(self):
+        self.flush()
+        self._cursor.close()
+
+    def __iter__(self):
+        self.flush()
+        return iter(self._cursor)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+
+def bulk_seed_all() -> dict:
+    """Run seed_all() in one transaction with batched inserts."""
+    from .seed import seed_all
+
+    cursors = []
+
+    def wrap(cursor):
+        batching = BatchingCursor(cursor)
+        cursors.append(batching)
+        return batching
+
+    started = time.monotonic()
+    with unit_of_work(savepoints=False, cursor_wrapper=wrap):
+        seed_all()
+        for cur in cursors:
+            cur.flush()
+
+    return {
+        'seconds': round(time.monotonic() - started, 3),
+        'statements': sum(c.statements_sent for c in cursors),
+        'rows_batched': sum(c.rows_batched for c in cursors),
+    }
@@ -0,0 +1,370 @@
+"""
+Compiled, read-only content catalog.
+
+Catalog tables (scenarios, items, equipment, rewards, ...) only change when
+seed content changes at deploy time, so instead of re-querying them on every
+request each worker loads them once into immutable in-memory indexes.
+
+The catalog is compiled to a versioned JSON artifact (CATALOG_PATH, default
+content/catalog.compiled.json) from the seeded tables plus
+content/scenarios.json. The version is derived from the boot fingerprint, so
+an artifact left over from older content is ignored and rebuilt from the
+database instead of being served stale.
+
+Player-specific tables stay in Postgres; join them against the catalog in
+Python (see get_catalog().scenarios()).
+
+Reseeding or recompiling (python -m src.db.manage seed / catalog) compiles
+the artifact once, in the manage process, and announces it on the
+invalidation bus; every worker then reloads the file, and only builds a
+copy in memory from the database if it cannot find that compilation on
+disk. While a worker's listener is down, a background thread reloads the
+artifact once the copy is older than CACHE_INVALIDATION_TTL; requests keep
+being served from the current copy meanwhile.
+"""
+
+import datetime
+import decimal
+import hashlib
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from .connection import get_connection, return_connection
+from .invalidation import publish_invalidation, register_invalidation_handler, stale_after
+
+# table -> (primary key, ORDER BY used for full listings)
+CATALOG_TABLES = {
+    'scenario_master': ('scenario_id', 'scenario_id'),
+    'items': ('item_id', 'purchase_price, item_id'),
+    'equipment': ('equipment_id', 'slot_type, level_required, equipment_id'),
+    'achievements': ('achievement_id', 'achievement_id'),
+    'daily_login_rewards': ('day_number', 'day_number'),
+    'skill_tree_abilities': ('ability_id', 'ability_id'),
+    'quarterly_events': ('event_id', 'event_id'),
+    'learning_paths': ('path_id', 'path_id'),
+    'advisors': ('advisor_id', 'rarity, discipline_specialty, advisor_id'),
+    'npcs': ('npc_id', 'npc_id'),
+    'rivals': ('rival_id', 'rival_id'),
+    'avatar_options': ('option_id', 'option_type, unlock_level, unlock_cost, option_id'),
+    'business_milestones': ('milestone_id', 'target_value, milestone_id'),
+}
+
+# Bump when CATALOG_TABLES or the artifact layout changes.
+ARTIFACT_FORMAT = 2
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+CONTENT_SCENARIOS_PATH = os.path.join(_ROOT, 'content', 'scenarios.json')
+DEFAULT_CATALOG_PATH = os.path.join(_ROOT, 'content', 'catalog.compiled.json')
+
+
+def _encode(value):
+    if isinstance(value, decimal.Decimal):
+        return {'$decimal': str(value)}
+    if isinstance(value, datetime.datetime):
+        return {'$datetime': value.isoformat()}
+    if isinstance(value, datetime.date):
+        return {'$date': value.isoformat()}
+    raise TypeError(f"Cannot serialize {type(value).__name__} in catalog")
+
+
+def _decode(obj):
+    # Restore the exact types psycopg2 would have returned, so callers mixing
+    # catalog values with live query results (Decimal arithmetic) keep working.
+    if len(obj) == 1:
+        if '$decimal' in obj:
+            return decimal.Decimal(obj['$decimal'])
+        if '$datetime' in obj:
+            return datetime.datetime.fromisoformat(obj['$datetime'])
+        if '$date' in obj:
+            return datetime.date.fromisoformat(obj['$date'])
+    return obj
+
+
+def _freeze(value):
+    if isinstance(value, dict):
+        return MappingProxyType({k: _freeze(v) for k, v in value.items()})
+    if isinstance(value, list):
+        return tuple(_freeze(v) for v in value)
+    return value
+
+
+def _thaw(value):
+    if isinstance(value, MappingProxyType):
+        return {k: _thaw(v) for k, v in value.items()}
+    if isinstance(value, tuple):
+        return [_thaw(v) for v in value]
+    return value
+
+
+class ContentCatalog:
+    """Immutable lookups over compiled catalog rows.
+
+    Every accessor returns fresh dicts, so callers may mutate what they get
+    back without affecting other requests.
+    """
+
+    def __init__(self, version: str, tables: dict, content: dict):
+        self.version = version
+        self._rows = {}
+        self._by_id = {}
+        for table, rows in tables.items():
+            key = CATALOG_TABLES[table][0]
+            frozen = tuple(MappingProxyType(dict(row)) for row in rows)
+            self._rows[table] = frozen
+            self._by_id[table] = MappingProxyType({row[key]: row for row in frozen})
+
+        # (world, industry, discipline) -> active scenarios by (required_level, scenario_id)
+        index = {}
+        for row in self._rows.get('scenario_master', ()):
+            if not row.get('is_active'):
+                continue
+            index.setdefault((row['world_type'], row['industry'], row['discipline']), []).append(row)
+        self._scenario_index = MappingProxyType({
+            key: tuple(sorted(rows, key=lambda r: (r['required_level'], r['scenario_id'])))
+            for key, rows in index.items()
+        })
+        self._content = _freeze(content)
+
+    def get(self, table: str, key):
+        """Row of a catalog table by primary key, or None."""
+        row = self._by_id[table].get(key)
+        return dict(row) if row is not None else None
+
+    def all(self, table: str) -> list:
+        """Every row of a catalog table, in its listing order."""
+        return [dict(row) for row in self._rows[table]]
+
+    def scenarios(self, world: str, industry: str, discipline: str = None,
+                  max_level: int = None, levels=None) -> list:
+        """Active scenarios for a world/industry, optionally limited to one
+        discipline, a level cap or a set of levels, by (required_level, id)."""
+        if discipline is not None:
+            candidates = self._scenario_index.get((world, industry, discipline), ())
+        else:
+            candidates = sorted(
+                (row for (w, i, _), rows in self._scenario_index.items()
+                 if w == world and i == industry for row in rows),
+                key=lambda r: (r['required_level'], r['scenario_id']),
+            )
+        return [
+            dict(row) for row in candidates
+            if (max_level is None or row['required_level'] <= max_level)
+            and (levels is None or row['required_level'] in levels)
+        ]
+
+    def content_scenarios(self, scenario_type: str = None) -> list:
+        """Crisis/opportunity/tutorial scenarios from content/scenarios.json."""
+        result = []
+        for group, rows in self._content.get('scenarios', MappingProxyType({})).items():
+            for row in rows:
+                if scenario_type is None or row.get('scenario_type') == scenario_type:
+                    result.append(_thaw(row))
+        return result
+
+    def content_scenario(self, scenario_id: str):
+        for row in self.content_scenarios():
+            if row.get('scenario_id') == scenario_id:
+                return row
+        return None
+
+    def stats(self) -> dict:
+        return {'version': self.version[:16], **{t: len(rows) for t, rows in self._rows.items()}}
+
+
+def _read_content_scenarios() -> dict:
+    try:
+        with open(CONTENT_SCENARIOS_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def compute_catalog_version() -> str:
+    """Boot fingerprint (schema + seed content), the target database and
+    content/scenarios.json. Serial ids differ between databases, so an
+    artifact is only reused against the database it was compiled from."""
+    from .bootstrap import compute_boot_fingerprint
+
+    digest = hashlib.sha256(f"{ARTIFACT_FORMAT}:{compute_boot_fingerprint()}".encode('utf-8'))
+    digest.update(os.environ.get('DATABASE_URL', '').encode('utf-8'))
+    try:
+        with open(CONTENT_SCENARIOS_PATH, 'rb') as f:
+            digest.update(f.read())
+    except FileNotFoundError:
+        pass
+    return digest.hexdigest()
+
+
+def _catalog_path(path: str = None) -> str:
+    return path or os.environ.get('CATALOG_PATH') or DEFAULT_CATALOG_PATH
+
+
+def _query_tables() -> dict:
+    """One SELECT per catalog table."""
+    conn = get_connection()
+    cur = conn.cursor()
+    tables = {}
+    try:
+        for table, (_, order_by) in CATALOG_TABLES.items():
+            cur.execute(f"SELECT * FROM {table} ORDER BY {order_by}")
+            tables[table] = [dict(row) for row in cur.fetchall()]
+    finally:
+        cur.close()
+        return_connection(conn)
+    return tables
+
+
+def _build_artifact(version: str = None) -> dict:
+    return {
+        'format': ARTIFACT_FORMAT,
+        'version': version or compute_catalog_version(),
+        'compiled_at': datetime.datetime.utcnow().isoformat(),
+        'tables': _query_tables(),
+        'content': {'scenarios': _read_content_scenarios()},
+    }
+
+
+def _write_artifact(artifact: dict, path: str = None):
+    path = _catalog_path(path)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(artifact, f, default=_encode, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def compile_catalog(path: str = None) -> dict:
+    """Build the catalog artifact from the seeded tables and content files.
+
+    Returns the artifact dict after writing it atomically to `path`.
+    """
+    artifact = _build_artifact()
+    _write_artifact(artifact, path)
+    return artifact
+
+
+def _read_artifact(path: str):
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            return json.load(f, object_hook=_decode)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        print(f"WARNING: ignoring unreadable catalog artifact {path}: {e}")
+        return None
+
+
+def _in_memory_artifact(version: str) -> dict:
+    """An artifact built from the database without touching disk, with the
+    same types a read from the file would give."""
+    return json.loads(json.dumps(_build_artifact(version), default=_encode), object_hook=_decode)
+
+
+_catalog = None
+_catalog_loaded_at = 0.0
+_catalog_lock = threading.Lock()
+_refresh_thread = None
+_refresh_lock = threading.Lock()
+
+
+def _install(artifact: dict) -> ContentCatalog:
+    global _catalog, _catalog_loaded_at
+    _catalog = ContentCatalog(artifact['version'], artifact['tables'], artifact['content'])
+    _catalog_loaded_at = time.monotonic()
+    return _catalog
+
+
+def load_catalog(path: str = None, rebuild: bool = False) -> ContentCatalog:
+    """Load the catalog for this worker, compiling it if the artifact is
+    missing or was built from different content (at boot, or from manage)."""
+    with _catalog_lock:
+        path = _catalog_path(path)
+        version = compute_catalog_version()
+        artifact = None if rebuild else _read_artifact(path)
+        if artifact is None or artifact.get('version') != version:
+            try:
+                compile_catalog(path)
+                artifact = _read_artifact(path)
+            except OSError as e:
+                # Read-only filesystem: serve from memory without caching to disk.
+                print(f"WARNING: could not write catalog artifact {path}: {e}")
+                artifact = _in_memory_artifact(version)
+        return _install(artifact)
+
+
+def reload_catalog(path: str = None, compiled_at: str = None) -> ContentCatalog:
+    """Re-read the artifact another process compiled; never writes it.
+
+    With `compiled_at`, only that compilation will do (the one a notifier
+    just announced). If the file on this host is missing, from other content
+    or not the announced one, the catalog is built in memory from the
+    database instead.
+    """
+    with _catalog_lock:
+        path = _catalog_path(path)
+        version = compute_catalog_version()
+        artifact = _read_artifact(path)
+        if (artifact is None or artifact.get('version') != version
+                or (compiled_at is not None and artifact.get('compiled_at') != compiled_at)):
+            artifact = _in_memory_artifact(version)
+        return _install(artifact)
+
+
+def _refresh_catalog():
+    try:
+        reload_catalog()
+    except Exception as e:
+        print(f"WARNING: could not refresh catalog: {e}")
+
+
+def get_catalog() -> ContentCatalog:
+    """The process-wide catalog, loaded on first use.
+
+    Once it is older than stale_after(), one background thread reloads it
+    while requests keep getting the current copy.
+    """
+    global _refresh_thread
+    if _catalog is None:
+        return load_catalog()
+    max_age = stale_after()
+    if max_age is not None and time.monotonic() - _catalog_loaded_at > max_age:
+        with _refresh_lock:
+            if _refresh_thread is None or not _refresh_thread.is_alive():
+                _refresh_thread = threading.Thread(target=_refresh_catalog, name='catalog-refresh', daemon=True)
+                _refresh_thread.start()
+    return _catalog
+
+
+def notify_catalog_changed(path: str = None) -> dict:
+    """Recompile the artifact, then tell every worker to reload it (after
+    reseeding content). Returns the artifact.
+
+    Only this process compiles and writes the file; workers just read it,
+    matching the announced compiled_at.
+    """
+    artifact = _build_artifact()
+    try:
+        _write_artifact(artifact, path)
+    except OSError as e:
+        # Workers will not find this compilation on disk and build their own in memory.
+        print(f"WARNING: could not write catalog artifact {_catalog_path(path)}: {e}")
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        publish_invalidation(cur, 'catalog', version=artifact['compiled_at'])
+        conn.commit()
+    finally:
+        cur.close()
+        return_connection(conn)
+    return artifact
+
+
+def _reload_on_invalidation(id, version):
+    # version: the announced compilation; None after a listener reconnect.
+    if _catalog is not None:
+        reload_catalog(compiled_at=version)
+
+
+register_invalidation_handler('catalog', _reload_on_invalidation)
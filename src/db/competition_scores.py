@@ -0,0 +1,188 @@
+"""
+Streaming competition scores.
+
+Gameplay does not touch competition_entries. An action appends one score
+delta per competition the player has entered whose scoring_criteria
+includes the metric. Each delta is a row in competition_score_events,
+written in the action's own transaction:
+
+    record_competition_score(cur, player_id, {'scenarios_completed': 1, 'exp_earned': 120})
+
+fold_competition_scores() then moves a batch of those events into
+competition_entries.score with one UPDATE per batch. That turns many small
+writes to the same hot entry rows into one write per entry per batch. Only
+one fold runs at a time across all workers, via an advisory lock; a caller
+that finds it taken skips folding rather than waiting. Folds always run on
+a dedicated connection and commit at once, never inside a request's unit
+of work. Leaderboard snapshots fold before they reload (src.engine.leaderboards),
+and the manage command drains the buffer:
+
+    python -m src.db.manage competitions [--end ACTIVE_ID]
+
+A competition whose end_date has passed is finalized by the next fold. Its
+status becomes 'completed', its remaining events are folded, and every
+entry's rank is set by one RANK() statement.
+"""
+
+import time
+
+from .connection import env_number, get_connection, return_connection
+from .invalidation import publish_invalidation
+
+# Arbitrary constant, next to MIGRATION_LOCK_ID, so one fold runs at a time.
+COMPETITION_FOLD_LOCK_ID = 720_002
+
+# Folds `limit` buffered events (all with NULL), oldest first, into the entries
+# of still-active competitions or of %(finalizing)s. Events for anything else
+# (a finished competition, an entry since deleted) are dropped.
+_FOLD_SQL = """
+    WITH batch AS (
+        DELETE FROM competition_score_events
+        WHERE event_id IN (
+            SELECT event_id FROM competition_score_events
+            WHERE %(only)s::int[] IS NULL OR active_id = ANY(%(only)s::int[])
+            ORDER BY event_id
+            LIMIT %(limit)s
+        )
+        RETURNING active_id, player_id, delta
+    ),
+    totals AS (
+        SELECT active_id, player_id, SUM(delta) AS delta
+        FROM batch
+        GROUP BY active_id, player_id
+    ),
+    folded AS (
+        UPDATE competition_entries ce
+        SET score = COALESCE(ce.score, 0) + t.delta
+        FROM totals t
+        JOIN active_competitions ac ON ac.active_id = t.active_id
+        WHERE ce.active_id = t.active_id AND ce.player_id = t.player_id
+          AND (ac.status = 'active' OR ac.active_id = ANY(%(finalizing)s::int[]))
+        RETURNING ce.entry_id
+    )
+    SELECT (SELECT COUNT(*) FROM batch) AS events, (SELECT COUNT(*) FROM folded) AS entries
+"""
+
+
+def record_competition_score(cur, player_id: int, metrics: dict):
+    """Append score deltas for `player_id` on `cur`'s transaction: for each
+    active competition entered, the sum of `metrics` it scores on."""
+    metrics = {metric: int(amount) for metric, amount in metrics.items() if amount}
+    if not metrics:
+        return
+    cur.execute("""
+        INSERT INTO competition_score_events (active_id, player_id, delta)
+        SELECT ce.active_id, ce.player_id, SUM(m.amount)
+        FROM competition_entries ce
+        JOIN active_competitions ac ON ac.active_id = ce.active_id
+        JOIN competition_types ct ON ct.competition_id = ac.competition_id
+        JOIN unnest(%s::text[], %s::int[]) AS m(metric, amount) ON ct.scoring_criteria ? m.metric
+        WHERE ce.player_id = %s AND ac.status = 'active' AND ac.end_date > CURRENT_TIMESTAMP
+        GROUP BY ce.active_id, ce.player_id
+    """, (list(metrics), list(metrics.values()), player_id))
+
+
+def _finalize(cur, active_ids=None) -> list:
+    """Close the given competitions (default: every one past its end_date),
+    fold all their buffered events and rank their entries. Needs the fold lock."""
+    if active_ids is None:
+        cur.execute("""
+            UPDATE active_competitions SET status = 'completed'
+            WHERE status = 'active' AND end_date <= CURRENT_TIMESTAMP
+            RETURNING active_id
+        """)
+    else:
+        cur.execute("""
+            UPDATE active_competitions SET status = 'completed'
+            WHERE status = 'active' AND active_id = ANY(%s)
+            RETURNING active_id
+        """, (list(active_ids),))
+    finished = [row['active_id'] for row in cur.fetchall()]
+    if not finished:
+        return []
+
+    cur.execute(_FOLD_SQL, {'only': finished, 'limit': None, 'finalizing': finished})
+    cur.execute("""
+        WITH ranked AS (
+            SELECT entry_id, RANK() OVER (PARTITION BY active_id ORDER BY COALESCE(score, 0) DESC) AS final_rank
+            FROM competition_entries
+            WHERE active_id = ANY(%s)
+        )
+        UPDATE competition_entries ce
+        SET rank = ranked.final_rank
+        FROM ranked
+        WHERE ce.entry_id = ranked.entry_id
+    """, (finished,))
+    for active_id in finished:
+        publish_invalidation(cur, 'competition', active_id)
+    return finished
+
+
+def fold_competition_scores(batch_size: int = None) -> dict:
+    """Finalize ended competitions and fold one batch of buffered events
+    (COMPETITION_FOLD_BATCH, default 5000). Returns
+    {'events', 'entries', 'finalized', 'skipped'}; skipped means another fold
+    held the lock."""
+    if batch_size is None:
+        batch_size = env_number("COMPETITION_FOLD_BATCH", 5000)
+    result = {'events': 0, 'entries': 0, 'finalized': [], 'skipped': False}
+
+    # Its own transaction, even when called during a request, so the entry
+    # row locks and the advisory lock are held only for the fold.
+    conn = get_connection(dedicated=True)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_try_advisory_xact_lock(%s) AS locked", (COMPETITION_FOLD_LOCK_ID,))
+        if not cur.fetchone()['locked']:
+            conn.rollback()
+            result['skipped'] = True
+            return result
+        result['finalized'] = _finalize(cur)
+        cur.execute(_FOLD_SQL, {'only': None, 'limit': batch_size, 'finalizing': []})
+        row = cur.fetchone()
+        conn.commit()
+        result['events'], result['entries'] = row['events'], row['entries']
+        return result
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        return_connection(conn)
+
+
+def drain_competition_scores(batch_size: int = None) -> dict:
+    """Fold until the buffer is empty, one transaction per batch."""
+    totals = {'events': 0, 'entries': 0, 'finalized': [], 'batches': 0}
+    start = time.time()
+    while True:
+        result = fold_competition_scores(batch_size)
+        if result['skipped']:
+            time.sleep(0.1)
+            continue
+        totals['batches'] += 1
+        totals['finalized'].extend(result['finalized'])
+        totals['events'] += result['events']
+        totals['entries'] += result['entries']
+        if not result['events']:
+            break
+    totals['seconds'] = round(time.time() - start, 2)
+    return totals
+
+
+def finalize_competitions(active_ids) -> list:
+    """End the given competitions now, folding their remaining scores and
+    fixing every entry's rank; returns the ids that were still active."""
+    conn = get_connection(dedicated=True)
+    cur = conn.cursor()
+    try:
+        cur.execute("SELECT pg_advisory_xact_lock(%s)", (COMPETITION_FOLD_LOCK_ID,))
+        finished = _finalize(cur, active_ids)
+        conn.commit()
+        return finished
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cur.close()
+        return_connection(conn)
@@ -1,26 +1,64 @@
+import logging
 import os
-import psycopg2
-from psycopg2 import pool
-from psycopg2.extras import RealDictCursor
+import threading
+import time
 from contextlib import contextmanager
+import psycopg2
+from psycopg2.extensions import TRANSACTION_STATUS_INERROR
 from dotenv import load_dotenv
+from flask import g, has_request_context, request, session
+from werkzeug.exceptions import InternalServerError
+
+from .instrumentation import InstrumentedCursor
+from .pool import BoundedConnectionPool, PoolTimeout
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
 _connection_pool = None
+_replica_pool = None
+_replica_down_until = 0.0
+
+# Session key holding the time of this player's last committed write.
+LAST_WRITE_SESSION_KEY = '_db_last_write'
+
+
+def env_number(name, default, cast=int):
+    """Numeric setting `name` from the environment, or `default` if it is
+    unset or not a valid `cast`."""
+    value = os.environ.get(name)
+    if value in (None, ''):
+        return default
+    try:
+        return cast(value)
+    except ValueError:
+        print(f"WARNING: ignoring invalid {name}={value!r}, using {default}")
+        return default
+
 
 def init_connection_pool():
-    """Initialize the connection pool with error handling."""
+    """Initialize the connection pool with error handling.
+
+    Sizes are per process, so with gunicorn each worker gets its own pool:
+        DB_POOL_MIN_SIZE      connections opened up front (default 2)
+        DB_POOL_MAX_SIZE      hard cap on open connections (default 20)
+        DB_POOL_TIMEOUT       seconds a checkout waits when the pool is full (default 30)
+        DB_POOL_PING_AFTER    idle seconds after which a connection is pinged before reuse (default 30)
+    """
     global _connection_pool
     if _connection_pool is None:
         database_url = os.environ.get("DATABASE_URL")
         if not database_url:
             raise ValueError("DATABASE_URL environment variable is not set")
         try:
-            _connection_pool = pool.ThreadedConnectionPool(
-                minconn=2,
-                maxconn=20,
-                dsn=database_url
+            _connection_pool = BoundedConnectionPool(
+                database_url,
+                minconn=env_number("DB_POOL_MIN_SIZE", 2),
+                maxconn=env_number("DB_POOL_MAX_SIZE", 20),
+                timeout=env_number("DB_POOL_TIMEOUT", 30.0, float),
+                ping_after=env_number("DB_POOL_PING_AFTER", 30.0, float),
+                cursor_factory=InstrumentedCursor,
             )
         except Exception as e:
             print(f"Failed to create connection pool: {e}")
@@ -28,25 +66,50 @@ def init_connection_pool():
     return _connection_pool
 
 
-def get_connection():
-    """Get a database connection from the pool."""
-    global _connection_pool
-    
+def init_replica_pool():
+    """Initialize the read-replica pool, if DATABASE_REPLICA_URL is set.
+
+        DB_REPLICA_POOL_MAX_SIZE     hard cap on replica connections (default 20)
+        DB_REPLICA_TIMEOUT           seconds to wait for a replica connection
+                                     before falling back to the primary (default 2)
+        DB_REPLICA_RETRY_AFTER       seconds to stop using a failed replica (default 30)
+        DB_REPLICA_STICKY_SECONDS    seconds after a player's write during which their
+                                     read-only queries stay on the primary (default 5)
+    """
+    global _replica_pool
+    if _replica_pool is None:
+        replica_url = os.environ.get("DATABASE_REPLICA_URL")
+        if not replica_url:
+            return None
+        _replica_pool = BoundedConnectionPool(
+            replica_url,
+            minconn=0,
+            maxconn=env_number("DB_REPLICA_POOL_MAX_SIZE", 20),
+            timeout=env_number("DB_REPLICA_TIMEOUT", 2.0, float),
+            ping_after=env_number("DB_POOL_PING_AFTER", 30.0, float),
+            readonly=True,
+            cursor_factory=InstrumentedCursor,
+        )
+    return _replica_pool
+
+
+def get_pool_stats(replica=False):
+    """Occupancy, overflow and checkout-latency counters for this worker's pool."""
+    target = _replica_pool if replica else _connection_pool
+    if target is None:
+        return None
+    return target.stats()
+
+
+def _checkout_connection():
+    """Take a raw connection from the pool, waiting if it is exhausted."""
     if _connection_pool is None:
         init_connection_pool()
-    
-    try:
-        conn = _connection_pool.getconn()
-        conn.cursor_factory = RealDictCursor
-        return conn
-    except pool.PoolError:
-        database_url = os.environ.get("DATABASE_URL")
-        return psycopg2.connect(database_url, cursor_factory=RealDictCursor)
+    return _connection_pool.getconn()
 
 
-def return_connection(conn):
-    """Return a connection to the pool."""
-    global _connection_pool
+def _release_connection(conn):
+    """Put a raw connection back into the pool."""
     if _connection_pool is not None and conn is not None:
         try:
             _connection_pool.putconn(conn)
@@ -57,19 +120,354 @@ def return_connection(conn):
                 pass
 
 
+class UnitOfWorkAborted(Exception):
+    """A unit of work's transaction failed and was rolled back instead of committed."""
+
+
+class _Savepoint:
+    __slots__ = ('name', 'released', 'alive')
+
+    def __init__(self, name):
+        self.name = name
+        # released: its unit committed; alive: not yet undone by an outer rollback
+        self.released = False
+        self.alive = True
+
+
+class UnitOfWork:
+    """One connection and one transaction shared by every get_connection() call.
+
+    Each checkout gets a UnitOfWorkConnection. With savepoints enabled, every
+    unit of work a checkout does (up to its commit() or rollback()) runs in
+    its own savepoint, so a caller's rollback() only undoes its own work. The
+    real COMMIT happens once, in finish(). `cursor_wrapper`, if given, wraps
+    every cursor handed out (used by the bulk seed loader).
+
+    Savepoints are kept on a stack. A committed one is released lazily, in
+    the same round trip as the next SAVEPOINT, once nothing opened after it
+    is still open; COMMIT releases whatever is left. Only open savepoints
+    stay on the stack, so nesting never grows with the number of checkouts.
+    """
+
+    def __init__(self, savepoints=True, cursor_wrapper=None):
+        self.conn = _checkout_connection()
+        self.use_savepoints = savepoints
+        self.cursor_wrapper = cursor_wrapper
+        self.savepoint_count = 0
+        self.checkouts = 0
+        self.wrote = False
+        # commit() calls so far; request caches compare it to spot new writes
+        self.commits = 0
+        self._savepoints = []
+
+    def cursor(self, *args, **kwargs):
+        cur = self.conn.cursor(*args, **kwargs)
+        if self.cursor_wrapper is not None:
+            cur = self.cursor_wrapper(cur)
+        return cur
+
+    def execute(self, sql):
+        cur = self.conn.cursor()
+        try:
+            cur.execute(sql)
+        finally:
+            cur.close()
+
+    def _release_finished_sql(self) -> str:
+        """RELEASE for the committed savepoints on top of the stack, if any."""
+        lowest = None
+        while self._savepoints and self._savepoints[-1].released:
+            lowest = self._savepoints.pop()
+        return f"RELEASE SAVEPOINT {lowest.name}; " if lowest is not None else ""
+
+    def begin_savepoint(self):
+        """Push a new savepoint; returns it and the SQL that opens it, which
+        the caller must send before anything else runs on the connection."""
+        self.savepoint_count += 1
+        savepoint = _Savepoint(f"uow_sp_{self.savepoint_count}")
+        sql = f"{self._release_finished_sql()}SAVEPOINT {savepoint.name}; "
+        self._savepoints.append(savepoint)
+        return savepoint, sql
+
+    def release(self, savepoint):
+        savepoint.released = True
+
+    def rollback_to(self, savepoint):
+        """Undo everything since `savepoint`, including any savepoints opened
+        after it, and drop it. A no-op if an outer rollback already undid it."""
+        if not savepoint.alive:
+            return
+        index = self._savepoints.index(savepoint)
+        for undone in self._savepoints[index:]:
+            undone.alive = False
+        del self._savepoints[index:]
+        self.execute(f"ROLLBACK TO SAVEPOINT {savepoint.name}; RELEASE SAVEPOINT {savepoint.name}")
+
+    def aborted(self) -> bool:
+        """Is the transaction in a failed state, so COMMIT would roll it back?"""
+        return (self.conn is not None
+                and self.conn.info.transaction_status == TRANSACTION_STATUS_INERROR)
+
+    def finish(self, commit=True):
+        """Commit (or roll back) the transaction and release the connection.
+
+        Raises UnitOfWorkAborted, after rolling back, when asked to commit a
+        transaction a failed statement left aborted; Postgres would otherwise
+        turn the COMMIT into a silent ROLLBACK.
+        """
+        aborted = commit and self.aborted()
+        conn, self.conn = self.conn, None
+        if conn is None:
+            return
+        try:
+            if commit and not aborted:
+                conn.commit()
+            else:
+                conn.rollback()
+        except Exception:
+            try:
+                conn.rollback()
+            except Exception:
+                pass
+            raise
+        finally:
+            self._savepoints = []
+            _release_connection(conn)
+        if aborted:
+            raise UnitOfWorkAborted("transaction aborted by an earlier error; rolled back")
+
+
+class UnitOfWorkConnection:
+    """Connection proxy returned by get_connection() inside a unit of work.
+
+    commit() is deferred to the end of the unit of work and releases this
+    checkout's savepoint; rollback() rolls back to it. Either way the next
+    statement starts a fresh savepoint. The savepoint is opened by prefixing
+    the first statement after that, so it costs no extra round trip.
+    rollback() never touches work outside this checkout's savepoint, and
+    return_connection() leaves the underlying connection bound to the unit.
+    """
+
+    def __init__(self, uow):
+        self._uow = uow
+        self._savepoint = None
+        self._cursors = []
+
+    def cursor(self, *args, **kwargs):
+        cur = self._uow.cursor(*args, **kwargs)
+        if self._uow.use_savepoints:
+            if hasattr(cur, 'before_execute'):
+                cur.before_execute = self._open_savepoint
+            else:
+                self._open_savepoint(None)
+        if self._uow.cursor_wrapper is not None:
+            self._cursors.append(cur)
+        return cur
+
+    def _open_savepoint(self, query):
+        """Start this checkout's savepoint ahead of `query` if its current
+        unit has not run anything yet; returns the SQL to send."""
+        if self._savepoint is not None and self._savepoint.alive:
+            return query
+        self._savepoint, sql = self._uow.begin_savepoint()
+        if isinstance(query, str):
+            return sql + query
+        self._uow.execute(sql)
+        return query
+
+    def commit(self):
+        for cur in self._cursors:
+            cur.flush()
+        if self._savepoint is not None:
+            self._uow.release(self._savepoint)
+            self._savepoint = None
+        self._uow.wrote = True
+        self._uow.commits += 1
+
+    def rollback(self):
+        savepoint, self._savepoint = self._savepoint, None
+        if savepoint is None:
+            # Nothing ran since this checkout's last commit, or savepoints are
+            # off and finish() will roll the whole unit back.
+            return
+        try:
+            self._uow.rollback_to(savepoint)
+        except psycopg2.Error as e:
+            # The transaction stays aborted; finish() refuses to commit it.
+            logger.error("could not roll back to %s: %s", savepoint.name, e)
+
+    def __getattr__(self, name):
+        return getattr(self._uow.conn, name)
+
+
+_local = threading.local()
+
+
+def get_current_unit_of_work(create=True):
+    """Return the active unit of work: an explicit unit_of_work() block on this
+    thread, else the one bound to the current request, if enabled."""
+    uow = getattr(_local, 'uow', None)
+    if uow is not None:
+        return uow
+    if not has_request_context() or not g.get('_db_uow_enabled'):
+        return None
+    uow = g.get('_db_uow')
+    if uow is None and create:
+        uow = UnitOfWork()
+        g._db_uow = uow
+    return uow
+
+
 @contextmanager
-def db_cursor(commit_on_success=False):
+def unit_of_work(savepoints=True, cursor_wrapper=None):
+    """Run a block outside a request with one connection and one commit.
+
+    Usage:
+        with unit_of_work():
+            seed_all()
+    """
+    if getattr(_local, 'uow', None) is not None:
+        raise RuntimeError("unit_of_work() blocks cannot be nested")
+    uow = UnitOfWork(savepoints=savepoints, cursor_wrapper=cursor_wrapper)
+    _local.uow = uow
+    try:
+        yield uow
+    except Exception:
+        _local.uow = None
+        uow.finish(commit=False)
+        raise
+    _local.uow = None
+    uow.finish(commit=True)
+
+
+def mark_request_wrote():
+    """Record that this request committed writes outside its unit of work
+    (e.g. on a dedicated connection), for the read-your-writes guard."""
+    if has_request_context():
+        g._db_wrote = True
+
+
+def _recently_wrote() -> bool:
+    """Has this request, or this player within the sticky window, written?"""
+    uow = get_current_unit_of_work(create=False)
+    if uow is not None and uow.wrote:
+        return True
+    if not has_request_context():
+        return False
+    if g.get('_db_wrote'):
+        return True
+    last_write = session.get(LAST_WRITE_SESSION_KEY)
+    sticky = env_number("DB_REPLICA_STICKY_SECONDS", 5.0, float)
+    return last_write is not None and time.time() - last_write < sticky
+
+
+def _checkout_replica_connection():
+    """A replica connection, or None to fall back to the primary."""
+    global _replica_down_until
+    if init_replica_pool() is None or time.monotonic() < _replica_down_until:
+        return None
+    if _recently_wrote():
+        return None
+    try:
+        return _replica_pool.getconn()
+    except (PoolTimeout, psycopg2.OperationalError) as e:
+        _replica_down_until = time.monotonic() + env_number("DB_REPLICA_RETRY_AFTER", 30.0, float)
+        print(f"WARNING: read replica unavailable, using primary: {e}")
+        return None
+
+
+def get_connection(readonly=False, dedicated=False):
+    """Get a database connection.
+
+    With readonly=True the connection comes from the read replica when one is
+    configured and healthy, unless the current request (or the same player
+    moments ago) has written, so a player always reads their own writes.
+    Otherwise: inside a unit of work, a proxy onto its shared connection;
+    elsewhere a connection from the pool.
+
+    dedicated=True always gives a pool connection of its own, even inside a
+    unit of work: its commit() is real and its locks end with it, and its
+    reads never see the request's uncommitted writes. Writers should call
+    mark_request_wrote() after committing on it.
+    """
+    if readonly:
+        conn = _checkout_replica_connection()
+        if conn is not None:
+            return conn
+    if not dedicated:
+        uow = get_current_unit_of_work()
+        if uow is not None:
+            uow.checkouts += 1
+            return UnitOfWorkConnection(uow)
+    return _checkout_connection()
+
+
+def return_connection(conn):
+    """Return a connection to the pool."""
+    if isinstance(conn, UnitOfWorkConnection):
+        return
+    if _replica_pool is not None and _replica_pool.owns(conn):
+        _replica_pool.putconn(conn)
+        return
+    _release_connection(conn)
+
+
+def init_request_unit_of_work(app):
+    """Bind one connection and one transaction to each request of a Flask app.
+
+    The connection is checked out lazily on the first get_connection() of the
+    request, committed once after the view returns a non-5xx response, and
+    rolled back and released on teardown otherwise. If a failed statement
+    left the transaction aborted (say a view swallowed the error), nothing
+    was saved, so the response is replaced by a 500. A request that committed
+    writes records the time in the session so the player's next reads skip
+    the replica for DB_REPLICA_STICKY_SECONDS.
+    """
+
+    @app.before_request
+    def _enable_request_unit_of_work():
+        g._db_uow_enabled = True
+
+    @app.after_request
+    def _commit_request_unit_of_work(response):
+        uow = g.get('_db_uow')
+        if uow is not None and response.status_code < 500:
+            g._db_uow = None
+            try:
+                uow.finish(commit=True)
+            except UnitOfWorkAborted as e:
+                logger.error("%s %s: %s", request.method, request.path, e)
+                return InternalServerError().get_response()
+            if uow.wrote:
+                g._db_wrote = True
+        if g.get('_db_wrote') and _replica_pool is not None:
+            session[LAST_WRITE_SESSION_KEY] = time.time()
+        return response
+
+    @app.teardown_request
+    def _close_request_unit_of_work(exc):
+        uow = g.get('_db_uow')
+        if uow is not None:
+            g._db_uow = None
+            try:
+                uow.finish(commit=False)
+            except Exception:
+                pass
+
+
+@contextmanager
+def db_cursor(commit_on_success=False, readonly=False):
     """Context manager for safe database access with automatic cleanup.
-    
+
     Usage:
-        with db_cursor() as (conn, cur):
+        with db_cursor(readonly=True) as (conn, cur):
             cur.execute("SELECT * FROM table")
             result = cur.fetchall()
-        
+
         with db_cursor(commit_on_success=True) as (conn, cur):
             cur.execute("INSERT INTO table VALUES (%s)", (value,))
     """
-    conn = get_connection()
+    conn = get_connection(readonly=readonly)
     cur = conn.cursor()
     try:
         yield conn, cur
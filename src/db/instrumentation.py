@@ -0,0 +1,157 @@
+"""
+Per-request query instrumentation.
+
+Every pooled connection uses InstrumentedCursor, which reports each
+statement to the current request's QueryStats (a no-op outside a request).
+After the request, init_query_instrumentation() adds a Server-Timing header
+and a structured log line with the query count, total DB time, duplicate
+statements and likely N+1 patterns: the same statement text executed more
+than DB_N_PLUS_ONE_THRESHOLD times (default 5) in one request.
+
+    Server-Timing: db;dur=41.27;desc="queries=38 dup=4 n+1=2"
+"""
+
+import json
+import logging
+import os
+import time
+from collections import Counter
+
+from flask import g, has_request_context, request
+from psycopg2.extras import RealDictCursor
+
+logger = logging.getLogger(__name__)
+
+_SQL_PREVIEW_CHARS = 160
+
+
+def _normalize(query) -> str:
+    if isinstance(query, bytes):
+        query = query.decode('utf-8', 'replace')
+    elif not isinstance(query, str):
+        query = repr(query)
+    return ' '.join(query.split())
+
+
+class QueryStats:
+    """Counters for the statements run during one request."""
+
+    def __init__(self, n_plus_one_threshold: int = 5):
+        self.n_plus_one_threshold = n_plus_one_threshold
+        self.count = 0
+        self.seconds = 0.0
+        self.duplicates = 0
+        self.by_statement = Counter()
+        self._seen = set()
+
+    def record(self, query, params, seconds: float):
+        statement = _normalize(query)
+        self.count += 1
+        self.seconds += seconds
+        self.by_statement[statement] += 1
+        key = (statement, repr(params))
+        if key in self._seen:
+            self.duplicates += 1
+        else:
+            self._seen.add(key)
+
+    def n_plus_one(self) -> list:
+        """Statements executed more than the threshold, most frequent first."""
+        return [
+            {'sql': statement[:_SQL_PREVIEW_CHARS], 'count': count}
+            for statement, count in self.by_statement.most_common()
+            if count > self.n_plus_one_threshold
+        ]
+
+    def server_timing(self) -> str:
+        return (f'db;dur={self.seconds * 1000:.2f};'
+                f'desc="queries={self.count} dup={self.duplicates} n+1={len(self.n_plus_one())}"')
+
+    def as_dict(self) -> dict:
+        return {
+            'queries': self.count,
+            'db_ms': round(self.seconds * 1000, 2),
+            'duplicates': self.duplicates,
+            'distinct_statements': len(self.by_statement),
+            'n_plus_one': self.n_plus_one(),
+        }
+
+
+def current_query_stats():
+    """The QueryStats collecting for this request, or None."""
+    if not has_request_context():
+        return None
+    return g.get('_db_query_stats')
+
+
+class InstrumentedCursor(RealDictCursor):
+    """RealDictCursor that reports timing to the current request's QueryStats.
+
+    `before_execute`, if set, is called with each statement and returns the
+    SQL to send instead; the unit of work uses it to open its savepoints in
+    the same round trip. Stats are recorded against the original statement.
+    """
+
+    before_execute = None
+
+    def execute(self, query, vars=None):
+        sql = query if self.before_execute is None else self.before_execute(query)
+        stats = current_query_stats()
+        if stats is None:
+            return super().execute(sql, vars)
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, vars)
+        finally:
+            stats.record(query, vars, time.perf_counter() - started)
+
+    def executemany(self, query, vars_list):
+        if self.before_execute is not None:
+            # executemany() repeats the whole string per row; open the savepoint separately.
+            self.before_execute(None)
+        stats = current_query_stats()
+        if stats is None:
+            return super().executemany(query, vars_list)
+        started = time.perf_counter()
+        try:
+            return super().executemany(query, vars_list)
+        finally:
+            stats.record(query, None, time.perf_counter() - started)
+
+
+def init_query_instrumentation(app):
+    """Collect QueryStats for every request of a Flask app and report them.
+
+    The log line goes to the src.db.instrumentation logger at INFO, or at
+    WARNING when N+1 patterns were found. Set DB_QUERY_INSTRUMENTATION=0 to
+    turn collection off.
+    """
+    if os.environ.get("DB_QUERY_INSTRUMENTATION", "1") == "0":
+        return
+    try:
+        threshold = int(os.environ.get("DB_N_PLUS_ONE_THRESHOLD", "5"))
+    except ValueError:
+        threshold = 5
+
+    @app.before_request
+    def _start_query_stats():
+        g._db_query_stats = QueryStats(threshold)
+
+    @app.after_request
+    def _report_query_stats(response):
+        stats = g.pop('_db_query_stats', None)
+        if stats is None:
+            return response
+        response.headers.add('Server-Timing', stats.server_timing())
+        summary = stats.as_dict()
+        level = logging.WARNING if summary['n_plus_one'] else logging.INFO
+        if logger.isEnabledFor(level):
+            logger.log(level, json.dumps({
+                'event': 'db_queries',
+                'method': request.method,
+                'path': request.path,
+                'endpoint': request.endpoint,
+                'status': response.status_code,
+                **summary,
+            }))
+        return response
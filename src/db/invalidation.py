@@ -0,0 +1,190 @@
+"""
+Cross-worker cache invalidation over Postgres LISTEN/NOTIFY.
+
+Each gunicorn worker keeps its own in-process caches (player state, company
+resources, the content catalog). A write committed by one worker is
+announced on the `cache_invalidation` channel as JSON
+
+    {"entity": "player", "id": 42, "version": 17}
+
+and a listener thread in every worker hands it to the handlers registered
+for that entity, which evict what they hold for it. NOTIFY is transactional,
+so nothing is announced for a rolled-back write. Player state is announced by
+a trigger on player_counters (migration 6); anything else calls
+publish_invalidation() before committing.
+
+While the listener is not connected, caches cannot hear about other workers'
+writes, so stale_after() returns CACHE_INVALIDATION_TTL and they expire
+entries by age instead. After a reconnect every handler is told to drop
+everything (id and version None), since notifications sent in between were
+missed.
+
+    init_cache_invalidation(app)       # start the listener in each worker
+    CACHE_INVALIDATION_LISTENER=0      # don't listen (caches use the TTL)
+    CACHE_INVALIDATION_TTL             # seconds, while disconnected (default 30)
+"""
+
+import json
+import os
+import select
+import threading
+
+import psycopg2
+
+from .connection import env_number
+
+INVALIDATION_CHANNEL = 'cache_invalidation'
+
+# Seconds the listener waits for a notification before checking its connection.
+_POLL_SECONDS = 5.0
+_RETRY_SECONDS = 5.0
+
+_handlers = {}
+_handlers_lock = threading.Lock()
+_listener = None
+_listener_pid = None
+_listener_lock = threading.Lock()
+_stop = threading.Event()
+_stats = {
+    'status': 'off',
+    'received': 0,
+    'dispatched': 0,
+    'errors': 0,
+    'reconnects': 0,
+    'last_error': None,
+}
+
+
+def register_invalidation_handler(entity: str, handler):
+    """Call handler(id, version) for every invalidation of `entity`; both are
+    None when everything cached for it must go."""
+    with _handlers_lock:
+        _handlers.setdefault(entity, []).append(handler)
+
+
+def publish_invalidation(cur, entity: str, id=None, version=None):
+    """Announce a change on `cur`'s transaction; delivered when it commits."""
+    payload = json.dumps({'entity': entity, 'id': id, 'version': version})
+    cur.execute("SELECT pg_notify(%s, %s)", (INVALIDATION_CHANNEL, payload))
+
+
+def stale_after():
+    """Maximum age in seconds of a cache entry, or None while this worker is
+    told about every write (or is not serving an app at all)."""
+    if _stats['status'] in ('off', 'connecting', 'connected'):
+        return None
+    return env_number("CACHE_INVALIDATION_TTL", 30.0, float)
+
+
+def get_invalidation_stats() -> dict:
+    """Listener state and counters for this worker."""
+    stats = dict(_stats)
+    stats['stale_after'] = stale_after()
+    return stats
+
+
+def _dispatch(entity, id=None, version=None):
+    with _handlers_lock:
+        handlers = list(_handlers.get(entity, ())) if entity is not None else [
+            handler for registered in _handlers.values() for handler in registered
+        ]
+    for handler in handlers:
+        try:
+            handler(id, version)
+            _stats['dispatched'] += 1
+        except Exception as e:
+            _stats['errors'] += 1
+            print(f"WARNING: cache invalidation handler for {entity or '*'} failed: {e}")
+
+
+def _handle_notification(payload: str):
+    _stats['received'] += 1
+    try:
+        message = json.loads(payload)
+    except ValueError:
+        print(f"WARNING: ignoring malformed cache invalidation {payload!r}")
+        return
+    _dispatch(message.get('entity'), message.get('id'), message.get('version'))
+
+
+def _listen(database_url: str):
+    connected_before = False
+    while not _stop.is_set():
+        conn = None
+        try:
+            conn = psycopg2.connect(database_url, keepalives=1, keepalives_idle=10,
+                                    keepalives_interval=5, keepalives_count=3)
+            conn.autocommit = True
+            cur = conn.cursor()
+            cur.execute(f"LISTEN {INVALIDATION_CHANNEL}")
+            _stats['status'] = 'connected'
+            if connected_before:
+                _stats['reconnects'] += 1
+                _dispatch(None)
+            connected_before = True
+
+            while not _stop.is_set():
+                # Drained before waiting: the keepalive below can read
+                # notifications off the socket, and select() would not wake
+                # for them again.
+                while conn.notifies:
+                    _handle_notification(conn.notifies.pop(0).payload)
+                if select.select([conn], [], [], _POLL_SECONDS) == ([], [], []):
+                    cur.execute("SELECT 1")
+                    continue
+                conn.poll()
+        except Exception as e:
+            _stats['status'] = 'disconnected'
+            _stats['last_error'] = str(e)
+            print(f"WARNING: cache invalidation listener disconnected, caches expire after "
+                  f"{stale_after()}s until it reconnects: {e}")
+            _stop.wait(_RETRY_SECONDS)
+        finally:
+            if conn is not None:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+    _stats['status'] = 'off'
+
+
+def start_invalidation_listener():
+    """Start this process's listener thread if it is not running (safe to call
+    after a fork: the child starts its own)."""
+    global _listener, _listener_pid
+    if _listener is not None and _listener_pid == os.getpid() and _listener.is_alive():
+        return _listener
+    database_url = os.environ.get("DATABASE_URL")
+    if not database_url:
+        return None
+    with _listener_lock:
+        if _listener is None or _listener_pid != os.getpid() or not _listener.is_alive():
+            _stop.clear()
+            _stats['status'] = 'connecting'
+            _listener = threading.Thread(target=_listen, args=(database_url,),
+                                         name='cache-invalidation', daemon=True)
+            _listener.start()
+            _listener_pid = os.getpid()
+    return _listener
+
+
+def stop_invalidation_listener(timeout: float = None):
+    """Stop the listener; caches go back to unbounded entry lifetimes."""
+    _stop.set()
+    if _listener is not None and _listener_pid == os.getpid():
+        _listener.join(timeout)
+
+
+def init_cache_invalidation(app):
+    """Run the invalidation listener in every worker serving a Flask app.
+
+    Started on the first request rather than at import, so workers forked
+    from a preloaded app each get their own thread and connection.
+    """
+    if os.environ.get("CACHE_INVALIDATION_LISTENER", "1") == "0":
+        _stats['status'] = 'disabled'
+        return
+
+    @app.before_request
+    def _ensure_invalidation_listener():
+        start_invalidation_listener()
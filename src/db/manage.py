@@ -0,0 +1,137 @@
+"""
+Database management commands.
+
+    python -m src.db.manage status      # is the schema/content fingerprint current?
+    python -m src.db.manage migrate     # apply pending migrations only
+    python -m src.db.manage seed        # bulk-load catalog content and record the fingerprint
+                                        # (--row-by-row for the original per-row seed path)
+    python -m src.db.manage bootstrap   # migrate + seed unless already current (--force to always run)
+    python -m src.db.manage catalog     # compile the read-only content catalog artifact
+                                        # (seed, bootstrap and catalog tell running workers to reload it)
+    python -m src.db.manage backfill-players   # create missing per-player rows for existing players
+    python -m src.db.manage competitions       # fold buffered competition scores, finalize ended ones
+                                               # (--end ACTIVE_ID to end a competition now)
+"""
+
+import argparse
+import sys
+
+from .bootstrap import (
+    bootstrap_database,
+    compute_boot_fingerprint,
+    is_database_current,
+    mark_database_current,
+)
+from .bulk import bulk_seed_all
+from .catalog import load_catalog, notify_catalog_changed
+from .competition_scores import drain_competition_scores, finalize_competitions
+from .connection import get_connection, return_connection
+from .migrations import MIGRATIONS, get_applied_migrations, migrate, pending_migrations
+from .provisioning import backfill_player_rows
+from .seed import seed_all
+
+
+def cmd_status(args):
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        pending = pending_migrations(get_applied_migrations(cur))
+    except Exception as e:
+        conn.rollback()
+        pending = MIGRATIONS
+        print(f"schema_version unavailable: {e}")
+    finally:
+        cur.close()
+        return_connection(conn)
+
+    current = is_database_current()
+    print(f"Latest migration: {MIGRATIONS[-1].version} ({MIGRATIONS[-1].name})")
+    print(f"Pending migrations: {', '.join(str(m.version) for m in pending) or 'none'}")
+    print(f"Boot fingerprint: {compute_boot_fingerprint()[:16]} ({'current' if current else 'stale'})")
+    return 0 if current else 1
+
+
+def cmd_migrate(args):
+    applied = migrate()
+    print(f"Applied migrations: {', '.join(str(v) for v in applied) or 'none'}")
+    return 0
+
+
+def cmd_seed(args):
+    if args.row_by_row:
+        seed_all()
+        print("Seed complete.")
+    else:
+        result = bulk_seed_all()
+        print(f"Bulk seed complete in {result['seconds']}s: "
+              f"{result['rows_batched']} rows batched, {result['statements']} statements.")
+    mark_database_current()
+    notify_catalog_changed()
+    return 0
+
+
+def cmd_bootstrap(args):
+    did_work = bootstrap_database(force=args.force)
+    if did_work:
+        notify_catalog_changed()
+    print("Database bootstrapped." if did_work else "Database already current; nothing to do.")
+    return 0
+
+
+def cmd_catalog(args):
+    notify_catalog_changed(args.path)
+    catalog = load_catalog(args.path)
+    counts = ', '.join(f"{table}={count}" for table, count in catalog.stats().items() if table != 'version')
+    print(f"Catalog {catalog.version[:16]} compiled: {counts}")
+    return 0
+
+
+def cmd_backfill_players(args):
+    result = backfill_player_rows(batch_size=args.batch_size)
+    created = ', '.join(f"{table}={count}" for table, count in result['created'].items())
+    print(f"Provisioned {result['players']} players in {result['seconds']}s: {created}")
+    return 0
+
+
+def cmd_competitions(args):
+    if args.end:
+        ended = finalize_competitions(args.end)
+        print(f"Ended competitions: {', '.join(str(a) for a in ended) or 'none'}")
+    result = drain_competition_scores(batch_size=args.batch_size)
+    print(f"Folded {result['events']} score events into {result['entries']} entries "
+          f"in {result['batches']} batches ({result['seconds']}s); "
+          f"finalized: {', '.join(str(a) for a in result['finalized']) or 'none'}")
+    return 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m src.db.manage', description='Business Tycoon RPG database management')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('status', help='Report pending migrations and fingerprint state').set_defaults(func=cmd_status)
+    sub.add_parser('migrate', help='Apply pending schema migrations').set_defaults(func=cmd_migrate)
+    seed = sub.add_parser('seed', help='Seed catalog content and record the fingerprint')
+    seed.add_argument('--row-by-row', action='store_true', help='Use the per-row seed functions without batching')
+    seed.set_defaults(func=cmd_seed)
+    bootstrap = sub.add_parser('bootstrap', help='Migrate and seed unless already current')
+    bootstrap.add_argument('--force', action='store_true', help='Run even if the fingerprint is current')
+    bootstrap.set_defaults(func=cmd_bootstrap)
+    catalog = sub.add_parser('catalog', help='Compile the content catalog artifact')
+    catalog.add_argument('--path', help='Artifact path (default: CATALOG_PATH or content/catalog.compiled.json)')
+    catalog.set_defaults(func=cmd_catalog)
+
+    backfill = sub.add_parser('backfill-players', help='Create missing per-player rows for existing players')
+    backfill.add_argument('--batch-size', type=int, default=1000, help='Players per transaction (default 1000)')
+    backfill.set_defaults(func=cmd_backfill_players)
+
+    competitions = sub.add_parser('competitions', help='Fold buffered competition scores and finalize ended competitions')
+    competitions.add_argument('--end', type=int, action='append', metavar='ACTIVE_ID',
+                              help='End this competition now and fix its ranks (repeatable)')
+    competitions.add_argument('--batch-size', type=int, help='Events per fold (default COMPETITION_FOLD_BATCH or 5000)')
+    competitions.set_defaults(func=cmd_competitions)
+
+    args = parser.parse_args(argv)
+    return args.func(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
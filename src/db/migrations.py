@@ -0,0 +1,636 @@
+"""
+Versioned schema migrations.
+
+Each migration is a numbered, named list of SQL statements. Applied
+migrations are recorded in schema_version together with a checksum of their
+statements, so boot only runs what is pending and refuses to continue if an
+already-applied migration has been edited in place.
+
+To change the schema, append a new Migration to MIGRATIONS; never edit one
+that has shipped.
+"""
+
+import hashlib
+import time
+from typing import NamedTuple
+
+from .connection import get_connection, return_connection
+from .invalidation import INVALIDATION_CHANNEL
+from .schema import create_baseline_schema
+
+# Arbitrary constant so concurrent gunicorn workers migrate one at a time.
+MIGRATION_LOCK_ID = 720_001
+
+
+class MigrationError(Exception):
+    """Raised when the recorded migration history does not match the code."""
+
+
+class Migration(NamedTuple):
+    version: int
+    name: str
+    statements: tuple
+
+    @property
+    def checksum(self) -> str:
+        digest = hashlib.sha256()
+        for statement in self.statements:
+            digest.update(' '.join(statement.split()).encode('utf-8'))
+            digest.update(b'\0')
+        return digest.hexdigest()
+
+
+class _StatementRecorder:
+    """Cursor stand-in that captures the SQL a schema function would run."""
+
+    def __init__(self):
+        self.statements = []
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+
+
+def _recorded(schema_fn) -> tuple:
+    recorder = _StatementRecorder()
+    schema_fn(recorder)
+    return tuple(recorder.statements)
+
+
+# Tables whose rows make up the cached player state (src.engine.player_cache).
+PLAYER_STATE_TABLES = (
+    'player_discipline_progress',
+    'player_stats',
+    'player_inventory',
+    'player_achievements',
+)
+
+
+def _player_state_version_statements() -> tuple:
+    """player_profiles.state_version, bumped by every write to a player's
+    profile or to any PLAYER_STATE_TABLES row. Child tables use statement
+    triggers over transition tables, so a bulk write bumps each player once."""
+    statements = [
+        "ALTER TABLE player_profiles ADD COLUMN IF NOT EXISTS state_version BIGINT NOT NULL DEFAULT 0",
+        """
+        CREATE OR REPLACE FUNCTION bump_player_state_version() RETURNS trigger AS $$
+        BEGIN
+            IF NEW.state_version = OLD.state_version THEN
+                NEW.state_version := OLD.state_version + 1;
+            END IF;
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        "DROP TRIGGER IF EXISTS trg_player_profiles_state_version ON player_profiles",
+        """
+        CREATE TRIGGER trg_player_profiles_state_version
+        BEFORE UPDATE ON player_profiles
+        FOR EACH ROW EXECUTE FUNCTION bump_player_state_version()
+        """,
+        """
+        CREATE OR REPLACE FUNCTION bump_player_state_version_from_rows() RETURNS trigger AS $$
+        BEGIN
+            UPDATE player_profiles SET state_version = state_version + 1
+            WHERE player_id IN (SELECT DISTINCT player_id FROM changed_rows);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+    ]
+    # A trigger with a transition table may only fire on one event.
+    for table in PLAYER_STATE_TABLES:
+        for event, transition in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+            trigger = f"trg_{table}_state_version_{event.lower()}"
+            statements.append(f"DROP TRIGGER IF EXISTS {trigger} ON {table}")
+            statements.append(f"""
+                CREATE TRIGGER {trigger}
+                AFTER {event} ON {table}
+                REFERENCING {transition} TABLE AS changed_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION bump_player_state_version_from_rows()
+            """)
+    return tuple(statements)
+
+
+# player_profiles columns that nearly every action updates (migration 5) and
+# their types; the rest of the profile stays in player_identity.
+PLAYER_COUNTER_COLUMNS = {
+    'total_cash': 'DECIMAL(15, 2) DEFAULT 10000.00',
+    'business_reputation': 'INTEGER DEFAULT 50',
+    'current_month': 'INTEGER DEFAULT 1',
+    'team_morale': 'INTEGER DEFAULT 100',
+    'brand_equity': 'INTEGER DEFAULT 100',
+    'fiscal_quarter': 'INTEGER DEFAULT 1',
+    'decisions_this_quarter': 'INTEGER DEFAULT 0',
+    'last_played': 'TIMESTAMP DEFAULT CURRENT_TIMESTAMP',
+    'state_version': 'BIGINT NOT NULL DEFAULT 0',
+}
+PLAYER_IDENTITY_COLUMNS = (
+    'player_name', 'password_hash', 'chosen_world', 'chosen_industry', 'career_path',
+    'job_title', 'job_level', 'created_at', 'onboarding_seen',
+)
+# Counters written through the view as deltas; see _player_counters_statements().
+_DELTA_COLUMNS = tuple(c for c, t in PLAYER_COUNTER_COLUMNS.items() if t.startswith(('DECIMAL', 'INTEGER')))
+
+
+def _player_counters_statements() -> tuple:
+    """Move the hot counters out of player_profiles into player_counters, a
+    narrow table with free space on each page and no index on any counter, so
+    their updates are HOT and never touch the wide identity row.
+
+    player_profiles becomes a view over player_identity + player_counters.
+    Writes through it are routed by an INSTEAD OF trigger; the view's rows are
+    read without a lock, so counter changes are applied as deltas
+    (x = x + NEW.x - OLD.x) and concurrent `SET x = x + n` stay correct.
+    state_version moves with the counters; an identity update bumps it too.
+    """
+    counters = list(PLAYER_COUNTER_COLUMNS)
+    writable = [c for c in counters if c != 'state_version']
+
+    def delta(column):
+        if column not in _DELTA_COLUMNS:
+            return f"{column} = NEW.{column}"
+        return (f"{column} = CASE WHEN OLD.{column} IS NULL OR NEW.{column} IS NULL THEN NEW.{column} "
+                f"ELSE {column} + (NEW.{column} - OLD.{column}) END")
+
+    def changed(columns):
+        return (f"ROW({', '.join(f'NEW.{c}' for c in columns)}) IS DISTINCT FROM "
+                f"ROW({', '.join(f'OLD.{c}' for c in columns)})")
+
+    statements = [
+        "ALTER TABLE player_profiles RENAME TO player_identity",
+        f"""
+        CREATE TABLE IF NOT EXISTS player_counters (
+            player_id INTEGER PRIMARY KEY REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            {', '.join(f'{c} {t}' for c, t in PLAYER_COUNTER_COLUMNS.items())}
+        ) WITH (fillfactor = 70, autovacuum_vacuum_scale_factor = 0.05)
+        """,
+        f"""
+        INSERT INTO player_counters (player_id, {', '.join(counters)})
+        SELECT player_id, {', '.join(counters)} FROM player_identity
+        ON CONFLICT (player_id) DO NOTHING
+        """,
+        "DROP TRIGGER IF EXISTS trg_player_profiles_state_version ON player_identity",
+        *(f"ALTER TABLE player_identity DROP COLUMN IF EXISTS {c}" for c in counters),
+        """
+        CREATE TRIGGER trg_player_counters_state_version
+        BEFORE UPDATE ON player_counters
+        FOR EACH ROW EXECUTE FUNCTION bump_player_state_version()
+        """,
+        """
+        CREATE OR REPLACE FUNCTION bump_player_state_version_from_rows() RETURNS trigger AS $$
+        BEGIN
+            UPDATE player_counters SET state_version = state_version + 1
+            WHERE player_id IN (SELECT DISTINCT player_id FROM changed_rows);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION bump_player_state_version_from_identity() RETURNS trigger AS $$
+        BEGIN
+            UPDATE player_counters SET state_version = state_version + 1
+            WHERE player_id = NEW.player_id;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER trg_player_identity_state_version
+        AFTER UPDATE ON player_identity
+        FOR EACH ROW EXECUTE FUNCTION bump_player_state_version_from_identity()
+        """,
+        f"""
+        CREATE VIEW player_profiles AS
+        SELECT i.*, {', '.join(f'c.{c}' for c in counters)}
+        FROM player_identity i
+        JOIN player_counters c ON c.player_id = i.player_id
+        """,
+        f"""
+        CREATE OR REPLACE FUNCTION player_profiles_write() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP = 'INSERT' THEN
+                INSERT INTO player_identity (player_id, {', '.join(PLAYER_IDENTITY_COLUMNS)})
+                VALUES (NEW.player_id, {', '.join(f'NEW.{c}' for c in PLAYER_IDENTITY_COLUMNS)});
+                INSERT INTO player_counters (player_id, {', '.join(writable)})
+                VALUES (NEW.player_id, {', '.join(f'NEW.{c}' for c in writable)});
+                RETURN NEW;
+            ELSIF TG_OP = 'UPDATE' THEN
+                IF {changed(PLAYER_IDENTITY_COLUMNS)} THEN
+                    UPDATE player_identity
+                    SET {', '.join(f'{c} = NEW.{c}' for c in PLAYER_IDENTITY_COLUMNS)}
+                    WHERE player_id = OLD.player_id;
+                END IF;
+                IF {changed(writable)} THEN
+                    UPDATE player_counters
+                    SET {', '.join(delta(c) for c in writable)}
+                    WHERE player_id = OLD.player_id
+                    RETURNING {', '.join(counters)}
+                    INTO {', '.join(f'NEW.{c}' for c in counters)};
+                END IF;
+                RETURN NEW;
+            END IF;
+            DELETE FROM player_identity WHERE player_id = OLD.player_id;
+            RETURN OLD;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER trg_player_profiles_write
+        INSTEAD OF INSERT OR UPDATE OR DELETE ON player_profiles
+        FOR EACH ROW EXECUTE FUNCTION player_profiles_write()
+        """,
+        # INSERTs through the view get the base tables' column defaults.
+        """
+        DO $$
+        DECLARE col record;
+        BEGIN
+            FOR col IN
+                SELECT a.attname, pg_get_expr(d.adbin, d.adrelid) AS expr
+                FROM pg_attribute a
+                JOIN pg_attrdef d ON d.adrelid = a.attrelid AND d.adnum = a.attnum
+                WHERE a.attrelid IN ('player_identity'::regclass, 'player_counters'::regclass)
+                AND a.attnum > 0 AND NOT a.attisdropped
+            LOOP
+                EXECUTE format('ALTER VIEW player_profiles ALTER COLUMN %I SET DEFAULT %s', col.attname, col.expr);
+            END LOOP;
+        END;
+        $$
+        """,
+    ]
+    return tuple(statements)
+
+
+# Leaderboard category -> leaderboard_cache column (migration 7).
+LEADERBOARD_COLUMNS = {
+    'stars': 'total_stars',
+    'wealth': 'total_wealth',
+    'levels': 'total_levels',
+}
+
+
+def _leaderboard_statements() -> tuple:
+    """Keep leaderboard_cache current from the writes that change a score,
+    instead of aggregating every player on every leaderboard read.
+
+    Completions are applied as per-player deltas from the statement's
+    transition tables; a player's discipline levels are re-summed (six rows);
+    wealth is copied from player_counters.total_cash. Each category has a
+    (score DESC, player_id) index, so top-N reads the first N index entries.
+    """
+    statements = [
+        "ALTER TABLE leaderboard_cache ADD COLUMN IF NOT EXISTS total_levels INTEGER NOT NULL DEFAULT 6",
+        """
+        INSERT INTO leaderboard_cache (player_id, total_stars, total_scenarios_completed,
+                                       total_wealth, total_levels, highest_discipline_level)
+        SELECT i.player_id, COALESCE(s.stars, 0), COALESCE(s.completed, 0),
+               COALESCE(c.total_cash, 0), COALESCE(d.total, 6), COALESCE(d.highest, 1)
+        FROM player_identity i
+        LEFT JOIN player_counters c ON c.player_id = i.player_id
+        LEFT JOIN (
+            SELECT player_id, SUM(COALESCE(stars_earned, 0)) AS stars, COUNT(*) AS completed
+            FROM completed_scenarios GROUP BY player_id
+        ) s ON s.player_id = i.player_id
+        LEFT JOIN (
+            SELECT player_id, SUM(current_level) AS total, MAX(current_level) AS highest
+            FROM player_discipline_progress GROUP BY player_id
+        ) d ON d.player_id = i.player_id
+        ON CONFLICT (player_id) DO UPDATE SET
+            total_stars = EXCLUDED.total_stars,
+            total_scenarios_completed = EXCLUDED.total_scenarios_completed,
+            total_wealth = EXCLUDED.total_wealth,
+            total_levels = EXCLUDED.total_levels,
+            highest_discipline_level = EXCLUDED.highest_discipline_level,
+            updated_at = CURRENT_TIMESTAMP
+        """,
+        *(f"""
+        CREATE INDEX IF NOT EXISTS idx_leaderboard_{category}
+        ON leaderboard_cache ({column} DESC, player_id)
+        """ for category, column in LEADERBOARD_COLUMNS.items()),
+        """
+        CREATE OR REPLACE FUNCTION leaderboard_apply_completions() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO leaderboard_cache AS lc (player_id, total_stars, total_scenarios_completed)
+                SELECT player_id, SUM(COALESCE(stars_earned, 0)), COUNT(*)
+                FROM new_rows GROUP BY player_id
+                ON CONFLICT (player_id) DO UPDATE SET
+                    total_stars = lc.total_stars + EXCLUDED.total_stars,
+                    total_scenarios_completed = lc.total_scenarios_completed + EXCLUDED.total_scenarios_completed,
+                    updated_at = CURRENT_TIMESTAMP;
+            END IF;
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                UPDATE leaderboard_cache lc
+                SET total_stars = lc.total_stars - o.stars,
+                    total_scenarios_completed = lc.total_scenarios_completed - o.completed,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (
+                    SELECT player_id, SUM(COALESCE(stars_earned, 0)) AS stars, COUNT(*) AS completed
+                    FROM old_rows GROUP BY player_id
+                ) o
+                WHERE lc.player_id = o.player_id;
+            END IF;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION leaderboard_refresh_levels() RETURNS trigger AS $$
+        BEGIN
+            -- UPDATE only: deleting a player cascades here after its
+            -- leaderboard row is gone.
+            UPDATE leaderboard_cache lc
+            SET total_levels = l.total,
+                highest_discipline_level = l.highest,
+                updated_at = CURRENT_TIMESTAMP
+            FROM (
+                SELECT p.player_id, COALESCE(SUM(d.current_level), 6) AS total,
+                       COALESCE(MAX(d.current_level), 1) AS highest
+                FROM (SELECT DISTINCT player_id FROM changed_rows) p
+                LEFT JOIN player_discipline_progress d ON d.player_id = p.player_id
+                GROUP BY p.player_id
+            ) l
+            WHERE lc.player_id = l.player_id
+            AND (lc.total_levels, lc.highest_discipline_level) IS DISTINCT FROM (l.total, l.highest);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE OR REPLACE FUNCTION leaderboard_copy_wealth() RETURNS trigger AS $$
+        BEGIN
+            INSERT INTO leaderboard_cache AS lc (player_id, total_wealth)
+            VALUES (NEW.player_id, COALESCE(NEW.total_cash, 0))
+            ON CONFLICT (player_id) DO UPDATE SET
+                total_wealth = EXCLUDED.total_wealth,
+                updated_at = CURRENT_TIMESTAMP
+            WHERE lc.total_wealth IS DISTINCT FROM EXCLUDED.total_wealth;
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER trg_completed_scenarios_leaderboard_insert
+        AFTER INSERT ON completed_scenarios
+        REFERENCING NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard_apply_completions()
+        """,
+        """
+        CREATE TRIGGER trg_completed_scenarios_leaderboard_update
+        AFTER UPDATE ON completed_scenarios
+        REFERENCING OLD TABLE AS old_rows NEW TABLE AS new_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard_apply_completions()
+        """,
+        """
+        CREATE TRIGGER trg_completed_scenarios_leaderboard_delete
+        AFTER DELETE ON completed_scenarios
+        REFERENCING OLD TABLE AS old_rows
+        FOR EACH STATEMENT EXECUTE FUNCTION leaderboard_apply_completions()
+        """,
+        # Wealth changes on most actions: fire per row, only when it changed.
+        """
+        CREATE TRIGGER trg_player_counters_leaderboard_insert
+        AFTER INSERT ON player_counters
+        FOR EACH ROW EXECUTE FUNCTION leaderboard_copy_wealth()
+        """,
+        """
+        CREATE TRIGGER trg_player_counters_leaderboard_update
+        AFTER UPDATE OF total_cash ON player_counters
+        FOR EACH ROW WHEN (OLD.total_cash IS DISTINCT FROM NEW.total_cash)
+        EXECUTE FUNCTION leaderboard_copy_wealth()
+        """,
+    ]
+    for event, transition in (('INSERT', 'NEW'), ('UPDATE', 'NEW'), ('DELETE', 'OLD')):
+        statements.append(f"""
+            CREATE TRIGGER trg_player_discipline_progress_leaderboard_{event.lower()}
+            AFTER {event} ON player_discipline_progress
+            REFERENCING {transition} TABLE AS changed_rows
+            FOR EACH STATEMENT EXECUTE FUNCTION leaderboard_refresh_levels()
+        """)
+    return tuple(statements)
+
+
+MIGRATIONS = [
+    Migration(1, 'baseline_schema', _recorded(create_baseline_schema)),
+    Migration(2, 'player_query_indexes', (
+        "CREATE INDEX IF NOT EXISTS idx_player_profiles_lower_name ON player_profiles (LOWER(player_name))",
+        "CREATE INDEX IF NOT EXISTS idx_player_profiles_last_played ON player_profiles (last_played DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_player_profiles_total_cash ON player_profiles (total_cash DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_news_ticker_player_created ON news_ticker (player_id, created_at DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_completed_scenarios_scenario ON completed_scenarios (scenario_id)",
+        "CREATE INDEX IF NOT EXISTS idx_scenario_master_lookup ON scenario_master (world_type, industry, discipline, required_level) WHERE is_active",
+        "CREATE INDEX IF NOT EXISTS idx_journal_entries_player_period ON journal_entries (player_id, period_id) WHERE is_posted",
+        "CREATE INDEX IF NOT EXISTS idx_journal_lines_entry ON journal_lines (entry_id)",
+        "CREATE INDEX IF NOT EXISTS idx_journal_lines_account ON journal_lines (account_id)",
+        "CREATE INDEX IF NOT EXISTS idx_account_balances_player_period ON account_balances (player_id, period_id)",
+        "CREATE INDEX IF NOT EXISTS idx_pending_transactions_player_open ON pending_transactions (player_id) WHERE NOT is_processed",
+        "CREATE INDEX IF NOT EXISTS idx_player_daily_missions_player_date ON player_daily_missions (player_id, assigned_date)",
+        "CREATE INDEX IF NOT EXISTS idx_project_initiatives_player ON project_initiatives (player_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_project_tasks_initiative ON project_tasks (initiative_id)",
+        "CREATE INDEX IF NOT EXISTS idx_player_employees_player ON player_employees (player_id, status)",
+        "CREATE INDEX IF NOT EXISTS idx_player_risks_player ON player_risks (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_player_event_history_player ON player_event_history (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_rival_battles_player ON rival_battles (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_business_plans_player ON business_plans (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_player_pitch_decks_player ON player_pitch_decks (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_cash_flow_forecasts_player ON cash_flow_forecasts (player_id) WHERE is_active",
+        "CREATE INDEX IF NOT EXISTS idx_suppliers_player ON suppliers (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_supply_chain_products_player ON supply_chain_products (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_player_market_position_player ON player_market_position (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_player_network_player ON player_network (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_competition_entries_score ON competition_entries (active_id, score DESC)",
+        "CREATE INDEX IF NOT EXISTS idx_trade_listings_active ON trade_listings (created_at DESC) WHERE status = 'active'",
+    )),
+    Migration(3, 'app_state', (
+        """
+        CREATE TABLE IF NOT EXISTS app_state (
+            key VARCHAR(100) PRIMARY KEY,
+            value TEXT NOT NULL,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+    )),
+    Migration(4, 'player_state_version', _player_state_version_statements()),
+    Migration(5, 'player_counters', _player_counters_statements()),
+    # Announce each changed player once per transaction, at commit, with the
+    # final state_version: the trigger is deferred and reads the version then,
+    # so repeated bumps send identical payloads, which NOTIFY collapses.
+    Migration(6, 'player_state_notify', (
+        f"""
+        CREATE OR REPLACE FUNCTION notify_player_state_changed() RETURNS trigger AS $$
+        DECLARE changed_id INTEGER;
+        BEGIN
+            IF TG_OP = 'DELETE' THEN
+                changed_id := OLD.player_id;
+            ELSE
+                changed_id := NEW.player_id;
+            END IF;
+            PERFORM pg_notify('{INVALIDATION_CHANNEL}', json_build_object(
+                'entity', 'player',
+                'id', changed_id,
+                'version', (SELECT state_version FROM player_counters WHERE player_id = changed_id)
+            )::text);
+            RETURN NULL;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE CONSTRAINT TRIGGER trg_player_counters_notify
+        AFTER UPDATE OR DELETE ON player_counters
+        DEFERRABLE INITIALLY DEFERRED
+        FOR EACH ROW EXECUTE FUNCTION notify_player_state_changed()
+        """,
+    )),
+    Migration(7, 'leaderboards', _leaderboard_statements()),
+    # Stamp leaderboard rows with the writing transaction's id, so a reader
+    # can fetch exactly the rows committed since its last read: every
+    # transaction it could not see then has an id >= that snapshot's xmin.
+    Migration(8, 'leaderboard_changed_xid', (
+        "ALTER TABLE leaderboard_cache ADD COLUMN IF NOT EXISTS changed_xid BIGINT NOT NULL DEFAULT 0",
+        """
+        CREATE OR REPLACE FUNCTION leaderboard_stamp_xid() RETURNS trigger AS $$
+        BEGIN
+            NEW.changed_xid := txid_current();
+            RETURN NEW;
+        END;
+        $$ LANGUAGE plpgsql
+        """,
+        """
+        CREATE TRIGGER trg_leaderboard_cache_changed_xid
+        BEFORE INSERT OR UPDATE ON leaderboard_cache
+        FOR EACH ROW EXECUTE FUNCTION leaderboard_stamp_xid()
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_leaderboard_changed_xid ON leaderboard_cache (changed_xid)",
+    )),
+    Migration(9, 'competition_score_events', (
+        """
+        CREATE TABLE IF NOT EXISTS competition_score_events (
+            event_id BIGSERIAL PRIMARY KEY,
+            active_id INTEGER NOT NULL REFERENCES active_competitions(active_id) ON DELETE CASCADE,
+            player_id INTEGER NOT NULL,
+            delta INTEGER NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        )
+        """,
+        "CREATE INDEX IF NOT EXISTS idx_competition_score_events_active ON competition_score_events (active_id)",
+        "CREATE INDEX IF NOT EXISTS idx_competition_entries_player ON competition_entries (player_id)",
+        "CREATE INDEX IF NOT EXISTS idx_active_competitions_status_end ON active_competitions (status, end_date)",
+    )),
+    # Contributions are added to one of several shard rows per challenge, so
+    # concurrent contributors rarely touch the same row; totals are
+    # global_challenges' own columns plus the sum of its shards.
+    Migration(10, 'global_challenge_shards', (
+        """
+        CREATE TABLE IF NOT EXISTS global_challenge_shards (
+            challenge_id INTEGER NOT NULL REFERENCES global_challenges(challenge_id) ON DELETE CASCADE,
+            shard SMALLINT NOT NULL,
+            progress BIGINT NOT NULL DEFAULT 0,
+            participants INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (challenge_id, shard)
+        ) WITH (fillfactor = 70)
+        """,
+    )),
+    # Boss damage is added to one of several stripe rows per boss and to the
+    # attacker's boss_participants row; HP is health_points minus the stripes'
+    # sum, and the boss row is written once, when it is defeated.
+    Migration(11, 'boss_damage', (
+        """
+        CREATE TABLE IF NOT EXISTS boss_participants (
+            boss_id INTEGER NOT NULL REFERENCES limited_time_bosses(boss_id) ON DELETE CASCADE,
+            player_id INTEGER NOT NULL REFERENCES player_identity(player_id) ON DELETE CASCADE,
+            damage_dealt BIGINT NOT NULL DEFAULT 0,
+            attacks INTEGER NOT NULL DEFAULT 0,
+            last_attack_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (boss_id, player_id)
+        ) WITH (fillfactor = 70)
+        """,
+        """
+        CREATE TABLE IF NOT EXISTS boss_damage_stripes (
+            boss_id INTEGER NOT NULL REFERENCES limited_time_bosses(boss_id) ON DELETE CASCADE,
+            stripe SMALLINT NOT NULL,
+            damage BIGINT NOT NULL DEFAULT 0,
+            PRIMARY KEY (boss_id, stripe)
+        ) WITH (fillfactor = 70)
+        """,
+        "ALTER TABLE limited_time_bosses ADD COLUMN IF NOT EXISTS defeated_at TIMESTAMP",
+        "ALTER TABLE limited_time_bosses ADD COLUMN IF NOT EXISTS defeated_by INTEGER",
+        # Damage already taken (current_hp below health_points) carries over as stripe 0.
+        """
+        INSERT INTO boss_damage_stripes (boss_id, stripe, damage)
+        SELECT boss_id, 0, health_points - current_hp FROM limited_time_bosses
+        WHERE current_hp < health_points
+        ON CONFLICT (boss_id, stripe) DO NOTHING
+        """,
+    )),
+    # Regeneration anchors become absolute instants, so SQL (now()) and
+    # Python (aware UTC datetimes) agree whatever the session time zone. The
+    # old values were written by SQL in the session time zone, which is how
+    # the cast reads them.
+    Migration(12, 'regen_anchor_timestamptz', (
+        "ALTER TABLE player_energy ALTER COLUMN last_recharge_at TYPE TIMESTAMPTZ USING last_recharge_at::timestamptz",
+        "ALTER TABLE player_idle_income ALTER COLUMN last_collection_at TYPE TIMESTAMPTZ USING last_collection_at::timestamptz",
+    )),
+]
+
+
+def _ensure_version_table(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(100) NOT NULL,
+            checksum CHAR(64) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        );
+    """)
+
+
+def get_applied_migrations(cur) -> dict:
+    """Map of applied version -> recorded checksum."""
+    cur.execute("SELECT version, checksum FROM schema_version ORDER BY version")
+    return {row['version']: row['checksum'] for row in cur.fetchall()}
+
+
+def pending_migrations(applied: dict) -> list:
+    """Migrations not yet applied, after verifying the applied ones are unchanged."""
+    known = {m.version: m for m in MIGRATIONS}
+    for version, checksum in applied.items():
+        migration = known.get(version)
+        if migration is None:
+            raise MigrationError(f"Database has migration {version} which this code does not know about")
+        if migration.checksum != checksum.strip():
+            raise MigrationError(
+                f"Migration {version} ({migration.name}) was modified after being applied"
+            )
+    return [m for m in MIGRATIONS if m.version not in applied]
+
+
+def migrate() -> list:
+    """Apply pending migrations in order; returns the versions applied."""
+    conn = get_connection()
+    cur = conn.cursor()
+    applied_now = []
+    try:
+        cur.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID,))
+        try:
+            _ensure_version_table(cur)
+            conn.commit()
+
+            for migration in pending_migrations(get_applied_migrations(cur)):
+                started = time.monotonic()
+                for statement in migration.statements:
+                    cur.execute(statement)
+                cur.execute("""
+                    INSERT INTO schema_version (version, name, checksum, duration_ms)
+                    VALUES (%s, %s, %s, %s)
+                """, (migration.version, migration.name, migration.checksum,
+                      int((time.monotonic() - started) * 1000)))
+                conn.commit()
+                applied_now.append(migration.version)
+        finally:
+            conn.rollback()
+            cur.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID,))
+            conn.commit()
+    finally:
+        cur.close()
+        return_connection(conn)
+    return applied_now
@@ -0,0 +1,193 @@
+"""
+Bounded PostgreSQL connection pool.
+
+Callers that find the pool exhausted wait in a queue for up to `timeout`
+seconds instead of opening connections outside the pool. Idle connections
+are pre-pinged before reuse so a database restart does not surface as an
+error on the next request, and checkout latency, occupancy and overflow
+events are tracked for monitoring.
+"""
+
+import threading
+import time
+from collections import deque
+
+import psycopg2
+from psycopg2 import pool, extensions
+from psycopg2.extras import RealDictCursor
+
+
+class PoolTimeout(pool.PoolError):
+    """Raised when no connection became available within the wait timeout."""
+
+
+class BoundedConnectionPool:
+    """Thread-safe pool that never exceeds `maxconn` open connections."""
+
+    def __init__(self, dsn: str, minconn: int = 2, maxconn: int = 20,
+                 timeout: float = 30.0, ping_after: float = 30.0, readonly: bool = False,
+                 cursor_factory=RealDictCursor):
+        if minconn < 0 or maxconn < 1 or minconn > maxconn:
+            raise ValueError(f"Invalid pool size: minconn={minconn}, maxconn={maxconn}")
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.ping_after = ping_after
+        self.readonly = readonly
+        self.cursor_factory = cursor_factory
+
+        self._cond = threading.Condition()
+        self._idle = deque()
+        self._in_use = set()
+        self._opened = 0
+        self._waiting = 0
+        self._closed = False
+
+        self._checkouts = 0
+        self._overflow_events = 0
+        self._timeouts = 0
+        self._reconnects = 0
+        self._wait_total = 0.0
+        self._wait_max = 0.0
+
+        for _ in range(minconn):
+            self._idle.append((self._connect(), time.monotonic()))
+            self._opened += 1
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn, cursor_factory=self.cursor_factory)
+        if self.readonly:
+            # Replica connections never write; autocommit keeps them from
+            # holding a snapshot (and blocking replay) between queries.
+            conn.set_session(readonly=True, autocommit=True)
+        return conn
+
+    def _is_alive(self, conn, idle_since: float) -> bool:
+        if conn.closed:
+            return False
+        if time.monotonic() - idle_since < self.ping_after:
+            return True
+        try:
+            cur = conn.cursor()
+            cur.execute("SELECT 1")
+            cur.close()
+            conn.rollback()
+            return True
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+
+    def getconn(self, timeout: float = None):
+        """Check out a connection, waiting up to `timeout` seconds for one."""
+        started = time.monotonic()
+        deadline = started + (self.timeout if timeout is None else timeout)
+        conn = None
+        idle_since = None
+
+        with self._cond:
+            waited = False
+            while True:
+                if self._closed:
+                    raise pool.PoolError("connection pool is closed")
+                if self._idle:
+                    conn, idle_since = self._idle.pop()
+                    break
+                if self._opened < self.maxconn:
+                    self._opened += 1
+                    break
+                if not waited:
+                    self._overflow_events += 1
+                    waited = True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    self._timeouts += 1
+                    raise PoolTimeout(
+                        f"no database connection available after {self.timeout:.1f}s "
+                        f"({self.maxconn} in use)"
+                    )
+                self._waiting += 1
+                try:
+                    self._cond.wait(remaining)
+                finally:
+                    self._waiting -= 1
+
+        try:
+            if conn is not None and not self._is_alive(conn, idle_since):
+                self._discard(conn)
+                conn = None
+                with self._cond:
+                    self._reconnects += 1
+            if conn is None:
+                conn = self._connect()
+        except Exception:
+            with self._cond:
+                self._opened -= 1
+                self._cond.notify()
+            raise
+
+        waited_for = time.monotonic() - started
+        with self._cond:
+            self._in_use.add(id(conn))
+            self._checkouts += 1
+            self._wait_total += waited_for
+            self._wait_max = max(self._wait_max, waited_for)
+        return conn
+
+    def putconn(self, conn, close: bool = False):
+        """Return a connection to the pool, rolling back any open transaction."""
+        if not close and not conn.closed:
+            try:
+                if conn.info.transaction_status != extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                close = True
+
+        with self._cond:
+            if id(conn) not in self._in_use:
+                raise pool.PoolError("trying to put unkeyed connection")
+            self._in_use.discard(id(conn))
+            if close or conn.closed or self._closed:
+                self._opened -= 1
+                self._discard(conn)
+            else:
+                self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    def owns(self, conn) -> bool:
+        """Is `conn` currently checked out from this pool?"""
+        with self._cond:
+            return id(conn) in self._in_use
+
+    def closeall(self):
+        """Close every idle connection and refuse further checkouts."""
+        with self._cond:
+            self._closed = True
+            while self._idle:
+                conn, _ = self._idle.pop()
+                self._opened -= 1
+                self._discard(conn)
+            self._cond.notify_all()
+
+    def stats(self) -> dict:
+        """Snapshot of pool occupancy and checkout latency."""
+        with self._cond:
+            return {
+                'min_size': self.minconn,
+                'max_size': self.maxconn,
+                'open': self._opened,
+                'in_use': len(self._in_use),
+                'idle': len(self._idle),
+                'waiting': self._waiting,
+                'checkouts': self._checkouts,
+                'overflow_events': self._overflow_events,
+                'timeouts': self._timeouts,
+                'reconnects': self._reconnects,
+                'avg_checkout_ms': round(self._wait_total / self._checkouts * 1000, 3) if self._checkouts else 0.0,
+                'max_checkout_ms': round(self._wait_max * 1000, 3),
+            }
@@ -0,0 +1,175 @@
+"""
+Registry of server-side prepared statements for the hottest queries.
+
+Each statement is declared once here with the usual %s placeholders. The
+first execute_prepared() of a statement on a connection sends
+PREPARE ps_<name> AS ...; later calls on that connection send only
+EXECUTE ps_<name>(...), which skips parsing and, once Postgres settles on a
+generic plan, planning too. Prepared statements live as long as the
+connection, so pooled connections keep them across requests.
+
+Prepared statements do not survive a connection-level reset (e.g. a
+transaction-mode pgbouncer); set DB_PREPARED_STATEMENTS=0 to send plain
+statements instead. A migration that changes a table read with SELECT *
+needs a worker restart, as Postgres rejects cached plans whose result
+columns changed.
+"""
+
+import os
+import re
+import weakref
+from typing import NamedTuple
+
+
+class PreparedStatement(NamedTuple):
+    name: str
+    sql: str
+    # What each %s is, in order (benchmarks.prepared_statements fills them in).
+    params: tuple = ('player_id',)
+
+    @property
+    def param_count(self) -> int:
+        return self.sql.count('%s')
+
+    @property
+    def prepare_sql(self) -> str:
+        counter = iter(range(1, self.param_count + 1))
+        body = re.sub(r'%s', lambda _: f"${next(counter)}", self.sql)
+        return f"PREPARE ps_{self.name} AS {body}"
+
+    @property
+    def execute_sql(self) -> str:
+        if not self.param_count:
+            return f"EXECUTE ps_{self.name}"
+        return f"EXECUTE ps_{self.name} ({', '.join(['%s'] * self.param_count)})"
+
+
+PREPARED_STATEMENTS = {}
+
+
+def register_statement(name: str, sql: str, params: tuple = ('player_id',)) -> PreparedStatement:
+    """Declare a prepared statement; names must be unique and `params` must
+    name every placeholder."""
+    if name in PREPARED_STATEMENTS:
+        raise ValueError(f"Prepared statement {name!r} is already registered")
+    statement = PreparedStatement(name, ' '.join(sql.split()), tuple(params))
+    if len(statement.params) != statement.param_count:
+        raise ValueError(f"Prepared statement {name!r} has {statement.param_count} placeholders "
+                         f"but names {len(statement.params)} params")
+    PREPARED_STATEMENTS[name] = statement
+    return statement
+
+
+PLAYER_PROFILE = register_statement('player_profile', """
+    SELECT * FROM player_profiles WHERE player_id = %s
+""")
+# `clean` is false once the current transaction has written anything.
+PLAYER_STATE_VERSION = register_statement('player_state_version', """
+    SELECT state_version, txid_current_if_assigned() IS NULL AS clean
+    FROM player_counters WHERE player_id = %s
+""")
+PLAYER_DISCIPLINES = register_statement('player_disciplines', """
+    SELECT * FROM player_discipline_progress WHERE player_id = %s
+""")
+PLAYER_STATS = register_statement('player_stats', """
+    SELECT * FROM player_stats WHERE player_id = %s
+""")
+PLAYER_INVENTORY = register_statement('player_inventory', """
+    SELECT i.*, pi.quantity FROM player_inventory pi
+    JOIN items i ON pi.item_id = i.item_id
+    WHERE pi.player_id = %s
+""")
+PLAYER_ACHIEVEMENTS = register_statement('player_achievements', """
+    SELECT a.* FROM player_achievements pa
+    JOIN achievements a ON pa.achievement_id = a.achievement_id
+    WHERE pa.player_id = %s
+""")
+PLAYER_ENERGY = register_statement('player_energy', """
+    SELECT * FROM player_energy WHERE player_id = %s
+""")
+# The per-player rows behind GameEngine.get_hub_data(), provisioned with the player.
+PLAYER_HUB_STATE = register_statement('player_hub_state', """
+    SELECT e.current_energy, e.max_energy, e.last_recharge_at,
+           dl.player_id AS daily_login_player_id, dl.current_streak, dl.longest_streak, dl.last_claim_date,
+           ii.player_id AS idle_income_player_id, ii.gold_per_minute, ii.uncollected_gold, ii.last_collection_at,
+           pr.player_id AS prestige_player_id, pr.prestige_level, pr.exp_multiplier, pr.gold_multiplier,
+           pr.total_prestiges
+    FROM player_profiles p
+    LEFT JOIN player_energy e ON e.player_id = p.player_id
+    LEFT JOIN player_daily_login dl ON dl.player_id = p.player_id
+    LEFT JOIN player_idle_income ii ON ii.player_id = p.player_id
+    LEFT JOIN player_prestige pr ON pr.player_id = p.player_id
+    WHERE p.player_id = %s
+""")
+SCENARIO_COMPLETED = register_statement('scenario_completed', """
+    SELECT 1 FROM completed_scenarios WHERE player_id = %s AND scenario_id = %s
+""", params=('player_id', 'scenario_id'))
+COMPANY_RESOURCES = register_statement('company_resources', """
+    SELECT total_cash, team_morale, brand_equity, fiscal_quarter, decisions_this_quarter,
+           state_version, txid_current_if_assigned() IS NULL AS clean
+    FROM player_counters
+    WHERE player_id = %s
+""")
+# Everything ScenariosMixin.process_choice() reads, including whether the
+# scenario is already completed and the player's energy. Locks the player's
+# counters row, the scenario's discipline row and the stats row until the
+# choice is written, so the outcome is computed from current values and the
+# checks and writes cannot interleave with another writer of those rows.
+CHOICE_INPUTS = register_statement('choice_inputs', """
+    SELECT pp.total_cash, pp.business_reputation, pp.current_month,
+           pp.team_morale, pp.brand_equity, pp.fiscal_quarter, pp.decisions_this_quarter,
+           pi.career_path, pi.job_title, pi.job_level,
+           EXISTS (SELECT 1 FROM completed_scenarios cs
+                   WHERE cs.player_id = pp.player_id AND cs.scenario_id = %s) AS completed,
+           (SELECT row_to_json(d) FROM (
+                SELECT discipline_name, current_level, current_exp, total_exp_earned
+                FROM player_discipline_progress
+                WHERE player_id = pp.player_id AND discipline_name = %s
+                FOR NO KEY UPDATE) d) AS discipline,
+           (SELECT row_to_json(s) FROM (
+                SELECT * FROM player_stats WHERE player_id = pp.player_id
+                FOR NO KEY UPDATE) s) AS stats,
+           e.current_energy, e.max_energy, e.last_recharge_at,
+           COALESCE((SELECT json_agg(json_build_object('advisor_id', pa.advisor_id, 'level', pa.level))
+                     FROM player_advisors pa
+                     WHERE pa.player_id = pp.player_id AND pa.is_active = TRUE), '[]'::json) AS advisors,
+           ARRAY(SELECT pe.equipment_id FROM player_equipment pe
+                 WHERE pe.player_id = pp.player_id AND pe.is_equipped = TRUE) AS equipment_ids,
+           ARRAY(SELECT pua.ability_id FROM player_unlocked_abilities pua
+                 WHERE pua.player_id = pp.player_id AND pua.is_active = TRUE) AS ability_ids
+    FROM player_counters pp
+    JOIN player_identity pi ON pi.player_id = pp.player_id
+    LEFT JOIN player_energy e ON e.player_id = pp.player_id
+    WHERE pp.player_id = %s
+    FOR NO KEY UPDATE OF pp
+""", params=('scenario_id', 'discipline', 'player_id'))
+PLAYER_COMPLETED_STARS = register_statement('player_completed_stars', """
+    SELECT scenario_id, stars_earned FROM completed_scenarios WHERE player_id = %s
+""")
+
+
+# raw psycopg2 connection -> names already prepared on it
+_prepared_on = weakref.WeakKeyDictionary()
+
+
+def prepared_statements_enabled() -> bool:
+    return os.environ.get("DB_PREPARED_STATEMENTS", "1") != "0"
+
+
+def execute_prepared(cur, statement, params=()):
+    """Execute a registered statement (object or name) on `cur`, preparing it
+    on the cursor's connection the first time."""
+    if isinstance(statement, str):
+        statement = PREPARED_STATEMENTS[statement]
+    if not prepared_statements_enabled():
+        return cur.execute(statement.sql, params)
+
+    try:
+        prepared = _prepared_on.setdefault(cur.connection, set())
+    except TypeError:
+        return cur.execute(statement.sql, params)
+
+    if statement.name not in prepared:
+        cur.execute(statement.prepare_sql)
+        prepared.add(statement.name)
+    return cur.execute(statement.execute_sql, params)
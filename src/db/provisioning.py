@@ -0,0 +1,103 @@
+"""
+Per-player rows every player has from creation.
+
+player_energy, player_daily_login, player_idle_income and player_prestige
+used to be created by whichever read path noticed they were missing. They are
+now inserted with the player (GameEngine.create_new_player), and existing
+players are filled in by
+
+    python -m src.db.manage backfill-players [--batch-size N]
+
+so reads of them are plain SELECTs. Both use the same single statement, and
+re-running either is harmless (ON CONFLICT DO NOTHING).
+"""
+
+import time
+
+from .connection import get_connection, return_connection
+
+# Same formula as ProgressionMixin._calculate_base_idle_rate().
+_IDLE_RATE_SQL = """ROUND(0.5
+    + 0.1 * (SELECT COUNT(*) FROM completed_scenarios cs WHERE cs.player_id = p.player_id)
+    + 0.05 * COALESCE((SELECT SUM(d.current_level) FROM player_discipline_progress d
+                       WHERE d.player_id = p.player_id), 6), 2)"""
+
+# table -> {column: SQL value}, evaluated per player_identity row p
+PLAYER_ROW_DEFAULTS = {
+    'player_energy': {
+        'current_energy': '100', 'max_energy': '100', 'last_recharge_at': 'CURRENT_TIMESTAMP',
+    },
+    'player_daily_login': {
+        'current_streak': '0', 'longest_streak': '0',
+    },
+    'player_idle_income': {
+        'gold_per_minute': _IDLE_RATE_SQL, 'last_collection_at': 'CURRENT_TIMESTAMP', 'uncollected_gold': '0',
+    },
+    'player_prestige': {
+        'prestige_level': '0', 'exp_multiplier': '1.0', 'gold_multiplier': '1.0', 'total_prestiges': '0',
+    },
+}
+
+
+def _provision_sql() -> str:
+    ctes = []
+    for table, defaults in PLAYER_ROW_DEFAULTS.items():
+        ctes.append(f"""
+            new_{table} AS (
+                INSERT INTO {table} (player_id, {', '.join(defaults)})
+                SELECT p.player_id, {', '.join(defaults.values())}
+                FROM player_identity p
+                WHERE p.player_id = ANY(%(player_ids)s)
+                ON CONFLICT (player_id) DO NOTHING
+                RETURNING player_id
+            )""")
+    counts = ', '.join(f"(SELECT COUNT(*) FROM new_{table}) AS {table}" for table in PLAYER_ROW_DEFAULTS)
+    return f"WITH {','.join(ctes)}\nSELECT {counts}"
+
+
+PROVISION_PLAYER_ROWS_SQL = _provision_sql()
+
+
+def provision_player_rows(cur, player_ids) -> dict:
+    """Create any missing per-player rows for `player_ids` on `cur`, in one
+    statement; returns rows created per table. The caller commits."""
+    cur.execute(PROVISION_PLAYER_ROWS_SQL, {'player_ids': list(player_ids)})
+    row = cur.fetchone()
+    return {table: row[table] for table in PLAYER_ROW_DEFAULTS}
+
+
+def backfill_player_rows(batch_size: int = 1000) -> dict:
+    """Provision every existing player that is missing a per-player row,
+    `batch_size` players per transaction."""
+    missing = ' OR '.join(
+        f"NOT EXISTS (SELECT 1 FROM {table} t WHERE t.player_id = p.player_id)"
+        for table in PLAYER_ROW_DEFAULTS
+    )
+    created = dict.fromkeys(PLAYER_ROW_DEFAULTS, 0)
+    players = 0
+    start = time.time()
+
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        last_id = 0
+        while True:
+            cur.execute(f"""
+                SELECT p.player_id FROM player_identity p
+                WHERE p.player_id > %s AND ({missing})
+                ORDER BY p.player_id
+                LIMIT %s
+            """, (last_id, batch_size))
+            player_ids = [row['player_id'] for row in cur.fetchall()]
+            if not player_ids:
+                break
+            for table, count in provision_player_rows(cur, player_ids).items():
+                created[table] += count
+            conn.commit()
+            players += len(player_ids)
+            last_id = player_ids[-1]
+    finally:
+        cur.close()
+        return_connection(conn)
+
+    return {'players': players, 'created': created, 'seconds': round(time.time() - start, 2)}
@@ -1,11 +1,19 @@
-from .connection import get_connection, return_connection
+def init_database():
+    """Bring the database schema up to date by applying pending migrations."""
+    from .migrations import migrate
 
+    applied = migrate()
+    if applied:
+        print(f"Database migrated: applied {', '.join(str(v) for v in applied)}")
+    print("Database initialized successfully!")
 
-def init_database():
-    """Initialize all database tables for the Business Tycoon RPG."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
+
+def create_baseline_schema(cur):
+    """Create all tables for the Business Tycoon RPG (migration 0001).
+
+    New schema changes belong in src/db/migrations.py, not here: editing
+    these statements changes the baseline checksum.
+    """
     cur.execute("""
         CREATE TABLE IF NOT EXISTS player_profiles (
             player_id SERIAL PRIMARY KEY,
@@ -2459,9 +2467,4 @@ def init_database():
             recorded_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
         );
     """)
-    
-    conn.commit()
-    cur.close()
-    return_connection(conn)
-    print("Database initialized successfully!")
 
@@ -14,6 +14,15 @@ from src.engine.player import (
 
 from src.engine.core import GameEngine
 
+from src.engine.leaderboards import (
+    LEADERBOARD_CATEGORIES,
+    get_top_players,
+    get_leaderboard_standing,
+    get_rank_around,
+    get_competition_top,
+    get_competition_rank_around,
+)
+
 from src.engine.accounting import (
     display_scenario,
     display_result,
@@ -184,6 +193,12 @@ from src.engine.accounting import (
 __all__ = [
     "Player",
     "GameEngine",
+    "LEADERBOARD_CATEGORIES",
+    "get_top_players",
+    "get_leaderboard_standing",
+    "get_rank_around",
+    "get_competition_top",
+    "get_competition_rank_around",
     "ADVISOR_QUOTES",
     "get_random_advisor_quote",
     "JOB_TITLES",
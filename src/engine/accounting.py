@@ -7,8 +7,8 @@ import json
 import random
 import datetime
 import math
-from src.database import get_connection, return_connection
-from src.leveling import get_current_level, get_level_title
+from src.database import get_connection, return_connection, get_catalog, mark_request_wrote, env_number
+from src.leveling import check_level_up, get_current_level, get_level_title
 
 
 def display_scenario(scenario: dict) -> None:
@@ -2325,7 +2325,7 @@ def submit_pitch_answers(session_id: int, answers: list) -> dict:
 
 def get_player_analytics(player_id):
     """Get comprehensive learning analytics for a player."""
-    conn = get_connection()
+    conn = get_connection(readonly=True)
     cur = conn.cursor()
     
     cur.execute("""
@@ -2393,7 +2393,7 @@ def get_player_analytics(player_id):
 
 def get_player_skill_chart_data(player_id):
     """Get data formatted for radar chart visualization."""
-    conn = get_connection()
+    conn = get_connection(readonly=True)
     cur = conn.cursor()
     
     cur.execute("""
@@ -2535,24 +2535,9 @@ def get_active_competitions():
 
 
 def get_competition_leaderboard(active_id, limit=10):
-    """Get leaderboard for a competition."""
-    conn = get_connection()
-    cur = conn.cursor()
-    
-    cur.execute("""
-        SELECT ce.*, pp.name
-        FROM competition_entries ce
-        JOIN player_profiles pp ON ce.player_id = pp.player_id
-        WHERE ce.active_id = %s
-        ORDER BY ce.score DESC
-        LIMIT %s
-    """, (active_id, limit))
-    entries = cur.fetchall()
-    
-    cur.close()
-    return_connection(conn)
-    
-    return [dict(e) for e in entries]
+    """Get leaderboard for a competition (a snapshot refreshed every few seconds)."""
+    from src.engine.leaderboards import get_competition_top
+    return get_competition_top(active_id, limit)
 
 
 def join_competition(player_id, active_id):
@@ -3885,28 +3870,57 @@ def get_current_market_cycle():
     return None
 
 
+# Shard rows per global challenge that contributions are spread over.
+GLOBAL_CHALLENGE_SHARDS = env_number("GLOBAL_CHALLENGE_SHARDS", 16)
+
+# Adds a contribution to the player's row and to one shard of the challenge.
+# xmax = 0 only on a freshly inserted row, i.e. the player's first contribution.
+GLOBAL_CONTRIBUTION_SQL = """
+    WITH contributed AS (
+        INSERT INTO player_global_contributions (player_id, challenge_id, contribution)
+        VALUES (%(player_id)s, %(challenge_id)s, %(amount)s)
+        ON CONFLICT (player_id, challenge_id)
+        DO UPDATE SET contribution = player_global_contributions.contribution + EXCLUDED.contribution
+        RETURNING (xmax = 0) AS first
+    )
+    INSERT INTO global_challenge_shards (challenge_id, shard, progress, participants)
+    SELECT %(challenge_id)s, %(shard)s, %(amount)s, CASE WHEN first THEN 1 ELSE 0 END FROM contributed
+    ON CONFLICT (challenge_id, shard) DO UPDATE
+    SET progress = global_challenge_shards.progress + EXCLUDED.progress,
+        participants = global_challenge_shards.participants + EXCLUDED.participants
+"""
+
+
 def get_global_challenges():
-    """Get active global challenges."""
+    """Get active global challenges, with progress rolled up from their shards."""
     conn = get_connection()
     cur = conn.cursor()
     
     cur.execute("""
-        SELECT * FROM global_challenges 
-        WHERE status IN ('active', 'pending')
-        ORDER BY start_time
+        SELECT gc.*,
+               gc.current_progress + COALESCE(s.progress, 0) AS total_progress,
+               gc.participants + COALESCE(s.participants, 0) AS total_participants
+        FROM global_challenges gc
+        LEFT JOIN LATERAL (
+            SELECT SUM(progress) AS progress, SUM(participants) AS participants
+            FROM global_challenge_shards WHERE challenge_id = gc.challenge_id
+        ) s ON TRUE
+        WHERE gc.status IN ('active', 'pending')
+        ORDER BY gc.start_time
     """)
     
     challenges = []
     for row in cur.fetchall():
+        progress = int(row['total_progress'])
         challenges.append({
             'challenge_id': row['challenge_id'],
             'name': row['challenge_name'],
             'description': row['challenge_description'],
             'target': row['target_value'],
-            'progress': row['current_progress'],
-            'participants': row['participants'],
+            'progress': progress,
+            'participants': int(row['total_participants']),
             'reward_pool': row['reward_pool'],
-            'progress_pct': int(row['current_progress'] / row['target_value'] * 100) if row['target_value'] > 0 else 0,
+            'progress_pct': int(progress / row['target_value'] * 100) if row['target_value'] > 0 else 0,
             'status': row['status']
         })
     
@@ -3916,23 +3930,18 @@ def get_global_challenges():
 
 
 def contribute_to_global_challenge(player_id, challenge_id, amount):
-    """Contribute to a global challenge."""
+    """Contribute to a global challenge.
+    
+    Writes the player's own row and a random shard of the challenge, never the
+    global_challenges row, so concurrent contributors don't queue on it.
+    """
     conn = get_connection()
     cur = conn.cursor()
     
-    cur.execute("""
-        INSERT INTO player_global_contributions (player_id, challenge_id, contribution)
-        VALUES (%s, %s, %s)
-        ON CONFLICT (player_id, challenge_id) 
-        DO UPDATE SET contribution = player_global_contributions.contribution + %s
-    """, (player_id, challenge_id, amount, amount))
-    
-    cur.execute("""
-        UPDATE global_challenges 
-        SET current_progress = current_progress + %s,
-            participants = (SELECT COUNT(DISTINCT player_id) FROM player_global_contributions WHERE challenge_id = %s)
-        WHERE challenge_id = %s
-    """, (amount, challenge_id, challenge_id))
+    cur.execute(GLOBAL_CONTRIBUTION_SQL, {
+        'player_id': player_id, 'challenge_id': challenge_id, 'amount': amount,
+        'shard': random.randrange(GLOBAL_CHALLENGE_SHARDS),
+    })
     
     conn.commit()
     cur.close()
@@ -4425,47 +4434,136 @@ def claim_battle_pass_tier(player_id, tier):
         return {'success': False, 'error': 'Could not claim reward'}
 
 
+# Stripe rows per boss that attack damage is spread over.
+BOSS_DAMAGE_STRIPES = env_number("BOSS_DAMAGE_STRIPES", 32)
+
+# One attack: add the damage to a stripe and to the attacker's participant row,
+# and the attack EXP to their Strategy discipline, unless the boss is defeated.
+BOSS_ATTACK_SQL = """
+    WITH boss AS (
+        SELECT boss_id, is_defeated FROM limited_time_bosses
+        WHERE boss_id = %(boss_id)s
+          AND available_from <= CURRENT_TIMESTAMP AND available_until >= CURRENT_TIMESTAMP
+    ),
+    hit AS (
+        INSERT INTO boss_damage_stripes (boss_id, stripe, damage)
+        SELECT boss_id, %(stripe)s, %(damage)s FROM boss WHERE NOT is_defeated
+        ON CONFLICT (boss_id, stripe) DO UPDATE SET damage = boss_damage_stripes.damage + EXCLUDED.damage
+        RETURNING boss_id
+    ),
+    participant AS (
+        INSERT INTO boss_participants (boss_id, player_id, damage_dealt, attacks)
+        SELECT boss_id, %(player_id)s, %(damage)s, 1 FROM hit
+        ON CONFLICT (boss_id, player_id) DO UPDATE
+        SET damage_dealt = boss_participants.damage_dealt + EXCLUDED.damage_dealt,
+            attacks = boss_participants.attacks + 1,
+            last_attack_at = CURRENT_TIMESTAMP
+        RETURNING boss_id
+    ),
+    rewarded AS (
+        UPDATE player_discipline_progress
+        SET current_exp = current_exp + %(exp)s, total_exp_earned = total_exp_earned + %(exp)s
+        WHERE player_id = %(player_id)s AND discipline_name = 'Strategy'
+          AND EXISTS (SELECT 1 FROM participant)
+        RETURNING total_exp_earned
+    )
+    SELECT is_defeated, EXISTS (SELECT 1 FROM participant) AS hit,
+           (SELECT total_exp_earned FROM rewarded) AS total_exp
+    FROM boss
+"""
+
+# The defeat transition: only the first attack to find the rolled-up damage at
+# or past health_points flips is_defeated (a concurrent one re-checks NOT
+# is_defeated after waiting on the row lock and matches nothing), and it alone
+# gets the boss's exp_reward.
+BOSS_DEFEAT_SQL = """
+    WITH defeated AS (
+        UPDATE limited_time_bosses b
+        SET is_defeated = TRUE, current_hp = 0,
+            defeated_at = CURRENT_TIMESTAMP, defeated_by = %(player_id)s
+        WHERE b.boss_id = %(boss_id)s AND NOT b.is_defeated
+          AND (SELECT COALESCE(SUM(damage), 0) FROM boss_damage_stripes s
+               WHERE s.boss_id = b.boss_id) >= b.health_points
+        RETURNING b.exp_reward
+    ),
+    rewarded AS (
+        UPDATE player_discipline_progress
+        SET current_exp = current_exp + (SELECT exp_reward FROM defeated),
+            total_exp_earned = total_exp_earned + (SELECT exp_reward FROM defeated)
+        WHERE player_id = %(player_id)s AND discipline_name = 'Strategy'
+          AND EXISTS (SELECT 1 FROM defeated)
+        RETURNING total_exp_earned
+    )
+    SELECT exp_reward, (SELECT total_exp_earned FROM rewarded) AS total_exp FROM defeated
+"""
+
+# Applies a level-up from Strategy EXP credited by the statements above, the
+# way scenario rewards do: the new level, and 2 stat points per level gained.
+# GREATEST keeps a slower, smaller credit from lowering the level.
+BOSS_LEVEL_UP_SQL = """
+    WITH leveled AS (
+        UPDATE player_discipline_progress
+        SET current_level = GREATEST(current_level, %(level)s)
+        WHERE player_id = %(player_id)s AND discipline_name = 'Strategy'
+    )
+    UPDATE player_stats
+    SET stat_points_available = stat_points_available + %(stat_points)s
+    WHERE player_id = %(player_id)s
+"""
+
+
+def _apply_boss_exp_level_up(cur, player_id, total_exp, exp):
+    """Level up Strategy if crediting `exp` took its total to `total_exp`."""
+    if total_exp is None:
+        return
+    leveled_up, old_level, new_level = check_level_up(total_exp - exp, total_exp)
+    if leveled_up:
+        cur.execute(BOSS_LEVEL_UP_SQL, {'player_id': player_id, 'level': new_level,
+                                        'stat_points': (new_level - old_level) * 2})
+
+
 def attack_limited_boss(player_id, boss_id):
-    """Attack a limited-time boss."""
-    import random
+    """Attack a limited-time boss.
+    
+    Attacks never write the boss row: damage goes to a random one of
+    BOSS_DAMAGE_STRIPES stripe rows and the attacker's boss_participants row,
+    and HP is health_points minus the stripes' sum. The defeat check runs after
+    the damage commits, so the last attack to commit always sees all of it.
+    Both run on a dedicated connection, not the request's unit of work, so
+    those commits are real and the stripe and boss locks are held only for
+    the statement.
+    """
+    damage = random.randint(500, 2000)
+    exp_earned = 50 + (damage // 100)
+    params = {'boss_id': boss_id, 'player_id': player_id, 'damage': damage, 'exp': exp_earned,
+              'stripe': random.randrange(BOSS_DAMAGE_STRIPES)}
     
-    conn = get_connection()
+    conn = get_connection(dedicated=True)
     cur = conn.cursor()
     
     try:
-        cur.execute("SELECT * FROM limited_bosses WHERE boss_id = %s AND is_active = TRUE", (boss_id,))
-        boss = cur.fetchone()
+        cur.execute(BOSS_ATTACK_SQL, params)
+        attack = cur.fetchone()
         
-        if not boss:
+        if not attack or not attack['hit']:
+            conn.rollback()
             cur.close()
             return_connection(conn)
+            if attack and attack['is_defeated']:
+                return {'success': False, 'error': 'Boss already defeated'}
             return {'success': False, 'error': 'Boss not found or inactive'}
+        _apply_boss_exp_level_up(cur, player_id, attack['total_exp'], params['exp'])
+        conn.commit()
+        mark_request_wrote()
         
-        if boss['current_hp'] <= 0:
-            cur.close()
-            return_connection(conn)
-            return {'success': False, 'error': 'Boss already defeated'}
-        
-        damage = random.randint(500, 2000)
-        new_hp = max(0, boss['current_hp'] - damage)
-        boss_defeated = new_hp <= 0
-        
-        cur.execute("UPDATE limited_bosses SET current_hp = %s WHERE boss_id = %s", (new_hp, boss_id))
-        
-        exp_earned = 50 + (damage // 100)
+        cur.execute(BOSS_DEFEAT_SQL, params)
+        defeat = cur.fetchone()
+        boss_defeated = defeat is not None
         if boss_defeated:
-            exp_earned += boss['exp_reward']
-        
-        cur.execute("UPDATE player_profiles SET total_exp = total_exp + %s WHERE player_id = %s",
-                   (exp_earned, player_id))
-        
-        cur.execute("""
-            INSERT INTO boss_participants (boss_id, player_id, damage_dealt)
-            VALUES (%s, %s, %s)
-            ON CONFLICT (boss_id, player_id) DO UPDATE SET damage_dealt = boss_participants.damage_dealt + %s
-        """, (boss_id, player_id, damage, damage))
-        
+            exp_earned += defeat['exp_reward']
+            _apply_boss_exp_level_up(cur, player_id, defeat['total_exp'], defeat['exp_reward'])
         conn.commit()
+        
         cur.close()
         return_connection(conn)
         return {'success': True, 'damage': damage, 'exp_earned': exp_earned, 'boss_defeated': boss_defeated}
@@ -4572,15 +4670,19 @@ def get_seasonal_events():
 
 
 def get_limited_bosses():
-    """Get available limited-time bosses."""
+    """Get available limited-time bosses, with HP derived from their damage stripes."""
     conn = get_connection()
     cur = conn.cursor()
     
     cur.execute("""
-        SELECT * FROM limited_time_bosses 
-        WHERE available_from <= CURRENT_TIMESTAMP AND available_until >= CURRENT_TIMESTAMP
-        AND is_defeated = FALSE
-        ORDER BY difficulty
+        SELECT b.*, GREATEST(0, b.health_points - COALESCE(d.damage, 0)) AS derived_hp
+        FROM limited_time_bosses b
+        LEFT JOIN LATERAL (
+            SELECT SUM(damage) AS damage FROM boss_damage_stripes WHERE boss_id = b.boss_id
+        ) d ON TRUE
+        WHERE b.available_from <= CURRENT_TIMESTAMP AND b.available_until >= CURRENT_TIMESTAMP
+        AND b.is_defeated = FALSE
+        ORDER BY b.difficulty
     """)
     
     bosses = []
@@ -4591,7 +4693,7 @@ def get_limited_bosses():
             'title': row['boss_title'],
             'description': row['description'],
             'difficulty': row['difficulty'],
-            'hp': row['current_hp'],
+            'hp': int(row['derived_hp']),
             'max_hp': row['health_points'],
             'exp_reward': row['exp_reward'],
             'available_until': row['available_until']
@@ -4904,7 +5006,7 @@ def update_player_preferences(player_id, preferences):
 
 def get_learning_paths(player_id, discipline=None):
     """Get all learning paths with player progress."""
-    conn = get_connection()
+    conn = get_connection(readonly=True)
     cur = conn.cursor()
     
     if discipline:
@@ -4958,7 +5060,7 @@ def get_learning_paths(player_id, discipline=None):
 
 def get_learning_path_by_id(path_id, player_id):
     """Get a single learning path with full details and player progress."""
-    conn = get_connection()
+    conn = get_connection(readonly=True)
     cur = conn.cursor()
     
     cur.execute("""
@@ -5099,11 +5201,10 @@ def check_learning_path_gate(player_id, scenario_id):
     
     Gates ALL scenarios in a discipline until the foundational learning path is complete.
     """
-    conn = get_connection()
+    conn = get_connection(readonly=True)
     cur = conn.cursor()
     
-    cur.execute("SELECT discipline FROM scenario_master WHERE scenario_id = %s", (scenario_id,))
-    scenario = cur.fetchone()
+    scenario = get_catalog().get('scenario_master', scenario_id)
     
     if not scenario:
         cur.close()
@@ -2,8 +2,8 @@
 GameEngine core class - inherits from all mixins.
 """
 
-import datetime
-from src.database import get_connection, return_connection
+from src.database import get_connection, return_connection, provision_player_rows
+from src.db.prepared import execute_prepared, PLAYER_HUB_STATE
 from src.leveling import (
     calculate_weighted_exp,
     check_level_up,
@@ -15,8 +15,11 @@ from src.leveling import (
 )
 from src.engine.player import Player, JOB_TITLES
 from src.engine.scenarios import ScenariosMixin
-from src.engine.progression import ProgressionMixin
+from src.engine.progression import (
+    ProgressionMixin, energy_status, daily_login_status, idle_income_status, PRESTIGE_DEFAULTS
+)
 from src.engine.social import SocialMixin
+from src.engine.leaderboards import get_top_players
 
 
 class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
@@ -48,8 +51,13 @@ class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
             job_level = 0
 
         cur.execute("""
-            INSERT INTO player_profiles (player_name, password_hash, chosen_world, chosen_industry, career_path, job_title, job_level, total_cash, business_reputation)
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+            WITH identity AS (
+                INSERT INTO player_identity (player_name, password_hash, chosen_world, chosen_industry, career_path, job_title, job_level)
+                VALUES (%s, %s, %s, %s, %s, %s, %s)
+                RETURNING player_id
+            )
+            INSERT INTO player_counters (player_id, total_cash, business_reputation)
+            SELECT player_id, %s, %s FROM identity
             RETURNING player_id
         """, (name, password_hash, world, industry, career_path, job_title, job_level, starting_cash, starting_reputation))
 
@@ -71,6 +79,8 @@ class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
             VALUES (%s, 'default', 'default', 'none', 'blue')
         """, (player_id,))
 
+        provision_player_rows(cur, [player_id])
+
         conn.commit()
         cur.close()
         return_connection(conn)
@@ -86,14 +96,15 @@ class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
         player.industry = industry
         player.discipline_progress = {d: {'level': 1, 'exp': 0, 'total_exp': 0} for d in DISCIPLINES}
         player.stats = {'charisma': 5, 'intelligence': 5, 'luck': 5, 'negotiation': 5, 'stat_points': 3}
+        player.mark_clean()
 
         self.current_player = player
         return player
 
-    def load_player(self, player_id: int) -> Player:
-        """Load an existing player."""
+    def load_player(self, player_id: int, sections=None) -> Player:
+        """Load an existing player, optionally only some PLAYER_SECTIONS."""
         player = Player(player_id)
-        player.load_from_db()
+        player.load_from_db(sections)
         self.current_player = player
         return player
 
@@ -203,7 +214,8 @@ class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
         return stats
 
     def get_hub_data(self) -> dict:
-        """Get all hub data in a single efficient batch. Reduces database queries from 6+ to 1."""
+        """Get all hub data in a single efficient batch: one joined query for the
+        player's rows (provisioned at creation) plus the leaderboard."""
         if not self.current_player:
             return {"error": "No player loaded"}
 
@@ -211,137 +223,21 @@ class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
         cur = conn.cursor()
         player_id = self.current_player.player_id
 
-        cur.execute("""
-            SELECT * FROM player_energy WHERE player_id = %s
-        """, (player_id,))
-        energy_row = cur.fetchone()
-
-        if not energy_row:
-            cur.execute("""
-                INSERT INTO player_energy (player_id, current_energy, max_energy, last_recharge_at)
-                VALUES (%s, 100, 100, CURRENT_TIMESTAMP)
-                RETURNING *
-            """, (player_id,))
-            energy_row = cur.fetchone()
-            conn.commit()
-
-        now = datetime.datetime.now(datetime.timezone.utc)
-        last_recharge = energy_row['last_recharge_at']
-        if last_recharge.tzinfo is None:
-            last_recharge = last_recharge.replace(tzinfo=datetime.timezone.utc)
-
-        minutes_elapsed = (now - last_recharge).total_seconds() / 60
-        energy_to_add = int(minutes_elapsed / 5)
-        current_energy = energy_row['current_energy']
-        max_energy = energy_row['max_energy']
-
-        if energy_to_add > 0 and current_energy < max_energy:
-            current_energy = min(max_energy, current_energy + energy_to_add)
-            cur.execute("""
-                UPDATE player_energy 
-                SET current_energy = %s, last_recharge_at = CURRENT_TIMESTAMP
-                WHERE player_id = %s
-            """, (current_energy, player_id))
-            conn.commit()
-
-        next_recharge_seconds = (5 - (minutes_elapsed % 5)) * 60 if current_energy < max_energy else 0
-        energy = {
-            "current_energy": current_energy,
-            "max_energy": max_energy,
-            "next_recharge_in": int(next_recharge_seconds)
-        }
-
-        cur.execute("""
-            SELECT * FROM player_daily_login WHERE player_id = %s
-        """, (player_id,))
-        login_row = cur.fetchone()
-        today = datetime.date.today()
-
-        if not login_row:
-            cur.execute("""
-                INSERT INTO player_daily_login (player_id, current_streak, longest_streak, last_login_date, last_claim_date)
-                VALUES (%s, 0, 0, NULL, NULL)
-                RETURNING *
-            """, (player_id,))
-            login_row = cur.fetchone()
-            conn.commit()
-
-        current_streak = login_row['current_streak']
-        longest_streak = login_row['longest_streak']
-        last_claim = login_row['last_claim_date']
-
-        can_claim = False
-        streak_broken = False
-
-        if last_claim is None:
-            can_claim = True
-        elif isinstance(last_claim, datetime.datetime):
-            last_claim = last_claim.date()
-
-        if last_claim and last_claim < today:
-            can_claim = True
-            if last_claim < today - datetime.timedelta(days=1):
-                streak_broken = True
-
-        reward_day = (current_streak % 7) + 1 if not streak_broken else 1
-
-        cur.execute("""
-            SELECT * FROM daily_login_rewards WHERE day_number = %s
-        """, (reward_day,))
-        reward = cur.fetchone()
-
-        login_status = {
-            "current_streak": current_streak,
-            "longest_streak": longest_streak,
-            "can_claim": can_claim,
-            "streak_broken": streak_broken,
-            "reward_day": reward_day,
-            "reward": dict(reward) if reward else None
-        }
-
-        cur.execute("""
-            SELECT * FROM player_idle_income WHERE player_id = %s
-        """, (player_id,))
-        idle_row = cur.fetchone()
-        now_dt = datetime.datetime.now()
-
-        if not idle_row:
-            cur.execute("""
-                INSERT INTO player_idle_income (player_id, gold_per_hour, last_collect_at)
-                VALUES (%s, 10, CURRENT_TIMESTAMP)
-                RETURNING *
-            """, (player_id,))
-            idle_row = cur.fetchone()
-            conn.commit()
-
-        gold_per_hour = idle_row.get('gold_per_hour', 10) or 10
-        last_collect = idle_row['last_collect_at']
-        hours_elapsed = (now_dt - last_collect).total_seconds() / 3600
-        max_hours = 24
-        hours_counted = min(hours_elapsed, max_hours)
-        accumulated_gold = int(hours_counted * gold_per_hour)
-
-        idle_income = {
-            "gold_per_hour": gold_per_hour,
-            "accumulated_gold": accumulated_gold,
-            "hours_elapsed": round(hours_counted, 1),
-            "max_hours": max_hours,
-            "can_collect": accumulated_gold > 0
-        }
+        execute_prepared(cur, PLAYER_HUB_STATE, (player_id,))
+        row = cur.fetchone() or {}
+        cur.close()
+        return_connection(conn)
 
-        cur.execute("""
-            SELECT * FROM player_prestige WHERE player_id = %s
-        """, (player_id,))
-        prestige_row = cur.fetchone()
+        def part(present_column, columns):
+            return {column: row[column] for column in columns} if row.get(present_column) is not None else None
 
-        if not prestige_row:
-            cur.execute("""
-                INSERT INTO player_prestige (player_id, prestige_level, exp_multiplier, gold_multiplier)
-                VALUES (%s, 0, 1.0, 1.0)
-                RETURNING *
-            """, (player_id,))
-            prestige_row = cur.fetchone()
-            conn.commit()
+        energy = energy_status(part('max_energy', ('current_energy', 'max_energy', 'last_recharge_at')))
+        login_status = daily_login_status(part('daily_login_player_id', (
+            'current_streak', 'longest_streak', 'last_claim_date')))
+        idle = idle_income_status(part('idle_income_player_id', (
+            'gold_per_minute', 'uncollected_gold', 'last_collection_at')))
+        prestige_row = part('prestige_player_id', (
+            'prestige_level', 'exp_multiplier', 'gold_multiplier', 'total_prestiges')) or PRESTIGE_DEFAULTS
 
         avg_level = sum(d['level'] for d in self.current_player.discipline_progress.values()) / 6 if self.current_player.discipline_progress else 1
         can_prestige = avg_level >= 5 and prestige_row['prestige_level'] < 10
@@ -354,18 +250,16 @@ class GameEngine(ScenariosMixin, ProgressionMixin, SocialMixin):
             "avg_level": round(avg_level, 1)
         }
 
-        cur.execute("""
-            SELECT pp.player_name, COALESCE(SUM(psc.stars_earned), 0) as total_stars
-            FROM player_profiles pp
-            LEFT JOIN player_scenario_completions psc ON pp.player_id = psc.player_id
-            GROUP BY pp.player_id, pp.player_name
-            ORDER BY total_stars DESC
-            LIMIT 5
-        """)
-        leaderboard = [{"name": r['player_name'], "stars": int(r['total_stars'])} for r in cur.fetchall()]
+        idle_income = {
+            "gold_per_hour": idle['gold_per_hour'],
+            "accumulated_gold": idle['accumulated_gold'],
+            "hours_elapsed": idle['hours_elapsed'],
+            "max_hours": idle['max_accumulation_hours'],
+            "can_collect": idle['accumulated_gold'] >= 1
+        }
 
-        cur.close()
-        return_connection(conn)
+        leaderboard = [{"name": r['player_name'], "stars": int(r['total_stars'])}
+                       for r in get_top_players('stars', 5)]
 
         return {
             "energy": energy,
@@ -0,0 +1,247 @@
+"""
+Leaderboards served from leaderboard_cache.
+
+Scores are kept current by triggers (migration 7) as scenarios are
+completed, cash changes and discipline levels change, so top-N reads the
+first N entries of a (score DESC, player_id) index and joins their names,
+instead of aggregating every player's completions on each page view.
+
+A player's own rank and neighbours come from a per-worker RankIndex
+(src.engine.rank_index) per category: loaded once, then brought up to date
+on each use with only the rows written since (leaderboard_cache.changed_xid,
+migration 8), so a rank is an O(log n) lookup rather than a count of the
+players above. A competition's index is its leaderboard snapshot. Once it
+is COMPETITION_RANK_REFRESH_SECONDS old (default 5), the next use folds the
+buffered score events (src.db.competition_scores) and reloads the index
+from competition_entries.
+
+    get_top_players('stars', limit=10)
+    get_leaderboard_standing(player_id, 'wealth')   # rank, players, top_percent
+    get_rank_around(player_id, 'stars', k=5)        # rank plus k players either side
+    get_competition_top(active_id, limit=10)
+    get_competition_rank_around(player_id, active_id, k=5)
+"""
+
+import logging
+import threading
+import time
+
+from src.database import get_connection, return_connection, env_number
+from src.db.competition_scores import fold_competition_scores
+from src.db.invalidation import register_invalidation_handler
+from src.db.migrations import LEADERBOARD_COLUMNS
+from src.engine.rank_index import RankIndex
+
+logger = logging.getLogger(__name__)
+
+LEADERBOARD_CATEGORIES = tuple(LEADERBOARD_COLUMNS)
+MAX_NEIGHBOURS = 50
+
+
+def get_top_players(category: str = 'stars', limit: int = 10) -> list:
+    """The `limit` best players in a category, best first; [] for an unknown
+    category. Rows carry every score, plus `score` for the category's own."""
+    column = LEADERBOARD_COLUMNS.get(category)
+    if column is None:
+        return []
+
+    conn = get_connection(readonly=True)
+    cur = conn.cursor()
+    cur.execute(f"""
+        SELECT lc.player_id, pi.player_name, pi.chosen_world,
+               lc.{column} AS score,
+               lc.total_stars, lc.total_scenarios_completed AS total_scenarios,
+               lc.total_wealth, lc.total_levels
+        FROM leaderboard_cache lc
+        JOIN player_identity pi ON pi.player_id = lc.player_id
+        ORDER BY lc.{column} DESC, lc.player_id
+        LIMIT %s
+    """, (limit,))
+    rows = cur.fetchall()
+    cur.close()
+    return_connection(conn)
+
+    return [dict(r) for r in rows]
+
+
+# category -> RankIndex, plus the snapshot xmin they are current up to
+_rank_indexes = {}
+_rank_horizon = None
+_rank_lock = threading.Lock()
+
+# active_id -> (loaded at, RankIndex)
+_competition_indexes = {}
+_competition_lock = threading.Lock()
+
+
+def _leaderboard_indexes() -> dict:
+    """This worker's RankIndex per category, updated with every row committed
+    since the last call.
+
+    The indexes are shared by every request of the worker, so they are read
+    on a dedicated connection (or the replica), never through the request's
+    unit of work: only committed rows go in, and the horizon only moves past
+    transactions that have finished.
+    """
+    global _rank_horizon
+    with _rank_lock:
+        conn = get_connection(readonly=True, dedicated=True)
+        cur = conn.cursor()
+        try:
+            # One statement, so the rows and the horizon come from one snapshot.
+            cur.execute(f"""
+                SELECT txid_snapshot_xmin(txid_current_snapshot()) AS horizon, lc.player_id,
+                       {', '.join(f'lc.{column}' for column in LEADERBOARD_COLUMNS.values())}
+                FROM (SELECT 1) one
+                LEFT JOIN leaderboard_cache lc ON lc.changed_xid >= %s
+            """, (_rank_horizon or 0,))
+            rows = cur.fetchall()
+        finally:
+            cur.close()
+            return_connection(conn)
+
+        changed = [row for row in rows if row['player_id'] is not None]
+        for category, column in LEADERBOARD_COLUMNS.items():
+            if _rank_horizon is None:
+                _rank_indexes[category] = RankIndex((row['player_id'], row[column]) for row in changed)
+            else:
+                index = _rank_indexes[category]
+                for row in changed:
+                    index.update(row['player_id'], row[column])
+        _rank_horizon = rows[0]['horizon']
+        return _rank_indexes
+
+
+def _forget_player(player_id, version):
+    """Invalidation handler: a deleted player leaves every index; a missed
+    stretch of notifications (player_id None) means reloading from scratch."""
+    global _rank_horizon
+    with _rank_lock:
+        if player_id is None:
+            _rank_horizon = None
+        elif version is None:
+            for index in _rank_indexes.values():
+                index.remove(player_id)
+
+
+register_invalidation_handler('player', _forget_player)
+
+
+def _forget_competition(active_id, version):
+    """Invalidation handler: a finalized competition is reloaded on next use."""
+    with _competition_lock:
+        if active_id is None:
+            _competition_indexes.clear()
+        else:
+            _competition_indexes.pop(active_id, None)
+
+
+register_invalidation_handler('competition', _forget_competition)
+
+
+def _competition_index(active_id: int) -> RankIndex:
+    max_age = env_number("COMPETITION_RANK_REFRESH_SECONDS", 5.0, float)
+    with _competition_lock:
+        cached = _competition_indexes.get(active_id)
+        if cached is not None and time.monotonic() - cached[0] < max_age:
+            return cached[1]
+
+        # The fold commits on its own connection, and the reload reads only
+        # committed scores, so nothing here joins the request's transaction.
+        try:
+            fold_competition_scores()
+        except Exception:
+            logger.warning("could not fold competition scores", exc_info=True)
+        conn = get_connection(readonly=True, dedicated=True)
+        cur = conn.cursor()
+        try:
+            cur.execute("SELECT player_id, score FROM competition_entries WHERE active_id = %s", (active_id,))
+            index = RankIndex((row['player_id'], row['score'] or 0) for row in cur.fetchall())
+        finally:
+            cur.close()
+            return_connection(conn)
+
+        _competition_indexes[active_id] = (time.monotonic(), index)
+        return index
+
+
+def _player_names(player_ids) -> dict:
+    conn = get_connection(readonly=True)
+    cur = conn.cursor()
+    cur.execute("SELECT player_id, player_name FROM player_identity WHERE player_id = ANY(%s)",
+                (list(player_ids),))
+    names = {row['player_id']: row['player_name'] for row in cur.fetchall()}
+    cur.close()
+    return_connection(conn)
+    return names
+
+
+def _neighbourhood(index: RankIndex, player_id: int, k: int):
+    """{'rank', 'players', 'score', 'entries'} for a player, with names; None if unranked."""
+    k = max(0, min(int(k), MAX_NEIGHBOURS))
+    entries = index.around(player_id, k)
+    if not entries:
+        return None
+    names = _player_names(member for _, member, _ in entries)
+
+    return {
+        'rank': index.rank(player_id),
+        'players': len(index),
+        'score': index.score(player_id),
+        'entries': [
+            {'rank': rank, 'player_id': member, 'player_name': names.get(member),
+             'score': score, 'is_you': member == player_id}
+            for rank, member, score in entries
+        ],
+    }
+
+
+def get_leaderboard_standing(player_id: int, category: str = 'stars'):
+    """A player's score, rank (ties share a rank) and the share of players
+    at or above it; None for an unknown category or unranked player."""
+    if category not in LEADERBOARD_COLUMNS:
+        return None
+    index = _leaderboard_indexes()[category]
+    rank = index.rank(player_id)
+    if rank is None:
+        return None
+    return {
+        'category': category,
+        'score': index.score(player_id),
+        'rank': rank,
+        'players': len(index),
+        'top_percent': round(100 * rank / len(index), 1),
+    }
+
+
+def get_rank_around(player_id: int, category: str = 'stars', k: int = 5):
+    """A player's exact rank in a category and the k players either side;
+    None for an unknown category or unranked player."""
+    if category not in LEADERBOARD_COLUMNS:
+        return None
+    around = _neighbourhood(_leaderboard_indexes()[category], player_id, k)
+    if around is not None:
+        around['category'] = category
+    return around
+
+
+def get_competition_top(active_id: int, limit: int = 10) -> list:
+    """The competition's best `limit` entries from this worker's snapshot,
+    best first: [{'rank', 'player_id', 'name', 'score'}]."""
+    entries = _competition_index(active_id).top(limit)
+    if not entries:
+        return []
+    names = _player_names(member for _, member, _ in entries)
+    return [
+        {'active_id': active_id, 'rank': rank, 'player_id': member,
+         'name': names.get(member), 'score': score}
+        for rank, member, score in entries
+    ]
+
+
+def get_competition_rank_around(player_id: int, active_id: int, k: int = 5):
+    """get_rank_around() for a competition's entries; None if not entered."""
+    around = _neighbourhood(_competition_index(active_id), player_id, k)
+    if around is not None:
+        around['active_id'] = active_id
+    return around
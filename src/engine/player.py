@@ -4,6 +4,7 @@ Player class, ADVISOR_QUOTES, and related constants for Business Tycoon RPG.
 
 import random
 from src.database import get_connection, return_connection
+from src.engine.player_cache import PLAYER_LOAD_QUERIES, PLAYER_SECTIONS, load_player_rows
 
 ADVISOR_QUOTES = {
     'Marketing': [
@@ -156,6 +157,29 @@ JOB_TITLES = {
     }
 }
 
+# Player attribute -> player_profiles column, for the fields save_to_db() writes.
+# IDENTITY_ATTRS live in player_identity, the rest in player_counters.
+PROFILE_COLUMNS = {
+    'cash': 'total_cash',
+    'reputation': 'business_reputation',
+    'current_month': 'current_month',
+    'career_path': 'career_path',
+    'job_title': 'job_title',
+    'job_level': 'job_level',
+}
+
+IDENTITY_ATTRS = ('career_path', 'job_title', 'job_level')
+
+# Player.stats key -> player_stats column.
+STAT_COLUMNS = {
+    'charisma': 'charisma',
+    'intelligence': 'intelligence',
+    'luck': 'luck',
+    'negotiation': 'negotiation',
+    'stat_points': 'stat_points_available',
+}
+
+
 class Player:
     """Represents a player in the game."""
     
@@ -181,95 +205,206 @@ class Player:
         self.inventory = []
         self.achievements = []
         self.active_quests = []
+        # Sections that hold real state; save_to_db() only writes these back.
+        self.loaded_sections = set(PLAYER_SECTIONS)
+        self.mark_clean()
         
-    def load_from_db(self):
-        """Load player data from database."""
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT * FROM player_profiles WHERE player_id = %s", (self.player_id,))
-        profile = cur.fetchone()
-        
+    def load_from_db(self, sections=None):
+        """Load player data from database, optionally only some PLAYER_SECTIONS."""
+        rows = load_player_rows(self.player_id, sections)
+        self.loaded_sections = set(PLAYER_SECTIONS if sections is None else sections)
+        self.apply_loaded_rows(rows)
+        self.mark_clean()
+    
+    def apply_loaded_rows(self, rows: dict):
+        """Populate from the results of PLAYER_LOAD_QUERIES, keyed by part."""
+        profile = rows.get('profile')
         if profile:
             self.name = profile['player_name']
             self.world = profile['chosen_world']
             self.industry = profile['chosen_industry']
-            self.career_path = profile.get('career_path', 'entrepreneur')
-            self.job_title = profile.get('job_title')
-            self.job_level = profile.get('job_level', 1)
-            self.cash = float(profile['total_cash'])
-            self.reputation = profile['business_reputation']
-            self.current_month = profile['current_month']
-        
-        cur.execute("SELECT * FROM player_discipline_progress WHERE player_id = %s", (self.player_id,))
-        progress_rows = cur.fetchall()
+            self._apply_profile_row(profile)
         
-        for row in progress_rows:
-            self.discipline_progress[row['discipline_name']] = {
-                'level': row['current_level'],
-                'exp': row['current_exp'],
-                'total_exp': row['total_exp_earned']
-            }
+        for row in rows.get('disciplines') or []:
+            self._apply_discipline_row(row)
         
-        cur.execute("SELECT * FROM player_stats WHERE player_id = %s", (self.player_id,))
-        stats_row = cur.fetchone()
+        stats_row = rows.get('stats')
         if stats_row:
-            self.stats = {
-                'charisma': stats_row['charisma'],
-                'intelligence': stats_row['intelligence'],
-                'luck': stats_row['luck'],
-                'negotiation': stats_row['negotiation'],
-                'stat_points': stats_row['stat_points_available']
-            }
+            self._apply_stats_row(stats_row)
+        
+        self.inventory = [dict(row) for row in rows.get('inventory') or []]
+        self.achievements = [dict(row) for row in rows.get('achievements') or []]
+    
+    def _apply_profile_row(self, row):
+        self._apply_identity_row(row)
+        self._apply_counters_row(row)
+    
+    def _apply_identity_row(self, row):
+        self.career_path = row.get('career_path', 'entrepreneur')
+        self.job_title = row.get('job_title')
+        self.job_level = row.get('job_level', 1)
+    
+    def _apply_counters_row(self, row):
+        self.cash = float(row['total_cash'])
+        self.reputation = row['business_reputation']
+        self.current_month = row['current_month']
+    
+    def _apply_discipline_row(self, row):
+        self.discipline_progress[row['discipline_name']] = {
+            'level': row['current_level'],
+            'exp': row['current_exp'],
+            'total_exp': row['total_exp_earned']
+        }
+    
+    def _apply_stats_row(self, row):
+        self.stats = {key: row[column] for key, column in STAT_COLUMNS.items()}
+    
+    def apply_locked_rows(self, row: dict):
+        """Take counters and identity from `row`, plus its `discipline` and
+        `stats` rows when present, as read under lock, and treat them as
+        saved: a following save_to_db() writes only changes made from them."""
+        self._apply_identity_row(row)
+        self._apply_counters_row(row)
+        if row.get('discipline'):
+            self._apply_discipline_row(row['discipline'])
+        if row.get('stats'):
+            self._apply_stats_row(row['stats'])
+        self.mark_clean()
+    
+    def mark_clean(self):
+        """Record the current state as what the database holds."""
+        self._saved = {
+            'profile': {attr: getattr(self, attr) for attr in PROFILE_COLUMNS},
+            'disciplines': {name: dict(progress) for name, progress in self.discipline_progress.items()},
+            'stats': dict(self.stats),
+        }
+    
+    def dirty_fields(self) -> dict:
+        """Changes since the last load or save, by section; only loaded sections count."""
+        saved = self._saved
+        dirty = {}
+        if 'profile' in self.loaded_sections:
+            profile = {attr: getattr(self, attr) for attr in PROFILE_COLUMNS
+                       if getattr(self, attr) != saved['profile'][attr]}
+            if profile:
+                dirty['profile'] = profile
+        if 'disciplines' in self.loaded_sections:
+            disciplines = {name: progress for name, progress in self.discipline_progress.items()
+                           if progress != saved['disciplines'].get(name)}
+            if disciplines:
+                dirty['disciplines'] = disciplines
+        if 'stats' in self.loaded_sections:
+            stats = {key: value for key, value in self.stats.items()
+                     if key in STAT_COLUMNS and value != saved['stats'].get(key)}
+            if stats:
+                dirty['stats'] = stats
+        return dirty
+    
+    def save_to_db(self):
+        """Write changed fields back in one statement and apply what it returns.
         
-        cur.execute("""
-            SELECT i.*, pi.quantity FROM player_inventory pi
-            JOIN items i ON pi.item_id = i.item_id
-            WHERE pi.player_id = %s
-        """, (self.player_id,))
-        self.inventory = [dict(row) for row in cur.fetchall()]
+        Discipline, stat and identity changes ride along as data-modifying
+        CTEs of the player_counters UPDATE, which also bumps last_played.
+        Nothing is sent when nothing changed.
+        """
+        dirty = self.dirty_fields()
+        if not dirty:
+            return
         
-        cur.execute("""
-            SELECT a.* FROM player_achievements pa
-            JOIN achievements a ON pa.achievement_id = a.achievement_id
-            WHERE pa.player_id = %s
-        """, (self.player_id,))
-        self.achievements = [dict(row) for row in cur.fetchall()]
+        ctes = []
+        params = []
         
-        cur.close()
-        return_connection(conn)
+        disciplines = dirty.get('disciplines')
+        if disciplines:
+            values = ', '.join(['(%s, %s::integer, %s::integer, %s::integer)'] * len(disciplines))
+            ctes.append(f"""
+                saved_disciplines AS (
+                    UPDATE player_discipline_progress AS p
+                    SET current_level = v.current_level, current_exp = v.current_exp,
+                        total_exp_earned = v.total_exp_earned
+                    FROM (VALUES {values}) AS v (discipline_name, current_level, current_exp, total_exp_earned)
+                    WHERE p.player_id = %s AND p.discipline_name = v.discipline_name
+                    RETURNING p.discipline_name, p.current_level, p.current_exp, p.total_exp_earned
+                )""")
+            for name, progress in disciplines.items():
+                params.extend([name, progress['level'], progress['exp'], progress['total_exp']])
+            params.append(self.player_id)
         
-    def save_to_db(self):
-        """Save player data to database."""
-        conn = get_connection()
-        cur = conn.cursor()
+        stats = dirty.get('stats')
+        if stats:
+            assignments = ', '.join(f"{STAT_COLUMNS[key]} = %s" for key in stats)
+            ctes.append(f"""
+                saved_stats AS (
+                    UPDATE player_stats SET {assignments}
+                    WHERE player_id = %s
+                    RETURNING {', '.join(STAT_COLUMNS.values())}
+                )""")
+            params.extend(stats.values())
+            params.append(self.player_id)
         
-        cur.execute("""
-            UPDATE player_profiles 
-            SET total_cash = %s, business_reputation = %s, current_month = %s, 
-                career_path = %s, job_title = %s, job_level = %s, last_played = CURRENT_TIMESTAMP
-            WHERE player_id = %s
-        """, (self.cash, self.reputation, self.current_month, 
-              self.career_path, self.job_title, self.job_level, self.player_id))
+        profile = dirty.get('profile', {})
+        identity = {attr: value for attr, value in profile.items() if attr in IDENTITY_ATTRS}
+        counters = {attr: value for attr, value in profile.items() if attr not in IDENTITY_ATTRS}
+        if identity:
+            assignments = ', '.join(f"{PROFILE_COLUMNS[attr]} = %s" for attr in identity)
+            ctes.append(f"""
+                saved_identity AS (
+                    UPDATE player_identity SET {assignments}
+                    WHERE player_id = %s
+                    RETURNING {', '.join(PROFILE_COLUMNS[attr] for attr in IDENTITY_ATTRS)}
+                )""")
+            params.extend(identity.values())
+            params.append(self.player_id)
+        
+        assignments = ''.join(f"{PROFILE_COLUMNS[attr]} = %s, " for attr in counters)
+        params.extend(counters.values())
+        params.append(self.player_id)
         
-        for discipline, progress in self.discipline_progress.items():
-            cur.execute("""
-                UPDATE player_discipline_progress
-                SET current_level = %s, current_exp = %s, total_exp_earned = %s
-                WHERE player_id = %s AND discipline_name = %s
-            """, (progress['level'], progress['exp'], progress['total_exp'], self.player_id, discipline))
+        returning = [f"player_counters.{PROFILE_COLUMNS[attr]}" for attr in PROFILE_COLUMNS
+                     if attr not in IDENTITY_ATTRS]
+        if identity:
+            returning.append("(SELECT row_to_json(saved_identity) FROM saved_identity) AS saved_identity")
+        if disciplines:
+            returning.append("(SELECT json_agg(saved_disciplines) FROM saved_disciplines) AS saved_disciplines")
+        if stats:
+            returning.append("(SELECT row_to_json(saved_stats) FROM saved_stats) AS saved_stats")
         
-        cur.execute("""
-            UPDATE player_stats
-            SET charisma = %s, intelligence = %s, luck = %s, negotiation = %s, stat_points_available = %s
+        sql = f"""
+            {'WITH ' + ','.join(ctes) if ctes else ''}
+            UPDATE player_counters SET {assignments}last_played = CURRENT_TIMESTAMP
             WHERE player_id = %s
-        """, (self.stats['charisma'], self.stats['intelligence'], self.stats['luck'], 
-              self.stats['negotiation'], self.stats['stat_points'], self.player_id))
+            RETURNING {', '.join(returning)}
+        """
         
+        conn = get_connection()
+        cur = conn.cursor()
+        cur.execute(sql, params)
+        row = cur.fetchone()
         conn.commit()
         cur.close()
         return_connection(conn)
-    
+        
+        if row:
+            if 'profile' in self.loaded_sections:
+                self._apply_counters_row(row)
+                if row.get('saved_identity'):
+                    self._apply_identity_row(row['saved_identity'])
+            for discipline_row in row.get('saved_disciplines') or []:
+                self._apply_discipline_row(discipline_row)
+            if row.get('saved_stats'):
+                self._apply_stats_row(row['saved_stats'])
+        self.mark_clean()
+
+    def set_inventory_quantity(self, item: dict, quantity: int):
+        """Mirror an inventory write in memory instead of reloading it."""
+        if 'inventory' not in self.loaded_sections:
+            return
+        for row in self.inventory:
+            if row['item_id'] == item['item_id']:
+                row['quantity'] = quantity
+                return
+        self.inventory.append({**item, 'quantity': quantity})
+
     def get_discipline_level(self, discipline: str) -> int:
         """Get the current level for a discipline."""
         if discipline in self.discipline_progress:
@@ -0,0 +1,229 @@
+"""
+Per-process cache of player state, validated by a version number.
+
+player_counters.state_version is bumped by triggers on every write to a
+player's profile, disciplines, stats, inventory or achievements (migrations
+4 and 5), so a cached copy is current exactly when its version matches. A cache
+hit costs one primary-key lookup of that version instead of the five
+PLAYER_LOAD_QUERIES; within a request that has not written, a version already
+checked is trusted without asking again.
+
+Callers may load only the sections they need:
+
+    rows = load_player_rows(player_id, sections=('profile',))
+
+Only state read by a transaction that has not written is cached, so
+uncommitted (or later rolled back) changes never leak to other requests.
+Other workers' commits evict entries through the invalidation bus
+(src.db.invalidation); while it is disconnected entries expire by age.
+
+    PLAYER_CACHE_SIZE    players kept per worker (default 1000, 0 disables)
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from types import MappingProxyType
+
+from flask import g, has_request_context
+
+from src.database import get_connection, return_connection, get_current_unit_of_work, env_number
+from src.db.invalidation import register_invalidation_handler, stale_after
+from src.db.prepared import (
+    execute_prepared,
+    PLAYER_STATE_VERSION,
+    PLAYER_PROFILE,
+    PLAYER_DISCIPLINES,
+    PLAYER_STATS,
+    PLAYER_INVENTORY,
+    PLAYER_ACHIEVEMENTS,
+)
+
+# (section, statement, returns many rows)
+PLAYER_LOAD_QUERIES = (
+    ('profile', PLAYER_PROFILE, False),
+    ('disciplines', PLAYER_DISCIPLINES, True),
+    ('stats', PLAYER_STATS, False),
+    ('inventory', PLAYER_INVENTORY, True),
+    ('achievements', PLAYER_ACHIEVEMENTS, True),
+)
+PLAYER_SECTIONS = tuple(section for section, _, _ in PLAYER_LOAD_QUERIES)
+
+
+def _freeze_rows(rows, many):
+    if many:
+        return tuple(MappingProxyType(dict(row)) for row in rows)
+    return MappingProxyType(dict(rows)) if rows is not None else None
+
+
+class PlayerStateCache:
+    """LRU of player_id -> (state_version, {section: frozen rows}, stored at).
+
+    Entries older than src.db.invalidation.stale_after() are expired on read.
+    """
+
+    def __init__(self, max_entries: int = 1000):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.expirations = 0
+
+    def get(self, player_id: int):
+        max_age = stale_after()
+        with self._lock:
+            entry = self._entries.get(player_id)
+            if entry is not None and max_age is not None and time.monotonic() - entry[2] > max_age:
+                del self._entries[player_id]
+                self.expirations += 1
+                entry = None
+            if entry is not None:
+                self._entries.move_to_end(player_id)
+            return entry
+
+    def put(self, player_id: int, version: int, sections: dict):
+        """Store sections read at `version`, merging with an entry of the same version."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            entry = self._entries.get(player_id)
+            stored_at = time.monotonic()
+            if entry is not None and entry[0] == version:
+                sections = {**entry[1], **sections}
+                stored_at = entry[2]
+            self._entries[player_id] = (version, sections, stored_at)
+            self._entries.move_to_end(player_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def discard(self, player_id: int):
+        with self._lock:
+            if self._entries.pop(player_id, None) is not None:
+                self.invalidations += 1
+
+    def discard_older(self, player_id, version):
+        """Invalidation handler: drop the player's entry if it is older than
+        `version` (whatever its version if None); player_id None drops all."""
+        with self._lock:
+            if player_id is None:
+                self.invalidations += len(self._entries)
+                self._entries.clear()
+                return
+            entry = self._entries.get(player_id)
+            if entry is not None and (version is None or entry[0] < version):
+                del self._entries[player_id]
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> dict:
+        return {
+            'entries': len(self._entries),
+            'max_entries': self.max_entries,
+            'hits': self.hits,
+            'misses': self.misses,
+            'invalidations': self.invalidations,
+            'expirations': self.expirations,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_player_state_cache() -> PlayerStateCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = PlayerStateCache(env_number("PLAYER_CACHE_SIZE", 1000))
+                register_invalidation_handler('player', _cache.discard_older)
+    return _cache
+
+
+def _checked_this_request():
+    """Versions already checked in this request, or None when they cannot be
+    trusted: outside a request, or once the request has written."""
+    if not has_request_context():
+        return None
+    uow = get_current_unit_of_work(create=False)
+    if uow is None or uow.wrote or g.get('_db_wrote'):
+        return None
+    checked = g.get('_player_state_checked')
+    if checked is None:
+        checked = g._player_state_checked = {}
+    return checked
+
+
+def known_state_version(player_id: int):
+    """The player's state_version as already checked in this request, or None."""
+    checked = _checked_this_request()
+    return checked.get(player_id) if checked is not None else None
+
+
+def load_player_rows(player_id: int, sections=None) -> dict:
+    """Rows for the requested sections of a player, keyed by section.
+
+    Returns {} if the player does not exist. The rows are shared with the
+    cache and must not be modified.
+    """
+    sections = PLAYER_SECTIONS if sections is None else tuple(sections)
+    unknown = set(sections) - set(PLAYER_SECTIONS)
+    if unknown:
+        raise ValueError(f"Unknown player sections: {sorted(unknown)}")
+
+    cache = get_player_state_cache()
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        if cache.max_entries <= 0:
+            rows = {}
+            for section, statement, many in PLAYER_LOAD_QUERIES:
+                if section in sections:
+                    execute_prepared(cur, statement, (player_id,))
+                    rows[section] = cur.fetchall() if many else cur.fetchone()
+            return rows
+
+        entry = cache.get(player_id)
+        checked = _checked_this_request()
+        if (entry is not None and checked is not None and checked.get(player_id) == entry[0]
+                and all(section in entry[1] for section in sections)):
+            cache.hits += 1
+            return {section: entry[1][section] for section in sections}
+
+        # Read the version before the sections: a write committed in between
+        # leaves the entry older than its version, never newer.
+        execute_prepared(cur, PLAYER_STATE_VERSION, (player_id,))
+        version_row = cur.fetchone()
+        if version_row is None:
+            cache.discard(player_id)
+            return {}
+        version = version_row['state_version']
+        if entry is not None and entry[0] != version:
+            cache.discard(player_id)
+            entry = None
+
+        cached = entry[1] if entry is not None else {}
+        fetched = {}
+        for section, statement, many in PLAYER_LOAD_QUERIES:
+            if section in sections and section not in cached:
+                execute_prepared(cur, statement, (player_id,))
+                fetched[section] = _freeze_rows(cur.fetchall() if many else cur.fetchone(), many)
+
+        if fetched:
+            cache.misses += 1
+        else:
+            cache.hits += 1
+        if version_row['clean']:
+            if fetched:
+                cache.put(player_id, version, fetched)
+            if checked is not None:
+                checked[player_id] = version
+        return {section: cached.get(section, fetched.get(section)) for section in sections}
+    finally:
+        cur.close()
+        return_connection(conn)
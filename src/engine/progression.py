@@ -4,66 +4,129 @@ ProgressionMixin - Progression-related GameEngine methods.
 
 import random
 import datetime
-from src.database import get_connection, return_connection
+from src.database import get_connection, return_connection, get_catalog
+from src.db.prepared import execute_prepared, PLAYER_ENERGY, PLAYER_COMPLETED_STARS
 from src.leveling import DISCIPLINES
+from src.engine.regen import ENERGY, IDLE_INCOME
+from src.engine.leaderboards import get_top_players, get_leaderboard_standing
+
+
+def energy_status(energy_row) -> dict:
+    """Current energy for a player_energy row; a player without one is full."""
+    if not energy_row:
+        defaults = ENERGY.defaults
+        return {
+            "current_energy": defaults['current_energy'],
+            "max_energy": defaults['max_energy'],
+            "next_recharge_in": 0
+        }
+    status = ENERGY.status(energy_row)
+    return {
+        "current_energy": status['value'],
+        "max_energy": energy_row['max_energy'],
+        "next_recharge_in": status['next_in']
+    }
+
+
+def daily_login_status(login_row, today: datetime.date = None) -> dict:
+    """Daily login status for a player_daily_login row (None: never claimed)."""
+    today = today or datetime.date.today()
+    login_row = login_row or {'current_streak': 0, 'longest_streak': 0, 'last_claim_date': None}
+    
+    current_streak = login_row['current_streak'] or 0
+    longest_streak = login_row['longest_streak'] or 0
+    last_claim = login_row['last_claim_date']
+    
+    can_claim = False
+    streak_broken = False
+    
+    if last_claim is None:
+        can_claim = True
+    elif isinstance(last_claim, datetime.datetime):
+        last_claim = last_claim.date()
+    
+    if last_claim and last_claim < today:
+        can_claim = True
+        if last_claim < today - datetime.timedelta(days=1):
+            streak_broken = True
+    
+    reward_day = (current_streak % 7) + 1 if not streak_broken else 1
+    
+    reward = get_catalog().get('daily_login_rewards', reward_day)
+    
+    return {
+        "current_streak": current_streak,
+        "longest_streak": longest_streak,
+        "can_claim": can_claim,
+        "streak_broken": streak_broken,
+        "reward_day": reward_day,
+        "reward": dict(reward) if reward else None
+    }
+
+
+# A player_prestige row before the player has prestiged.
+PRESTIGE_DEFAULTS = {'prestige_level': 0, 'exp_multiplier': 1.0, 'gold_multiplier': 1.0, 'total_prestiges': 0}
+
+
+def idle_income_status(idle_row) -> dict:
+    """Idle income accumulated on a player_idle_income row (None: not provisioned)."""
+    idle_row = idle_row or {'gold_per_minute': 0, 'uncollected_gold': 0, 'last_collection_at': None}
+    status = IDLE_INCOME.status(idle_row)
+    gold_per_minute = float(idle_row['gold_per_minute'] or 0)
+    return {
+        "gold_per_minute": gold_per_minute,
+        "gold_per_hour": gold_per_minute * 60,
+        "accumulated_gold": round(status['value'], 2),
+        "hours_elapsed": round(status['elapsed'] / 3600, 1),
+        "max_accumulation_hours": IDLE_INCOME.max_elapsed // 3600,
+        "last_collection": idle_row['last_collection_at']
+    }
+
+
+def sum_equipment_bonuses(equipped) -> dict:
+    """Stat bonuses from equipped items (rows with stat_bonus_type/stat_bonus_value)."""
+    bonuses = {"charisma": 0, "intelligence": 0, "luck": 0, "negotiation": 0}
+    for item in equipped:
+        stat_type = item['stat_bonus_type']
+        if stat_type in bonuses:
+            bonuses[stat_type] += item['stat_bonus_value']
+
+    return bonuses
+
+
+def sum_advisor_bonuses(active_advisors, discipline: str = None) -> dict:
+    """Bonuses from active advisors (advisor rows plus the player's advisor level)."""
+    bonuses = {"exp_boost": 0, "gold_boost": 0, "reputation_boost": 0}
+
+    for advisor in active_advisors:
+        applies = discipline is None or advisor['discipline_specialty'] == discipline
+        if applies:
+            bonus_type = advisor['bonus_type']
+            bonus_value = advisor['bonus_value'] * advisor['level']
+            if bonus_type in bonuses:
+                bonuses[bonus_type] += bonus_value
+
+    return bonuses
 
 
 class ProgressionMixin:
     """Mixin providing progression-related methods for GameEngine."""
 
     def get_player_energy(self) -> dict:
-        """Get current player energy with auto-recharge calculation."""
+        """Get current player energy with auto-recharge calculation (read only)."""
         if not self.current_player:
             return {"error": "No player loaded"}
         
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT * FROM player_energy WHERE player_id = %s
-        """, (self.current_player.player_id,))
-        energy_row = cur.fetchone()
-        
-        if not energy_row:
-            cur.execute("""
-                INSERT INTO player_energy (player_id, current_energy, max_energy, last_recharge_at)
-                VALUES (%s, 100, 100, CURRENT_TIMESTAMP)
-                RETURNING *
-            """, (self.current_player.player_id,))
-            energy_row = cur.fetchone()
-            conn.commit()
-        
-        current_energy = energy_row['current_energy']
-        max_energy = energy_row['max_energy']
-        last_recharge = energy_row['last_recharge_at']
-        
-        now = datetime.datetime.now(datetime.timezone.utc)
-        if last_recharge.tzinfo is None:
-            last_recharge = last_recharge.replace(tzinfo=datetime.timezone.utc)
-        
-        minutes_elapsed = (now - last_recharge).total_seconds() / 60
-        energy_to_add = int(minutes_elapsed / 5)
-        
-        if energy_to_add > 0 and current_energy < max_energy:
-            new_energy = min(max_energy, current_energy + energy_to_add)
-            cur.execute("""
-                UPDATE player_energy 
-                SET current_energy = %s, last_recharge_at = CURRENT_TIMESTAMP
-                WHERE player_id = %s
-            """, (new_energy, self.current_player.player_id))
-            conn.commit()
-            current_energy = new_energy
-        
-        next_recharge_seconds = (5 - (minutes_elapsed % 5)) * 60 if current_energy < max_energy else 0
+        execute_prepared(cur, PLAYER_ENERGY, (self.current_player.player_id,))
+        energy = energy_status(cur.fetchone())
         
         cur.close()
         return_connection(conn)
         
-        return {
-            "current_energy": current_energy,
-            "max_energy": max_energy,
-            "next_recharge_in": int(next_recharge_seconds)
-        }
+        return energy
     
     def consume_energy(self, amount: int = 10) -> dict:
         """Consume energy when playing a scenario."""
@@ -80,17 +143,13 @@ class ProgressionMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("""
-            UPDATE player_energy 
-            SET current_energy = current_energy - %s
-            WHERE player_id = %s
-            RETURNING current_energy
-        """, (amount, self.current_player.player_id))
-        result = cur.fetchone()
+        result = ENERGY.apply(cur, self.current_player.player_id, -amount)
         conn.commit()
         cur.close()
         return_connection(conn)
         
+        if not result:
+            return {"error": f"Not enough energy! Need {amount}"}
         return {"success": True, "new_energy": result['current_energy']}
     
     def recharge_energy(self, amount: int) -> dict:
@@ -101,13 +160,7 @@ class ProgressionMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("""
-            UPDATE player_energy 
-            SET current_energy = LEAST(max_energy, current_energy + %s)
-            WHERE player_id = %s
-            RETURNING current_energy, max_energy
-        """, (amount, self.current_player.player_id))
-        result = cur.fetchone()
+        result = ENERGY.apply(cur, self.current_player.player_id, amount)
         conn.commit()
         cur.close()
         return_connection(conn)
@@ -129,53 +182,10 @@ class ProgressionMixin:
         """, (self.current_player.player_id,))
         login_row = cur.fetchone()
         
-        today = datetime.date.today()
-        
-        if not login_row:
-            cur.execute("""
-                INSERT INTO player_daily_login (player_id, current_streak, longest_streak, last_login_date, last_claim_date)
-                VALUES (%s, 0, 0, NULL, NULL)
-                RETURNING *
-            """, (self.current_player.player_id,))
-            login_row = cur.fetchone()
-            conn.commit()
-        
-        current_streak = login_row['current_streak']
-        longest_streak = login_row['longest_streak']
-        last_login = login_row['last_login_date']
-        last_claim = login_row['last_claim_date']
-        
-        can_claim = False
-        streak_broken = False
-        
-        if last_claim is None:
-            can_claim = True
-        elif isinstance(last_claim, datetime.datetime):
-            last_claim = last_claim.date()
-        
-        if last_claim and last_claim < today:
-            can_claim = True
-            if last_claim < today - datetime.timedelta(days=1):
-                streak_broken = True
-        
-        reward_day = (current_streak % 7) + 1 if not streak_broken else 1
-        
-        cur.execute("""
-            SELECT * FROM daily_login_rewards WHERE day_number = %s
-        """, (reward_day,))
-        reward = cur.fetchone()
-        
         cur.close()
         return_connection(conn)
         
-        return {
-            "current_streak": current_streak,
-            "longest_streak": longest_streak,
-            "can_claim": can_claim,
-            "streak_broken": streak_broken,
-            "reward_day": reward_day,
-            "reward": dict(reward) if reward else None
-        }
+        return daily_login_status(login_row)
     
     def claim_daily_login(self) -> dict:
         """Claim daily login reward."""
@@ -196,11 +206,21 @@ class ProgressionMixin:
         new_streak = 1 if status['streak_broken'] else status['current_streak'] + 1
         longest = max(status['longest_streak'], new_streak)
         
+        # The row may not exist yet; a concurrent claim for today makes this a no-op.
         cur.execute("""
-            UPDATE player_daily_login 
-            SET current_streak = %s, longest_streak = %s, last_login_date = %s, last_claim_date = %s
-            WHERE player_id = %s
-        """, (new_streak, longest, today, today, self.current_player.player_id))
+            INSERT INTO player_daily_login (player_id, current_streak, longest_streak, last_login_date, last_claim_date)
+            VALUES (%s, %s, %s, %s, %s)
+            ON CONFLICT (player_id) DO UPDATE
+            SET current_streak = EXCLUDED.current_streak, longest_streak = EXCLUDED.longest_streak,
+                last_login_date = EXCLUDED.last_login_date, last_claim_date = EXCLUDED.last_claim_date
+            WHERE player_daily_login.last_claim_date IS NULL
+            OR player_daily_login.last_claim_date < EXCLUDED.last_claim_date
+            RETURNING player_id
+        """, (self.current_player.player_id, new_streak, longest, today, today))
+        if cur.fetchone() is None:
+            cur.close()
+            return_connection(conn)
+            return {"error": "Already claimed today!"}
         
         reward = status['reward']
         rewards_given = []
@@ -241,38 +261,10 @@ class ProgressionMixin:
         """, (self.current_player.player_id,))
         row = cur.fetchone()
         
-        now = datetime.datetime.now()
-        
-        if not row:
-            base_rate = self._calculate_base_idle_rate()
-            cur.execute("""
-                INSERT INTO player_idle_income (player_id, gold_per_minute, last_collection_at, uncollected_gold)
-                VALUES (%s, %s, %s, 0)
-                RETURNING *
-            """, (self.current_player.player_id, base_rate, now))
-            row = cur.fetchone()
-            conn.commit()
-        
-        last_collection = row['last_collection_at']
-        gold_per_minute = float(row['gold_per_minute'])
-        
-        if last_collection:
-            minutes_elapsed = (now - last_collection).total_seconds() / 60
-            minutes_elapsed = min(minutes_elapsed, 480)
-            accumulated = minutes_elapsed * gold_per_minute
-        else:
-            accumulated = 0
-        
         cur.close()
         return_connection(conn)
         
-        return {
-            "gold_per_minute": gold_per_minute,
-            "gold_per_hour": gold_per_minute * 60,
-            "accumulated_gold": round(accumulated, 2),
-            "max_accumulation_hours": 8,
-            "last_collection": last_collection
-        }
+        return idle_income_status(row)
     
     def _calculate_base_idle_rate(self) -> float:
         """Calculate base idle income rate based on completed scenarios and levels."""
@@ -311,21 +303,19 @@ class ProgressionMixin:
         if status.get("error"):
             return status
         
-        collected = status['accumulated_gold']
-        if collected < 1:
+        if status['accumulated_gold'] < 1:
             return {"error": "Not enough gold to collect (minimum 1 gold)"}
         
+        new_rate = self._calculate_base_idle_rate()
+        
         conn = get_connection()
         cur = conn.cursor()
         
-        now = datetime.datetime.now()
-        new_rate = self._calculate_base_idle_rate()
-        
-        cur.execute("""
-            UPDATE player_idle_income 
-            SET last_collection_at = %s, gold_per_minute = %s
-            WHERE player_id = %s
-        """, (now, new_rate, self.current_player.player_id))
+        # Collect what has accrued as of the UPDATE itself, so two concurrent
+        # collections cannot both pay out the same gold.
+        result = IDLE_INCOME.apply(cur, self.current_player.player_id, collect=True,
+                                   set_values={'gold_per_minute': new_rate})
+        collected = round(float(result['previous']), 2) if result else 0
         
         self.current_player.cash += collected
         self.current_player.save_to_db()
@@ -343,46 +333,13 @@ class ProgressionMixin:
     
     def get_leaderboard(self, category: str = "stars") -> list:
         """Get leaderboard rankings for various categories."""
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        if category == "stars":
-            cur.execute("""
-                SELECT pp.player_name, pp.chosen_world, COUNT(cs.id) as total_scenarios,
-                       COALESCE(SUM(cs.stars_earned), 0) as total_stars
-                FROM player_profiles pp
-                LEFT JOIN completed_scenarios cs ON pp.player_id = cs.player_id
-                GROUP BY pp.player_id, pp.player_name, pp.chosen_world
-                ORDER BY total_stars DESC
-                LIMIT 10
-            """)
-        elif category == "wealth":
-            cur.execute("""
-                SELECT player_name, chosen_world, total_cash as score
-                FROM player_profiles
-                ORDER BY total_cash DESC
-                LIMIT 10
-            """)
-        elif category == "levels":
-            cur.execute("""
-                SELECT pp.player_name, pp.chosen_world, 
-                       COALESCE(SUM(pdp.current_level), 6) as total_levels
-                FROM player_profiles pp
-                LEFT JOIN player_discipline_progress pdp ON pp.player_id = pdp.player_id
-                GROUP BY pp.player_id, pp.player_name, pp.chosen_world
-                ORDER BY total_levels DESC
-                LIMIT 10
-            """)
-        else:
-            cur.close()
-            return_connection(conn)
-            return []
-        
-        results = cur.fetchall()
-        cur.close()
-        return_connection(conn)
-        
-        return [dict(r) for r in results]
+        return get_top_players(category, 10)
+    
+    def get_leaderboard_standing(self, category: str = "stars"):
+        """The current player's rank in a leaderboard category."""
+        if not self.current_player:
+            return None
+        return get_leaderboard_standing(self.current_player.player_id, category)
     
     def get_equipment_bonuses(self) -> dict:
         """Get stat bonuses from equipped items."""
@@ -403,13 +360,7 @@ class ProgressionMixin:
         cur.close()
         return_connection(conn)
         
-        bonuses = {"charisma": 0, "intelligence": 0, "luck": 0, "negotiation": 0}
-        for item in equipped:
-            stat_type = item['stat_bonus_type']
-            if stat_type in bonuses:
-                bonuses[stat_type] += item['stat_bonus_value']
-        
-        return bonuses
+        return sum_equipment_bonuses(equipped)
     
     def get_advisor_bonuses(self, discipline: str = None) -> dict:
         """Get active advisor bonuses that apply to scenarios.
@@ -436,17 +387,7 @@ class ProgressionMixin:
         cur.close()
         return_connection(conn)
         
-        bonuses = {"exp_boost": 0, "gold_boost": 0, "reputation_boost": 0}
-        
-        for advisor in active_advisors:
-            applies = discipline is None or advisor['discipline_specialty'] == discipline
-            if applies:
-                bonus_type = advisor['bonus_type']
-                bonus_value = advisor['bonus_value'] * advisor['level']
-                if bonus_type in bonuses:
-                    bonuses[bonus_type] += bonus_value
-        
-        return bonuses
+        return sum_advisor_bonuses(active_advisors, discipline)
     
     def get_prestige_status(self) -> dict:
         """Get player's prestige status and available bonuses."""
@@ -459,16 +400,7 @@ class ProgressionMixin:
         cur.execute("""
             SELECT * FROM player_prestige WHERE player_id = %s
         """, (self.current_player.player_id,))
-        row = cur.fetchone()
-        
-        if not row:
-            cur.execute("""
-                INSERT INTO player_prestige (player_id, prestige_level, exp_multiplier, gold_multiplier, total_prestiges)
-                VALUES (%s, 0, 1.0, 1.0, 0)
-                RETURNING *
-            """, (self.current_player.player_id,))
-            row = cur.fetchone()
-            conn.commit()
+        row = cur.fetchone() or PRESTIGE_DEFAULTS
         
         cur.execute("""
             SELECT SUM(current_level) as total FROM player_discipline_progress WHERE player_id = %s
@@ -717,8 +649,7 @@ class ProgressionMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM rivals WHERE rival_id = %s", (rival_id,))
-        rival = cur.fetchone()
+        rival = get_catalog().get('rivals', rival_id)
         
         if not rival:
             cur.close()
@@ -774,28 +705,14 @@ class ProgressionMixin:
         player_world = self.current_player.world
         player_industry = self.current_player.industry
         
-        cur.execute("""
-            SELECT scenario_id FROM completed_scenarios 
-            WHERE player_id = %s
-        """, (self.current_player.player_id,))
-        completed_ids = {row['scenario_id'] for row in cur.fetchall()}
-        
-        cur.execute("""
-            SELECT scenario_id, stars_earned FROM completed_scenarios 
-            WHERE player_id = %s
-        """, (self.current_player.player_id,))
+        execute_prepared(cur, PLAYER_COMPLETED_STARS, (self.current_player.player_id,))
         stars_by_scenario = {row['scenario_id']: row['stars_earned'] for row in cur.fetchall()}
+        completed_ids = set(stars_by_scenario)
         
+        catalog = get_catalog()
         campaign_data = {}
         for discipline in DISCIPLINES:
-            cur.execute("""
-                SELECT scenario_id, scenario_title, required_level
-                FROM scenario_master
-                WHERE world_type = %s AND industry = %s AND discipline = %s AND is_active = TRUE
-                ORDER BY required_level ASC
-                LIMIT 10
-            """, (player_world, player_industry, discipline))
-            scenarios = cur.fetchall()
+            scenarios = catalog.scenarios(player_world, player_industry, discipline=discipline)[:10]
             
             nodes = []
             for idx, s in enumerate(scenarios):
@@ -849,17 +766,9 @@ class ProgressionMixin:
         player_world = self.current_player.world
         player_industry = self.current_player.industry
         
-        cur.execute("""
-            SELECT scenario_id FROM completed_scenarios 
-            WHERE player_id = %s
-        """, (self.current_player.player_id,))
-        completed_ids = {row['scenario_id'] for row in cur.fetchall()}
-        
-        cur.execute("""
-            SELECT scenario_id, stars_earned FROM completed_scenarios 
-            WHERE player_id = %s
-        """, (self.current_player.player_id,))
+        execute_prepared(cur, PLAYER_COMPLETED_STARS, (self.current_player.player_id,))
         stars_by_scenario = {row['scenario_id']: row['stars_earned'] for row in cur.fetchall()}
+        completed_ids = set(stars_by_scenario)
         
         cur.execute("""
             SELECT discipline_name, current_level 
@@ -868,15 +777,13 @@ class ProgressionMixin:
         """, (self.current_player.player_id,))
         player_levels = {row['discipline_name']: row['current_level'] for row in cur.fetchall()}
         
-        cur.execute("""
-            SELECT * FROM scenario_master
-            WHERE world_type = %s AND industry = %s 
-            AND required_level IN (5, 10) AND is_active = TRUE
-            ORDER BY discipline, required_level
-        """, (player_world, player_industry))
+        boss_candidates = sorted(
+            get_catalog().scenarios(player_world, player_industry, levels=(5, 10)),
+            key=lambda s: (s['discipline'], s['required_level'])
+        )
         
         boss_scenarios = []
-        for s in cur.fetchall():
+        for s in boss_candidates:
             disc = s['discipline']
             player_level = player_levels.get(disc, 1)
             is_completed = s['scenario_id'] in completed_ids
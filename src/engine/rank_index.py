@@ -0,0 +1,153 @@
+"""
+In-memory order-statistic index for leaderboards.
+
+RankIndex keeps (score, member) pairs best-first in sorted blocks, with a
+Fenwick tree over the block lengths, so a member's rank, the entry at a
+given position and a score change each cost O(log n) (plus a list insert
+within one block), however many members there are:
+
+    index = RankIndex([(player_id, score), ...])
+    index.update(player_id, new_score)
+    index.rank(player_id)             # 1-based; tied scores share a rank
+    index.around(player_id, 5)        # [(rank, player_id, score), ...]
+"""
+
+import threading
+from bisect import bisect_left, insort
+
+
+class RankIndex:
+    """Members ranked by score, highest first, ties broken by member."""
+
+    def __init__(self, rows=(), block_size: int = 512):
+        self.block_size = block_size
+        self._lock = threading.RLock()
+        self._scores = {}
+        for member, score in rows:
+            if score is not None:
+                self._scores[member] = score
+        self._rebuild(sorted((-score, member) for member, score in self._scores.items()))
+
+    def __len__(self):
+        return len(self._scores)
+
+    def __contains__(self, member):
+        return member in self._scores
+
+    def score(self, member):
+        return self._scores.get(member)
+
+    # -- blocks and the Fenwick tree over their lengths --------------------
+
+    def _rebuild(self, keys):
+        size = self.block_size
+        self._blocks = [keys[i:i + size] for i in range(0, len(keys), size)]
+        self._maxes = [block[-1] for block in self._blocks]
+        self._tree = [0] * (len(self._blocks) + 1)
+        for i, block in enumerate(self._blocks):
+            self._tree_add(i, len(block))
+
+    def _tree_add(self, block_index, delta):
+        i = block_index + 1
+        while i < len(self._tree):
+            self._tree[i] += delta
+            i += i & -i
+
+    def _before(self, block_index) -> int:
+        """Keys in the blocks before `block_index`."""
+        total, i = 0, block_index
+        while i > 0:
+            total += self._tree[i]
+            i -= i & -i
+        return total
+
+    def _locate(self, position):
+        """(block, offset) of the key at 0-based `position`."""
+        block, step = 0, 1 << (len(self._tree) - 1).bit_length()
+        while step:
+            nxt = block + step
+            if nxt < len(self._tree) and self._tree[nxt] <= position:
+                block = nxt
+                position -= self._tree[nxt]
+            step >>= 1
+        return block, position
+
+    def _position(self, key) -> int:
+        """Number of keys ordered before `key`."""
+        block = bisect_left(self._maxes, key)
+        if block == len(self._blocks):
+            return len(self._scores)
+        return self._before(block) + bisect_left(self._blocks[block], key)
+
+    def _insert(self, key):
+        if not self._blocks:
+            self._rebuild([key])
+            return
+        block = min(bisect_left(self._maxes, key), len(self._blocks) - 1)
+        insort(self._blocks[block], key)
+        self._maxes[block] = self._blocks[block][-1]
+        if len(self._blocks[block]) > 2 * self.block_size:
+            self._rebuild([k for b in self._blocks for k in b])
+        else:
+            self._tree_add(block, 1)
+
+    def _remove(self, key):
+        block = bisect_left(self._maxes, key)
+        keys = self._blocks[block]
+        del keys[bisect_left(keys, key)]
+        if keys:
+            self._maxes[block] = keys[-1]
+            self._tree_add(block, -1)
+        else:
+            self._rebuild([k for b in self._blocks for k in b])
+
+    # -- public API ----------------------------------------------------------
+
+    def update(self, member, score):
+        """Set a member's score; None removes the member."""
+        with self._lock:
+            old = self._scores.get(member)
+            if old == score and (old is not None or member not in self._scores):
+                return
+            if member in self._scores:
+                self._remove((-old, member))
+                del self._scores[member]
+            if score is not None:
+                self._scores[member] = score
+                self._insert((-score, member))
+
+    def remove(self, member):
+        self.update(member, None)
+
+    def rank(self, member):
+        """1-based rank (1 + members with a strictly higher score), or None."""
+        with self._lock:
+            score = self._scores.get(member)
+            if score is None:
+                return None
+            return self._position((-score,)) + 1
+
+    def entries(self, start: int, stop: int) -> list:
+        """[(rank, member, score)] for 0-based positions start..stop-1."""
+        with self._lock:
+            start, stop = max(0, start), min(stop, len(self._scores))
+            if start >= stop:
+                return []
+            block, offset = self._locate(start)
+            keys = []
+            while len(keys) < stop - start:
+                keys.extend(self._blocks[block][offset:offset + stop - start - len(keys)])
+                block, offset = block + 1, 0
+            return [(self._position((neg_score,)) + 1, member, -neg_score) for neg_score, member in keys]
+
+    def top(self, n: int) -> list:
+        return self.entries(0, n)
+
+    def around(self, member, k: int) -> list:
+        """The member's entry with up to k entries either side; [] if absent."""
+        with self._lock:
+            score = self._scores.get(member)
+            if score is None:
+                return []
+            position = self._position((-score, member))
+            return self.entries(position - k, position + k + 1)
@@ -0,0 +1,166 @@
+"""
+Regenerating player resources, computed on read.
+
+A regenerating resource is stored as (value, anchor, rate, cap): the value it
+had at the anchor timestamp, how much it gains per period, and the most it can
+regenerate to. The current value follows in closed form, so reading one never
+writes; only spending or collecting it does, and that write moves the anchor
+to the moment the new value was true.
+
+    ENERGY.status(row)                        # {'value': ..., 'next_in': ...}
+    ENERGY.apply(cur, player_id, -10)         # spend; None if not enough
+    IDLE_INCOME.apply(cur, player_id, collect=True)
+
+Anchors are TIMESTAMPTZ (migration 12) and compared against now() in SQL and
+an aware UTC datetime in Python, so both agree whatever the session time
+zone. A naive anchor (a row read before that migration) is taken as UTC.
+"""
+
+import datetime
+import math
+
+
+class RegenResource:
+    """One regenerating resource: a row per player in `table`.
+
+    `rate` and `cap` are column names or constants. A stepped resource gains
+    `rate` once per whole `period` seconds; otherwise it accrues continuously.
+    `max_elapsed` bounds how much time counts since the anchor.
+    """
+
+    def __init__(self, table: str, value: str, anchor: str, rate, period: int,
+                 cap=None, stepped: bool = False, max_elapsed: int = None, defaults: dict = None):
+        self.table = table
+        self.value = value
+        self.anchor = anchor
+        self.rate = rate
+        self.period = period
+        self.cap = cap
+        self.stepped = stepped
+        self.max_elapsed = max_elapsed
+        self.defaults = defaults or {}
+
+    def _column_or_constant(self, row, spec):
+        return row[spec] if isinstance(spec, str) else spec
+
+    def status(self, row: dict, now: datetime.datetime = None) -> dict:
+        """Current value of a stored row: value, seconds counted since the
+        anchor, and seconds until the next step (0 when full or continuous)."""
+        now = now or datetime.datetime.now(datetime.timezone.utc)
+        value = row[self.value] or 0
+        rate = self._column_or_constant(row, self.rate) or 0
+        cap = self._column_or_constant(row, self.cap)
+        if not self.stepped:
+            value, rate = float(value), float(rate)
+
+        anchor = row[self.anchor]
+        elapsed = 0.0
+        if anchor is not None:
+            if anchor.tzinfo is None:
+                anchor = anchor.replace(tzinfo=datetime.timezone.utc)
+            elapsed = max(0.0, (now - anchor).total_seconds())
+        counted = min(elapsed, self.max_elapsed) if self.max_elapsed is not None else elapsed
+
+        periods = counted / self.period
+        gain = math.floor(periods) * rate if self.stepped else periods * rate
+        current = value + gain
+        if cap is not None:
+            current = max(value, min(cap, current))
+
+        next_in = 0
+        if self.stepped and (cap is None or current < cap):
+            next_in = int(self.period - (elapsed % self.period))
+        return {'value': current, 'elapsed': counted, 'next_in': next_in}
+
+    def _sql(self, alias: str) -> tuple:
+        """(current value, anchor for that value) as SQL over `alias`."""
+        def ref(spec):
+            return f"{alias}.{spec}" if isinstance(spec, str) else repr(spec)
+
+        elapsed = f"GREATEST(0, EXTRACT(EPOCH FROM (CURRENT_TIMESTAMP - COALESCE({alias}.{self.anchor}, CURRENT_TIMESTAMP))))"
+        if self.max_elapsed is not None:
+            elapsed = f"LEAST({self.max_elapsed}, {elapsed})"
+        periods = f"({elapsed} / {self.period})"
+        if self.stepped:
+            periods = f"FLOOR{periods}"
+        value = f"COALESCE({alias}.{self.value}, 0)"
+        current = f"({value} + {periods} * {ref(self.rate)})"
+        if self.cap is not None:
+            current = f"GREATEST({value}, LEAST({ref(self.cap)}, {current}))"
+
+        # A stepped resource below its cap keeps the part-period already
+        # earned; anything else restarts from now.
+        anchor = "CURRENT_TIMESTAMP"
+        if self.stepped and self.max_elapsed is None:
+            step = f"COALESCE({alias}.{self.anchor}, CURRENT_TIMESTAMP) + {periods} * INTERVAL '{self.period} seconds'"
+            if self.cap is not None:
+                anchor = f"CASE WHEN {current} >= {ref(self.cap)} THEN CURRENT_TIMESTAMP ELSE {step} END"
+            else:
+                anchor = step
+        return current, anchor
+
+    def apply(self, cur, player_id: int, change=0, collect: bool = False, set_values: dict = None):
+        """Add `change` to the current value (capped), or take all of it when
+        `collect`, in one conditional UPDATE.
+
+        Returns the updated row plus 'previous' (the value just before), or
+        None when the value would go below zero. A player without a row gets
+        one from `defaults` first.
+        """
+        current, anchor = self._sql('r')
+        if collect:
+            new_value = "0"
+        elif self.cap is not None:
+            new_value = f"LEAST(GREATEST(old.current, t.{self.cap}), old.current + %(change)s)"
+        else:
+            new_value = "old.current + %(change)s"
+        assignments = [f"{self.value} = {new_value}", f"{self.anchor} = old.new_anchor"]
+        assignments += [f"{column} = %(set_{column})s" for column in (set_values or {})]
+
+        sql = f"""
+            UPDATE {self.table} t
+            SET {', '.join(assignments)}
+            FROM (
+                SELECT r.player_id, {current} AS current, {anchor} AS new_anchor
+                FROM {self.table} r
+                WHERE r.player_id = %(player_id)s
+                FOR UPDATE
+            ) old
+            WHERE t.player_id = old.player_id
+            AND old.current + %(change)s >= 0
+            RETURNING old.current AS previous, t.*
+        """
+        params = {'player_id': player_id, 'change': 0 if collect else change}
+        params.update({f"set_{column}": v for column, v in (set_values or {}).items()})
+
+        cur.execute(sql, params)
+        row = cur.fetchone()
+        if row is None and self.ensure_row(cur, player_id):
+            cur.execute(sql, params)
+            row = cur.fetchone()
+        return row
+
+    def ensure_row(self, cur, player_id: int) -> bool:
+        """Create the player's row from `defaults` if missing; True if created."""
+        columns = ['player_id', *self.defaults]
+        cur.execute(f"""
+            INSERT INTO {self.table} ({', '.join(columns)}, {self.anchor})
+            VALUES ({', '.join(['%s'] * len(columns))}, CURRENT_TIMESTAMP)
+            ON CONFLICT (player_id) DO NOTHING
+        """, (player_id, *self.defaults.values()))
+        return cur.rowcount == 1
+
+
+# +1 energy per 5 minutes up to max_energy
+ENERGY = RegenResource(
+    'player_energy', value='current_energy', anchor='last_recharge_at',
+    rate=1, period=300, cap='max_energy', stepped=True,
+    defaults={'current_energy': 100, 'max_energy': 100},
+)
+
+# gold_per_minute for at most 8 hours since the last collection
+IDLE_INCOME = RegenResource(
+    'player_idle_income', value='uncollected_gold', anchor='last_collection_at',
+    rate='gold_per_minute', period=60, max_elapsed=8 * 3600,
+    defaults={'uncollected_gold': 0},
+)
@@ -5,7 +5,11 @@ ScenariosMixin - Scenario-related GameEngine methods.
 import random
 import json
 import math
-from src.database import get_connection, return_connection
+from src.database import (
+    get_connection, return_connection, get_catalog, get_current_unit_of_work, unit_of_work
+)
+from src.db.competition_scores import record_competition_score
+from src.db.prepared import execute_prepared, SCENARIO_COMPLETED, PLAYER_COMPLETED_STARS, CHOICE_INPUTS
 from src.leveling import calculate_weighted_exp, check_level_up
 from src.engine.player import JOB_TITLES
 
@@ -15,27 +19,11 @@ class ScenariosMixin:
 
     def get_scenario_by_id(self, scenario_id: int) -> dict:
         """Get a specific scenario by ID."""
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT * FROM scenario_master WHERE scenario_id = %s", (scenario_id,))
-        scenario = cur.fetchone()
-        
-        cur.close()
-        return_connection(conn)
-        
-        return dict(scenario) if scenario else None
+        return get_catalog().get('scenario_master', scenario_id)
     
     def get_training_content(self, scenario_id: int) -> dict:
         """Get training/tutorial content for a scenario."""
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT training_content, discipline, challenge_type FROM scenario_master WHERE scenario_id = %s", (scenario_id,))
-        result = cur.fetchone()
-        
-        cur.close()
-        return_connection(conn)
+        result = get_catalog().get('scenario_master', scenario_id)
         
         if result and result.get('training_content'):
             try:
@@ -119,10 +107,7 @@ class ScenariosMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("""
-            SELECT 1 FROM completed_scenarios 
-            WHERE player_id = %s AND scenario_id = %s
-        """, (self.current_player.player_id, scenario_id))
+        execute_prepared(cur, SCENARIO_COMPLETED, (self.current_player.player_id, scenario_id))
         result = cur.fetchone()
         
         cur.close()
@@ -135,34 +120,11 @@ class ScenariosMixin:
         if not self.current_player:
             return []
         
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        query = """
-            SELECT s.* FROM scenario_master s
-            LEFT JOIN completed_scenarios cs ON s.scenario_id = cs.scenario_id AND cs.player_id = %s
-            WHERE s.world_type = %s 
-            AND s.industry = %s 
-            AND s.is_active = TRUE
-            AND cs.scenario_id IS NULL
-        """
-        params = [self.current_player.player_id, self.current_player.world, self.current_player.industry]
-        
-        if discipline:
-            query += " AND s.discipline = %s"
-            params.append(discipline)
-            
-            player_level = self.current_player.get_discipline_level(discipline)
-            query += " AND s.required_level <= %s"
-            params.append(player_level)
-        
-        query += " ORDER BY s.required_level, s.scenario_id"
-        
-        cur.execute(query, params)
-        scenarios = cur.fetchall()
-        
-        cur.close()
-        return_connection(conn)
+        completed = self._get_completed_stars()
+        scenarios = [
+            s for s in self._get_catalog_scenarios(discipline)
+            if s['scenario_id'] not in completed
+        ]
         
         self.available_scenarios = scenarios
         return scenarios
@@ -172,43 +134,48 @@ class ScenariosMixin:
         if not self.current_player:
             return []
         
+        completed = self._get_completed_stars()
+        scenarios = self._get_catalog_scenarios(discipline)
+        for s in scenarios:
+            s['is_completed'] = s['scenario_id'] in completed
+            s['stars_earned'] = completed.get(s['scenario_id']) or 0
+        
+        return scenarios
+    
+    def _get_catalog_scenarios(self, discipline: str = None) -> list:
+        """Active catalog scenarios for the current player's world and industry,
+        capped at their level when a discipline is given."""
+        max_level = self.current_player.get_discipline_level(discipline) if discipline else None
+        return get_catalog().scenarios(
+            self.current_player.world, self.current_player.industry,
+            discipline=discipline, max_level=max_level
+        )
+    
+    def _get_completed_stars(self) -> dict:
+        """Map of completed scenario_id -> stars earned for the current player."""
         conn = get_connection()
         cur = conn.cursor()
-        
-        query = """
-            SELECT s.*, 
-                   cs.scenario_id IS NOT NULL as is_completed,
-                   COALESCE(cs.stars_earned, 0) as stars_earned
-            FROM scenario_master s
-            LEFT JOIN completed_scenarios cs ON s.scenario_id = cs.scenario_id AND cs.player_id = %s
-            WHERE s.world_type = %s 
-            AND s.industry = %s 
-            AND s.is_active = TRUE
-        """
-        params = [self.current_player.player_id, self.current_player.world, self.current_player.industry]
-        
-        if discipline:
-            query += " AND s.discipline = %s"
-            params.append(discipline)
-            
-            player_level = self.current_player.get_discipline_level(discipline)
-            query += " AND s.required_level <= %s"
-            params.append(player_level)
-        
-        query += " ORDER BY s.required_level, s.scenario_id"
-        
-        cur.execute(query, params)
-        scenarios = [dict(row) for row in cur.fetchall()]
-        
+        execute_prepared(cur, PLAYER_COMPLETED_STARS, (self.current_player.player_id,))
+        completed = {row['scenario_id']: row['stars_earned'] for row in cur.fetchall()}
         cur.close()
         return_connection(conn)
-        
-        return scenarios
+        return completed
     
-    def process_choice(self, scenario: dict, choice: str) -> dict:
+    def process_choice(self, scenario: dict, choice: str, min_energy: int = None) -> dict:
         """
         Process a player's choice for a scenario.
         Returns result dict with EXP gained, cash change, reputation change, and feedback.
+        
+        Runs as one pipeline in one transaction: a single locked read of
+        everything the outcome depends on (CHOICE_INPUTS), the outcome computed
+        in memory, then two writes - save_to_db() and _write_choice_outcome().
+        A unit of work is opened when none is active.
+        
+        An already completed scenario, or with `min_energy` a player with less
+        energy than that, is refused on the locked read, so two concurrent
+        submits cannot both pass the checks. EXP, level, cash and reputation
+        are computed from the locked rows, and if the completion insert still
+        finds the scenario done, none of the rewards are written.
         """
         if not self.current_player:
             return {"error": "No player loaded"}
@@ -220,6 +187,52 @@ class ScenariosMixin:
         if choice == 'C' and not scenario.get('choice_c_text'):
             return {"error": "Choice C not available for this scenario"}
         
+        if get_current_unit_of_work() is None:
+            with unit_of_work():
+                return self._resolve_choice(scenario, choice, min_energy)
+        return self._resolve_choice(scenario, choice, min_energy)
+    
+    def _resolve_choice(self, scenario: dict, choice: str, min_energy: int = None) -> dict:
+        from src.company_resources import (
+            apply_resource_changes, format_resource_update, format_company_resources,
+            calculate_ability_modifiers, roll_quarterly_event, format_quarterly_event,
+            game_over_status, news_headline
+        )
+        from src.engine.progression import energy_status, sum_advisor_bonuses, sum_equipment_bonuses
+        from src.engine.snapshot import energy_row_from_snapshot
+        
+        player = self.current_player
+        conn = get_connection()
+        cur = conn.cursor()
+        execute_prepared(cur, CHOICE_INPUTS, (scenario['scenario_id'], scenario['discipline'], player.player_id))
+        inputs = cur.fetchone()
+        error = None
+        if inputs is None:
+            error = "Player not found"
+        elif not inputs['discipline']:
+            error = "Discipline not found"
+        elif inputs['completed']:
+            error = "Already completed this quest"
+        elif min_energy is not None and energy_status(energy_row_from_snapshot(inputs))['current_energy'] < min_energy:
+            error = "Not enough energy"
+        if error:
+            cur.close()
+            return_connection(conn)
+            return {"error": error}
+        
+        # Everything below works from the rows just locked, not from the
+        # Player as loaded (possibly from cache) before the lock.
+        player.apply_locked_rows(inputs)
+        
+        catalog = get_catalog()
+        advisors = []
+        for row in inputs['advisors']:
+            advisor = catalog.get('advisors', row['advisor_id'])
+            if advisor:
+                advisors.append({**advisor, 'level': row['level']})
+        equipment = [e for e in (catalog.get('equipment', i) for i in inputs['equipment_ids']) if e]
+        abilities = [a for a in (catalog.get('skill_tree_abilities', i) for i in inputs['ability_ids']) if a]
+        
         choice_prefix = f"choice_{choice.lower()}"
         base_exp = scenario[f'{choice_prefix}_exp_reward']
         cash_change = float(scenario[f'{choice_prefix}_cash_change'] or 0)
@@ -228,19 +241,19 @@ class ScenariosMixin:
         
         discipline = scenario['discipline']
         
-        advisor_bonuses = self.get_advisor_bonuses(discipline)
+        advisor_bonuses = sum_advisor_bonuses(advisors, discipline)
         exp_bonus_pct = advisor_bonuses.get('exp_boost', 0) / 100
         gold_bonus_pct = advisor_bonuses.get('gold_boost', 0) / 100
         rep_bonus = advisor_bonuses.get('reputation_boost', 0)
         
         weighted_exp = calculate_weighted_exp(
             base_exp, 
-            self.current_player.industry, 
+            player.industry, 
             discipline
         )
         weighted_exp = int(weighted_exp * (1 + exp_bonus_pct))
         
-        progress = self.current_player.discipline_progress[discipline]
+        progress = player.discipline_progress[discipline]
         old_exp = progress['total_exp']
         new_exp = old_exp + weighted_exp
         
@@ -253,78 +266,42 @@ class ScenariosMixin:
         if leveled_up:
             levels_gained = new_level - old_level
             stat_points_earned = levels_gained * 2
-            self.current_player.stats['stat_points'] += stat_points_earned
+            player.stats['stat_points'] += stat_points_earned
         
         boosted_cash = cash_change * (1 + gold_bonus_pct)
         boosted_rep = reputation_change + rep_bonus
         
-        self.current_player.cash += boosted_cash
-        self.current_player.reputation = max(0, min(100, self.current_player.reputation + boosted_rep))
+        player.cash += boosted_cash
+        player.reputation = max(0, min(100, player.reputation + boosted_rep))
         
         promotion = None
-        if self.current_player.career_path == 'employee' and leveled_up:
-            if new_level > self.current_player.job_level:
-                self.current_player.job_level = new_level
-                job_titles = JOB_TITLES.get(self.current_player.industry, JOB_TITLES['Restaurant'])
+        if player.career_path == 'employee' and leveled_up:
+            if new_level > player.job_level:
+                player.job_level = new_level
+                job_titles = JOB_TITLES.get(player.industry, JOB_TITLES['Restaurant'])
                 new_title = job_titles.get(new_level, job_titles.get(10, 'Senior Executive'))
-                self.current_player.job_title = new_title
+                player.job_title = new_title
                 promotion = {
                     'old_level': old_level,
                     'new_level': new_level,
                     'new_title': new_title
                 }
         
-        stars = self._calculate_stars(scenario, choice)
+        stars = self._calculate_stars(scenario, choice, sum_equipment_bonuses(equipment)['luck'])
         
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("""
-            INSERT INTO completed_scenarios (player_id, scenario_id, choice_made, stars_earned)
-            VALUES (%s, %s, %s, %s)
-            ON CONFLICT (player_id, scenario_id) DO NOTHING
-        """, (self.current_player.player_id, scenario['scenario_id'], choice, stars))
-        conn.commit()
-        cur.close()
-        return_connection(conn)
-        
-        self.current_player.save_to_db()
-        
-        from src.engine.accounting import create_pending_transaction
-        
-        if boosted_cash != 0:
-            if boosted_cash > 0:
-                create_pending_transaction(
-                    self.current_player.player_id,
-                    'scenario_income',
-                    f"Revenue from {scenario['scenario_title']}",
-                    abs(boosted_cash),
-                    '1000',
-                    '4000',
-                    'scenario',
-                    scenario['scenario_id']
-                )
-            else:
-                create_pending_transaction(
-                    self.current_player.player_id,
-                    'scenario_expense',
-                    f"Expense from {scenario['scenario_title']}",
-                    abs(boosted_cash),
-                    '5950',
-                    '1000',
-                    'scenario',
-                    scenario['scenario_id']
-                )
-        
-        from src.company_resources import (
-            update_company_resources, record_decision, apply_ability_modifiers, 
-            check_game_over, add_news_ticker
-        )
+        pending = None
+        if boosted_cash > 0:
+            pending = ('scenario_income', f"Revenue from {scenario['scenario_title']}",
+                       abs(boosted_cash), '1000', '4000')
+        elif boosted_cash < 0:
+            pending = ('scenario_expense', f"Expense from {scenario['scenario_title']}",
+                       abs(boosted_cash), '5950', '1000')
         
         morale_change = scenario.get(f'{choice_prefix}_morale_change', 0) or 0
         brand_change = scenario.get(f'{choice_prefix}_brand_change', 0) or 0
         
-        modifiers = apply_ability_modifiers(
-            self.current_player.player_id, 
+        modifiers = calculate_ability_modifiers(
+            abilities,
             base_exp=weighted_exp, 
             base_cash=boosted_cash if boosted_cash > 0 else 0,
             base_cost=abs(boosted_cash) if boosted_cash < 0 else 0
@@ -337,26 +314,89 @@ class ScenariosMixin:
         else:
             modified_cash = 0
         
-        resource_update = update_company_resources(
-            self.current_player.player_id,
+        news = []
+        
+        def add_news(capital, morale, brand, headline=None, news_type='info'):
+            entry = news_headline(capital, morale, brand, headline, news_type)
+            if entry:
+                news.append((*entry, capital, morale, brand))
+        
+        # The same steps as update_company_resources(), record_decision() and
+        # advance_quarter(), applied to the locked row in memory.
+        resources = apply_resource_changes(
+            {**inputs, 'total_cash': player.cash},
             capital_change=modified_cash,
             morale_change=morale_change,
             brand_change=brand_change
         )
+        resource_update = format_resource_update(resources)
+        if modified_cash != 0 or morale_change != 0 or brand_change != 0:
+            add_news(modified_cash, morale_change, brand_change)
+        
+        quarter = resources['fiscal_quarter']
+        decisions = (resources['decisions_this_quarter'] or 0) + 1
+        decision_result = {
+            'current_quarter': quarter,
+            'decisions_made': decisions,
+            'quarter_complete': False,
+            'new_quarter': None,
+            'quarterly_event': None
+        }
+        history = None
+        if decisions >= 3:
+            before = format_company_resources(resources)
+            history = (quarter, before['capital'], before['morale'], before['brand_equity'])
+            quarter += 1
+            decisions = 0
+            
+            quarterly_event = None
+            event = roll_quarterly_event([a['ability_code'] for a in abilities])
+            if event:
+                quarterly_event = format_quarterly_event(event)
+                impacts = quarterly_event['impacts']
+                resources = apply_resource_changes(
+                    resources, impacts['capital'], impacts['morale'], impacts['brand']
+                )
+                if impacts['capital'] != 0 or impacts['morale'] != 0 or impacts['brand'] != 0:
+                    add_news(impacts['capital'], impacts['morale'], impacts['brand'])
+                add_news(impacts['capital'], impacts['morale'], impacts['brand'],
+                         event['event_title'], 'crisis' if event['is_crisis'] else 'opportunity')
+            
+            decision_result = {
+                'current_quarter': quarter,
+                'decisions_made': 0,
+                'quarter_complete': True,
+                'new_quarter': quarter,
+                'quarterly_event': quarterly_event
+            }
         
-        decision_result = record_decision(self.current_player.player_id)
-        
-        game_status = check_game_over(self.current_player.player_id)
-        
-        add_news_ticker(
-            self.current_player.player_id,
-            capital_change=modified_cash,
-            morale_change=morale_change,
-            brand_change=brand_change,
+        add_news(
+            modified_cash, morale_change, brand_change,
             headline=f"Decision made: {scenario['scenario_title']}",
             news_type='success' if modified_cash >= 0 else 'warning'
         )
         
+        if resources['total_cash'] is not None:
+            player.cash = resources['total_cash']
+        player.save_to_db()
+        
+        saved = self._write_choice_outcome(cur, scenario, choice, stars, pending, history, news, {
+            **resources, 'fiscal_quarter': quarter, 'decisions_this_quarter': decisions
+        })
+        if saved is None:
+            # The completion was already recorded (by a path that does not take
+            # this lock): undo this checkout's writes, save_to_db() included.
+            conn.rollback()
+            cur.close()
+            return_connection(conn)
+            return {"error": "Already completed this quest"}
+        record_competition_score(cur, player.player_id, {'scenarios_completed': 1, 'exp_earned': weighted_exp})
+        conn.commit()
+        cur.close()
+        return_connection(conn)
+        
+        game_status = game_over_status(format_company_resources(saved))
+        
         return {
             "success": True,
             "exp_gained": weighted_exp,
@@ -380,9 +420,88 @@ class ScenariosMixin:
             "ability_modifiers": modifiers
         }
     
-    def _calculate_stars(self, scenario: dict, choice: str) -> int:
+    def _write_choice_outcome(self, cur, scenario: dict, choice: str, stars: int,
+                              pending, history, news: list, resources: dict) -> dict:
+        """Every write of a resolved choice besides save_to_db(), as one statement:
+        the completion, pending transaction, quarter history and news entries
+        ride as CTEs on the company resources UPDATE. Returns the updated row,
+        or None if the scenario was already completed, in which case every
+        other write is skipped too."""
+        from src.company_resources import NEWS_TICKER_LIMIT
+        
+        player_id = self.current_player.player_id
+        ctes = ["""
+            completed AS (
+                INSERT INTO completed_scenarios (player_id, scenario_id, choice_made, stars_earned)
+                VALUES (%s, %s, %s, %s)
+                ON CONFLICT (player_id, scenario_id) DO NOTHING
+                RETURNING scenario_id
+            )"""]
+        params = [player_id, scenario['scenario_id'], choice, stars]
+        
+        if pending:
+            ctes.append("""
+            pending AS (
+                INSERT INTO pending_transactions
+                (player_id, transaction_type, description, amount, suggested_debit_account,
+                 suggested_credit_account, source_type, source_id)
+                SELECT %s, %s, %s, %s, %s, %s, 'scenario', %s
+                WHERE EXISTS (SELECT 1 FROM completed)
+            )""")
+            params.extend([player_id, *pending, scenario['scenario_id']])
+        
+        if history:
+            ctes.append("""
+            history AS (
+                INSERT INTO player_quarterly_history 
+                (player_id, quarter_number, capital_start, capital_end, morale_start, morale_end, 
+                 brand_start, brand_end, decisions_made)
+                SELECT %s, %s, %s, %s, %s, %s, %s, %s, 3
+                WHERE EXISTS (SELECT 1 FROM completed)
+                ON CONFLICT (player_id, quarter_number) DO UPDATE
+                SET capital_end = EXCLUDED.capital_end, morale_end = EXCLUDED.morale_end,
+                    brand_end = EXCLUDED.brand_end, decisions_made = 3
+            )""")
+            quarter, capital, morale, brand = history
+            params.extend([player_id, quarter, capital, capital, morale, morale, brand, brand])
+        
+        # Rows inserted by this statement are invisible to the trim, so it
+        # keeps only as many older entries as still fit under the limit.
+        values = ', '.join(['(%s, %s, %s, %s, %s, %s)'] * len(news))
+        ctes.append(f"""
+            news AS (
+                INSERT INTO news_ticker (player_id, news_text, news_type, capital_change, morale_change, brand_change)
+                SELECT * FROM (VALUES {values}) AS v
+                WHERE EXISTS (SELECT 1 FROM completed)
+            ),
+            trimmed AS (
+                DELETE FROM news_ticker 
+                WHERE player_id = %s AND EXISTS (SELECT 1 FROM completed)
+                AND news_id NOT IN (
+                    SELECT news_id FROM news_ticker 
+                    WHERE player_id = %s 
+                    ORDER BY created_at DESC, news_id DESC
+                    LIMIT %s
+                )
+            )""")
+        for entry in news:
+            params.extend([player_id, *entry])
+        params.extend([player_id, player_id, max(0, NEWS_TICKER_LIMIT - len(news))])
+        
+        params.extend([resources['team_morale'], resources['brand_equity'],
+                       resources['fiscal_quarter'], resources['decisions_this_quarter'], player_id])
+        cur.execute(f"""
+            WITH {','.join(ctes)}
+            UPDATE player_counters
+            SET team_morale = %s, brand_equity = %s, fiscal_quarter = %s, decisions_this_quarter = %s
+            WHERE player_id = %s AND EXISTS (SELECT 1 FROM completed)
+            RETURNING total_cash, team_morale, brand_equity, fiscal_quarter, decisions_this_quarter
+        """, params)
+        return cur.fetchone()
+    
+    def _calculate_stars(self, scenario: dict, choice: str, luck_bonus: int = None) -> int:
         """Calculate stars earned based on choice quality (1-3 stars).
-        Equipment luck bonus can upgrade stars."""
+        Equipment luck bonus can upgrade stars; it is looked up unless given."""
         exp_rewards = [
             scenario.get('choice_a_exp_reward', 0),
             scenario.get('choice_b_exp_reward', 0),
@@ -403,8 +522,8 @@ class ScenariosMixin:
         else:
             stars = 1
         
-        equipment_bonuses = self.get_equipment_bonuses()
-        luck_bonus = equipment_bonuses.get('luck', 0)
+        if luck_bonus is None:
+            luck_bonus = self.get_equipment_bonuses().get('luck', 0)
         if luck_bonus > 0 and stars < 3:
             luck_chance = luck_bonus * 0.02
             if random.random() < luck_chance:
@@ -414,14 +533,7 @@ class ScenariosMixin:
     
     def get_challenge_by_id(self, scenario_id: int) -> dict:
         """Get a challenge scenario with parsed config."""
-        conn = get_connection()
-        cur = conn.cursor()
-        
-        cur.execute("SELECT * FROM scenario_master WHERE scenario_id = %s", (scenario_id,))
-        scenario = cur.fetchone()
-        
-        cur.close()
-        return_connection(conn)
+        scenario = get_catalog().get('scenario_master', scenario_id)
         
         if not scenario:
             return None
@@ -457,8 +569,7 @@ class ScenariosMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM scenario_master WHERE scenario_id = %s", (scenario_id,))
-        scenario = cur.fetchone()
+        scenario = get_catalog().get('scenario_master', scenario_id)
         
         if not scenario:
             cur.close()
@@ -622,7 +733,7 @@ class ScenariosMixin:
         """, (new_level, new_exp, new_exp, self.current_player.player_id, discipline))
         
         cur.execute("""
-            UPDATE player_profiles
+            UPDATE player_counters
             SET total_cash = %s, business_reputation = %s, last_played = CURRENT_TIMESTAMP
             WHERE player_id = %s
         """, (self.current_player.cash, self.current_player.reputation, self.current_player.player_id))
@@ -634,6 +745,8 @@ class ScenariosMixin:
                 WHERE player_id = %s
             """, (stat_points_earned, self.current_player.player_id))
         
+        record_competition_score(cur, self.current_player.player_id,
+                                 {'scenarios_completed': 1, 'exp_earned': weighted_exp})
         conn.commit()
         cur.close()
         return_connection(conn)
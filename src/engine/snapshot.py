@@ -0,0 +1,193 @@
+"""
+Player snapshot for the JSON API: stats, energy and company resources - and
+optionally the dashboard sections - from one query.
+
+Player-owned rows come back as json_build_object/json_agg columns or id
+arrays; catalog rows (items, achievements, abilities, milestones, rivals) are
+joined in Python from get_catalog(), so their values keep the types the
+per-section queries returned. Energy is computed from its stored row
+(src.engine.regen), so building a snapshot never writes.
+
+    snapshot = build_player_snapshot(player_id, dashboard=True)
+"""
+
+import datetime
+import decimal
+
+from src.database import get_connection, return_connection, get_catalog
+from src.db.prepared import register_statement, execute_prepared
+from src.company_resources import (
+    format_company_resources, build_skill_tree, format_dashboard_data
+)
+from src.engine.player import Player
+from src.engine.progression import energy_status
+
+_SNAPSHOT_COLUMNS = """
+    p.player_name, p.chosen_world, p.chosen_industry, p.career_path, p.job_title, p.job_level,
+    p.total_cash, p.business_reputation, p.current_month,
+    p.team_morale, p.brand_equity, p.fiscal_quarter, p.decisions_this_quarter,
+    COALESCE((SELECT json_agg(json_build_object(
+                 'discipline_name', d.discipline_name, 'current_level', d.current_level,
+                 'current_exp', d.current_exp, 'total_exp_earned', d.total_exp_earned))
+              FROM player_discipline_progress d WHERE d.player_id = p.player_id), '[]'::json) AS disciplines,
+    (SELECT json_build_object(
+         'charisma', s.charisma, 'intelligence', s.intelligence, 'luck', s.luck,
+         'negotiation', s.negotiation, 'stat_points_available', s.stat_points_available)
+     FROM player_stats s WHERE s.player_id = p.player_id) AS stats,
+    COALESCE((SELECT json_agg(json_build_object('item_id', pi.item_id, 'quantity', pi.quantity))
+              FROM player_inventory pi WHERE pi.player_id = p.player_id), '[]'::json) AS inventory,
+    ARRAY(SELECT pa.achievement_id FROM player_achievements pa
+          WHERE pa.player_id = p.player_id) AS achievement_ids,
+    e.current_energy, e.max_energy, e.last_recharge_at
+"""
+
+_DASHBOARD_COLUMNS = """,
+    COALESCE((SELECT json_agg(json_build_object(
+                 'ability_id', pua.ability_id, 'unlocked_at', pua.unlocked_at,
+                 'times_used', pua.times_used, 'is_active', pua.is_active))
+              FROM player_unlocked_abilities pua WHERE pua.player_id = p.player_id), '[]'::json) AS unlocked_abilities,
+    COALESCE((SELECT json_object_agg(ss.subskill_name, ss.current_level)
+              FROM player_subskill_progress ss WHERE ss.player_id = p.player_id), '{}'::json) AS subskill_levels,
+    COALESCE((SELECT json_agg(n) FROM (
+                 SELECT news_text, news_type, capital_change::text AS capital_change,
+                        morale_change, brand_change, created_at
+                 FROM news_ticker WHERE player_id = p.player_id
+                 ORDER BY created_at DESC LIMIT 5) n), '[]'::json) AS news,
+    ARRAY(SELECT pm.milestone_id FROM player_milestones pm
+          WHERE pm.player_id = p.player_id) AS milestone_ids,
+    COALESCE((SELECT json_agg(json_build_object(
+                 'rival_id', prs.rival_id, 'competition_score', prs.competition_score,
+                 'times_beaten', prs.times_beaten, 'times_lost', prs.times_lost))
+              FROM player_rival_status prs WHERE prs.player_id = p.player_id), '[]'::json) AS rival_status
+"""
+
+_SNAPSHOT_FROM = """
+    FROM player_profiles p
+    LEFT JOIN player_energy e ON e.player_id = p.player_id
+    WHERE p.player_id = %s
+"""
+
+PLAYER_SNAPSHOT = register_statement(
+    'player_snapshot', f"SELECT {_SNAPSHOT_COLUMNS} {_SNAPSHOT_FROM}"
+)
+PLAYER_DASHBOARD_SNAPSHOT = register_statement(
+    'player_dashboard_snapshot', f"SELECT {_SNAPSHOT_COLUMNS} {_DASHBOARD_COLUMNS} {_SNAPSHOT_FROM}"
+)
+
+
+def snapshot_statement(dashboard: bool = False):
+    return PLAYER_DASHBOARD_SNAPSHOT if dashboard else PLAYER_SNAPSHOT
+
+
+def energy_row_from_snapshot(row: dict):
+    """The player_energy part of a snapshot row, or None if the player has none yet."""
+    if row['max_energy'] is None:
+        return None
+    return {key: row[key] for key in ('current_energy', 'max_energy', 'last_recharge_at')}
+
+
+def _player_from_snapshot(player_id: int, row: dict, catalog) -> Player:
+    inventory = []
+    for entry in row['inventory']:
+        item = catalog.get('items', entry['item_id'])
+        if item:
+            inventory.append({**item, 'quantity': entry['quantity']})
+    achievements = [a for a in (catalog.get('achievements', i) for i in row['achievement_ids']) if a]
+
+    player = Player(player_id)
+    player.apply_loaded_rows({
+        'profile': row,
+        'disciplines': row['disciplines'],
+        'stats': row['stats'],
+        'inventory': inventory,
+        'achievements': achievements,
+    })
+    player.mark_clean()
+    return player
+
+
+def _dashboard_from_snapshot(player: Player, row: dict, resources: dict, catalog) -> dict:
+    unlocked = {a['ability_id']: a for a in row['unlocked_abilities']}
+    abilities = []
+    active_abilities = []
+    for ability in catalog.all('skill_tree_abilities'):
+        status = unlocked.get(ability['ability_id'], {})
+        abilities.append({
+            **ability,
+            'unlocked_at': status.get('unlocked_at'),
+            'times_used': status.get('times_used'),
+            'is_active': status.get('is_active'),
+        })
+        if status.get('is_active'):
+            active_abilities.append({key: ability[key] for key in
+                                     ('ability_code', 'ability_name', 'effect_type', 'effect_value', 'icon')})
+
+    news = [{
+        **entry,
+        'capital_change': decimal.Decimal(entry['capital_change']) if entry['capital_change'] is not None else None,
+        'created_at': datetime.datetime.fromisoformat(entry['created_at']) if entry['created_at'] else None,
+    } for entry in row['news']]
+
+    earned_ids = set(row['milestone_ids'])
+    milestones = [{**m, 'earned': m['milestone_id'] in earned_ids}
+                  for m in catalog.all('business_milestones')]
+
+    rival_status = {r['rival_id']: r for r in row['rival_status']}
+    rivals = []
+    for rival in sorted(catalog.all('rivals'), key=lambda r: r['difficulty_level']):
+        if rival['world_type'] != player.world or rival['industry'] != player.industry:
+            continue
+        status = rival_status.get(rival['rival_id'], {})
+        rivals.append({
+            **rival,
+            'score': status.get('competition_score') or 0,
+            'wins': status.get('times_beaten') or 0,
+            'losses': status.get('times_lost') or 0,
+        })
+
+    discipline_rows = row['disciplines']
+    return {
+        'dashboard': format_dashboard_data(
+            resources, news, build_skill_tree(abilities, row['subskill_levels']),
+            active_abilities, discipline_rows
+        ),
+        'milestones': {
+            'earned': [m for m in milestones if m['earned']],
+            'available': [m for m in milestones if not m['earned']],
+        },
+        'rivals': rivals,
+    }
+
+
+def snapshot_from_row(player_id: int, row: dict, energy: dict, dashboard: bool = False) -> dict:
+    """Assemble the snapshot from a snapshot_statement() row and the player's energy."""
+    from src.engine.core import GameEngine
+
+    catalog = get_catalog()
+    engine = GameEngine()
+    engine.current_player = _player_from_snapshot(player_id, row, catalog)
+    resources = format_company_resources(row)
+    snapshot = {
+        'stats': engine.get_player_stats(),
+        'energy': energy,
+        'resources': resources,
+    }
+    if dashboard:
+        snapshot.update(_dashboard_from_snapshot(engine.current_player, row, resources, catalog))
+    return snapshot
+
+
+def build_player_snapshot(player_id: int, dashboard: bool = False):
+    """stats/energy/resources (plus dashboard/milestones/rivals when asked)
+    for a player in one query; None if the player does not exist."""
+    conn = get_connection()
+    cur = conn.cursor()
+    try:
+        execute_prepared(cur, snapshot_statement(dashboard), (player_id,))
+        row = cur.fetchone()
+    finally:
+        cur.close()
+        return_connection(conn)
+    if row is None:
+        return None
+    return snapshot_from_row(player_id, row, energy_status(energy_row_from_snapshot(row)), dashboard)
@@ -3,7 +3,7 @@ SocialMixin - Social/shop/NPC/quest-related GameEngine methods.
 """
 
 import random
-from src.database import get_connection, return_connection
+from src.database import get_connection, return_connection, get_catalog
 
 
 class SocialMixin:
@@ -11,13 +11,7 @@ class SocialMixin:
 
     def get_shop_items(self) -> list:
         """Get all items available in the shop."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM items ORDER BY purchase_price")
-        items = [dict(row) for row in cur.fetchall()]
-        cur.close()
-        return_connection(conn)
-        return items
+        return get_catalog().all('items')
     
     def purchase_item(self, item_id: int) -> dict:
         """Purchase an item from the shop."""
@@ -27,8 +21,7 @@ class SocialMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM items WHERE item_id = %s", (item_id,))
-        item = cur.fetchone()
+        item = get_catalog().get('items', item_id)
         
         if not item:
             cur.close()
@@ -47,14 +40,16 @@ class SocialMixin:
             INSERT INTO player_inventory (player_id, item_id, quantity)
             VALUES (%s, %s, 1)
             ON CONFLICT (player_id, item_id) DO UPDATE SET quantity = player_inventory.quantity + 1
+            RETURNING quantity
         """, (self.current_player.player_id, item_id))
+        quantity = cur.fetchone()['quantity']
         
         conn.commit()
         cur.close()
         return_connection(conn)
         
         self.current_player.save_to_db()
-        self.current_player.load_from_db()
+        self.current_player.set_inventory_quantity(item, quantity)
         
         return {"success": True, "item": dict(item), "new_cash": self.current_player.cash}
     
@@ -85,8 +80,7 @@ class SocialMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM npcs WHERE npc_id = %s", (npc_id,))
-        npc = cur.fetchone()
+        npc = get_catalog().get('npcs', npc_id)
         
         if not npc:
             cur.close()
@@ -352,12 +346,7 @@ class SocialMixin:
 
     def get_avatar_options(self) -> dict:
         """Get all avatar customization options."""
-        conn = get_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT * FROM avatar_options ORDER BY option_type, unlock_level, unlock_cost")
-        options = [dict(row) for row in cur.fetchall()]
-        cur.close()
-        return_connection(conn)
+        options = get_catalog().all('avatar_options')
         
         categorized = {"hair": [], "outfit": [], "accessory": [], "color": []}
         for opt in options:
@@ -430,8 +419,7 @@ class SocialMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM advisors ORDER BY rarity, discipline_specialty")
-        all_advisors = cur.fetchall()
+        all_advisors = get_catalog().all('advisors')
         
         cur.execute("""
             SELECT a.*, pa.level as recruited_level, pa.is_active
@@ -459,8 +447,7 @@ class SocialMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM advisors WHERE advisor_id = %s", (advisor_id,))
-        advisor = cur.fetchone()
+        advisor = get_catalog().get('advisors', advisor_id)
         
         if not advisor:
             cur.close()
@@ -508,8 +495,7 @@ class SocialMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM equipment ORDER BY slot_type, level_required")
-        all_equipment = cur.fetchall()
+        all_equipment = get_catalog().all('equipment')
         
         cur.execute("""
             SELECT e.*, pe.is_equipped
@@ -537,8 +523,7 @@ class SocialMixin:
         conn = get_connection()
         cur = conn.cursor()
         
-        cur.execute("SELECT * FROM equipment WHERE equipment_id = %s", (equipment_id,))
-        equip = cur.fetchone()
+        equip = get_catalog().get('equipment', equipment_id)
         
         if not equip:
             cur.close()
@@ -5,6 +5,25 @@ from src.routes.helpers import login_required, get_engine
 api_bp = Blueprint('api', __name__, url_prefix='/api')
 
 
+def _player_snapshot(player_id, dashboard=False):
+    """stats/energy/resources (plus dashboard sections) for a player in one
+    query on the request's connection; None if the player does not exist."""
+    from src.engine.snapshot import build_player_snapshot
+    return build_player_snapshot(player_id, dashboard)
+
+
+def _player_info(snapshot):
+    player_info = {**snapshot['stats']}
+    energy, resources = snapshot['energy'], snapshot['resources']
+    if energy:
+        player_info['energy'] = energy.get('current_energy', 100)
+    if resources:
+        player_info['morale'] = resources.get('morale', 80)
+        player_info['brand_equity'] = resources.get('brand_equity', 100)
+        player_info['fiscal_quarter'] = resources.get('fiscal_quarter', 1)
+    return player_info
+
+
 @api_bp.route('/csrf')
 def api_csrf():
     return jsonify({'token': generate_csrf()})
@@ -35,20 +54,10 @@ def api_create_player():
     player = engine.create_new_player(name, world, industry, career_path, 'pass')
     session['player_id'] = player.player_id
 
-    stats = engine.get_player_stats()
-    energy = engine.get_player_energy()
-    from src.company_resources import get_company_resources
-    resources = get_company_resources(player.player_id)
-
-    player_info = {**stats}
-    if energy:
-        player_info['energy'] = energy.get('current_energy', 100)
-    if resources:
-        player_info['morale'] = resources.get('morale', 80)
-        player_info['brand_equity'] = resources.get('brand_equity', 100)
-        player_info['fiscal_quarter'] = resources.get('fiscal_quarter', 1)
-
-    return jsonify({'success': True, 'player': player_info})
+    # The new player is not committed until the request ends, so read it
+    # back through the request's own transaction.
+    snapshot = _player_snapshot(player.player_id)
+    return jsonify({'success': True, 'player': _player_info(snapshot)})
 
 
 @api_bp.route('/login', methods=['POST'])
@@ -59,26 +68,12 @@ def api_login():
     if not player_id:
         return jsonify({'success': False, 'error': 'No player selected'})
 
-    engine = get_engine()
-    player = engine.load_player(player_id)
-    if not player:
+    snapshot = _player_snapshot(player_id)
+    if not snapshot or not snapshot['stats'].get('name'):
         return jsonify({'success': False, 'error': 'Player not found'})
-    session['player_id'] = player.player_id
+    session['player_id'] = player_id
 
-    stats = engine.get_player_stats()
-    energy = engine.get_player_energy()
-    from src.company_resources import get_company_resources
-    resources = get_company_resources(player.player_id)
-
-    player_info = {**stats}
-    if energy:
-        player_info['energy'] = energy.get('current_energy', 100)
-    if resources:
-        player_info['morale'] = resources.get('morale', 80)
-        player_info['brand_equity'] = resources.get('brand_equity', 100)
-        player_info['fiscal_quarter'] = resources.get('fiscal_quarter', 1)
-
-    return jsonify({'success': True, 'player': player_info})
+    return jsonify({'success': True, 'player': _player_info(snapshot)})
 
 
 @api_bp.route('/dashboard')
@@ -87,20 +82,15 @@ def api_dashboard():
     player_id = session.get('player_id')
     if not player_id:
         return jsonify({'error': 'Not logged in'}), 401
-    engine = get_engine()
-    engine.load_player(player_id)
-    stats = engine.get_player_stats()
-    energy = engine.get_player_energy()
-    from src.company_resources import get_dashboard_data
-    dashboard_data = get_dashboard_data(player_id)
-    milestones = engine.get_milestones()
-    rivals = engine.get_rivals()
+    snapshot = _player_snapshot(player_id, dashboard=True)
+    if not snapshot:
+        return jsonify({'error': 'Player not found'}), 404
     return jsonify({
-        'stats': stats,
-        'energy': energy,
-        'dashboard': dashboard_data,
-        'milestones': milestones,
-        'rivals': rivals
+        'stats': snapshot['stats'],
+        'energy': snapshot['energy'],
+        'dashboard': snapshot['dashboard'],
+        'milestones': snapshot['milestones'],
+        'rivals': snapshot['rivals']
     })
 
 
@@ -110,13 +100,10 @@ def api_stats():
     player_id = session.get('player_id')
     if not player_id:
         return jsonify({'error': 'Not logged in'}), 401
-    engine = get_engine()
-    engine.load_player(player_id)
-    stats = engine.get_player_stats()
-    energy = engine.get_player_energy()
-    from src.company_resources import get_company_resources
-    resources = get_company_resources(player_id)
-    return jsonify({'stats': stats, 'energy': energy, 'resources': resources})
+    snapshot = _player_snapshot(player_id)
+    if not snapshot:
+        return jsonify({'error': 'Player not found'}), 404
+    return jsonify(snapshot)
 
 
 @api_bp.route('/scenarios/<discipline>')
@@ -139,10 +126,9 @@ def api_shop():
     if not player_id:
         return jsonify({'error': 'Not logged in'}), 401
     engine = get_engine()
-    engine.load_player(player_id)
+    engine.load_player(player_id, sections=('profile',))
     items = engine.get_shop_items()
-    stats = engine.get_player_stats()
-    return jsonify({'items': items, 'cash': stats.get('cash', 0)})
+    return jsonify({'items': items, 'cash': engine.current_player.cash})
 
 
 @api_bp.route('/buy/<int:item_id>', methods=['POST'])
@@ -164,7 +150,7 @@ def api_play(scenario_id):
     if not player_id:
         return jsonify({'error': 'Not logged in'}), 401
     engine = get_engine()
-    engine.load_player(player_id)
+    engine.load_player(player_id, sections=('profile',))
     if engine.is_scenario_completed(scenario_id):
         return jsonify({'error': 'Already completed'})
     scenario = engine.get_scenario_by_id(scenario_id)
@@ -179,19 +165,42 @@ def api_choose(scenario_id, choice):
     player_id = session.get('player_id')
     if not player_id:
         return jsonify({'error': 'Not logged in'}), 401
+    # Always the sync path: the completion and energy checks run on the
+    # choice's locked read, in the request's transaction.
     engine = get_engine()
     engine.load_player(player_id)
-    if engine.is_scenario_completed(scenario_id):
-        return jsonify({'error': 'Already completed this quest'})
-    energy_data = engine.get_player_energy()
-    if energy_data and energy_data.get('current_energy', 0) < 10:
-        return jsonify({'error': 'Not enough energy'})
     scenario = engine.get_scenario_by_id(scenario_id)
     if not scenario:
         return jsonify({'error': 'Scenario not found'})
-    result = engine.process_choice(scenario, choice)
-    stats = engine.get_player_stats()
-    energy = engine.get_player_energy()
-    from src.company_resources import get_company_resources
-    resources = get_company_resources(player_id)
-    return jsonify({'result': result, 'stats': stats, 'energy': energy, 'resources': resources})
+    result = engine.process_choice(scenario, choice, min_energy=10)
+    if result.get('error') in ('Already completed this quest', 'Not enough energy'):
+        return jsonify({'error': result['error']})
+    return jsonify({'result': result, **(_player_snapshot(player_id) or {})})
+
+
+@api_bp.route('/leaderboard/<category>/around-me')
+@login_required
+def api_leaderboard_around_me(category):
+    player_id = session.get('player_id')
+    if not player_id:
+        return jsonify({'error': 'Not logged in'}), 401
+    from src.engine.leaderboards import LEADERBOARD_CATEGORIES, get_rank_around
+    if category not in LEADERBOARD_CATEGORIES:
+        return jsonify({'error': 'Unknown leaderboard'}), 404
+    around = get_rank_around(player_id, category, request.args.get('k', 5, type=int))
+    if around is None:
+        return jsonify({'error': 'Not ranked yet'}), 404
+    return jsonify(around)
+
+
+@api_bp.route('/competitions/<int:active_id>/around-me')
+@login_required
+def api_competition_around_me(active_id):
+    player_id = session.get('player_id')
+    if not player_id:
+        return jsonify({'error': 'Not logged in'}), 401
+    from src.engine.leaderboards import get_competition_rank_around
+    around = get_competition_rank_around(player_id, active_id, request.args.get('k', 5, type=int))
+    if around is None:
+        return jsonify({'error': 'Not entered in this competition'}), 404
+    return jsonify(around)
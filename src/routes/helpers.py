@@ -21,16 +21,11 @@ def feature_gated(feature_name):
                 flash('Please select or create a character to continue.', 'warning')
                 return redirect('/')
 
-            from src.company_resources import check_feature_requirements, deduct_feature_cost
-
-            check = check_feature_requirements(session['player_id'], feature_name)
-            if not check['allowed']:
-                flash(f"Access denied: {check['reason']}", 'error')
-                return redirect('/hub')
+            from src.company_resources import deduct_feature_cost
 
             result = deduct_feature_cost(session['player_id'], feature_name)
             if not result['success']:
-                flash(f"Cannot access: {result['message']}", 'error')
+                flash(f"Access denied: {result['message']}", 'error')
                 return redirect('/hub')
 
             if result.get('game_over'):
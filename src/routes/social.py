@@ -142,8 +142,10 @@ def leaderboard():
 
     category = request.args.get('category', 'stars')
     rankings = get_engine().get_leaderboard(category)
+    standing = get_engine().get_leaderboard_standing(category)
 
-    return render_template('social/leaderboard.html', stats=stats, rankings=rankings, category=category)
+    return render_template('social/leaderboard.html', stats=stats, rankings=rankings, category=category,
+                           standing=standing)
 
 
 @social_bp.route('/advisors')
@@ -0,0 +1,62 @@
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from src.db import invalidation
+
+
+class _FakeCursor:
+    def __init__(self, conn):
+        self.conn = conn
+
+    def execute(self, query, params=None):
+        if query == "SELECT 1" and self.conn.on_keepalive:
+            self.conn.notifies.append(self.conn.on_keepalive.pop(0))
+
+
+class _FakeConnection:
+    def __init__(self):
+        self.autocommit = False
+        self.notifies = []
+        self.on_keepalive = []
+
+    def cursor(self):
+        return _FakeCursor(self)
+
+    def poll(self):
+        pass
+
+    def close(self):
+        pass
+
+
+class ListenerTest(unittest.TestCase):
+    def setUp(self):
+        invalidation._stop.clear()
+        self.handled = []
+        self.addCleanup(invalidation._stop.clear)
+        self.addCleanup(invalidation._handlers.clear)
+        invalidation.register_invalidation_handler('player', lambda id, version: self.handled.append((id, version)))
+
+    def test_notification_read_by_keepalive_is_handled_on_next_poll(self):
+        conn = _FakeConnection()
+        conn.on_keepalive.append(SimpleNamespace(payload='{"entity": "player", "id": 42, "version": 17}'))
+        handled_at_select = []
+
+        def idle_select(readers, writers, errors, timeout):
+            handled_at_select.append(list(self.handled))
+            if len(handled_at_select) == 2:
+                invalidation._stop.set()
+            return [], [], []
+
+        with mock.patch.object(invalidation.psycopg2, 'connect', return_value=conn), \
+                mock.patch.object(invalidation.select, 'select', side_effect=idle_select):
+            invalidation._listen('postgres://test')
+
+        # Nothing before the first wait; the keepalive's notification before
+        # the second, without select() ever reporting the socket readable.
+        self.assertEqual(handled_at_select, [[], [(42, 17)]])
+
+
+if __name__ == '__main__':
+    unittest.main()